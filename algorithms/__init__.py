@@ -1,35 +1,236 @@
 # algorithms/__init__.py
 
-import pkgutil
+import ast
+import colorsys
 import importlib
-from typing import Callable, Dict
-import matplotlib.colors as mcolors
 import itertools
+import os
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
 
-# Registry để lưu trữ các thuật toán
-ALGORITHMS: Dict[str, Dict] = {}
+@dataclass(frozen=True)
+class AlgorithmSpec:
+    """
+    Metadata nhẹ của một thuật toán: đủ để liệt kê, chọn màu, lọc theo khả năng và để
+    bộ định tuyến tự động chọn thuật toán mà không cần import mã nguồn của thuật toán.
+
+    Attributes:
+    - name: Tên hiển thị, cũng là khóa trong ALGORITHMS
+    - module: Tên module trong package algorithms chứa thuật toán
+    - quality: 'optimal' (luôn ngắn nhất), 'bounded' (sai số có cận) hoặc 'heuristic' (không đảm bảo)
+    - uses_weight: Có dùng trọng số cạnh hay chỉ dùng số cạnh (trên đồ thị MultiDiGraph của OSMnx)
+    - randomized: Kết quả có thể khác nhau giữa các lần chạy
+    - needs_coordinates: Cần thuộc tính 'x', 'y' trên nút (dùng cho heuristic)
+    - preprocessing: Khóa dữ liệu tiền xử lý cần có trong graph.graph['preprocessing'], None nếu không cần
+    - one_to_many: Tên hàm một-nhiều trong cùng module (func(graph, start, targets, weight)), None nếu không có
+    - max_nodes: Số nút tối đa mà thuật toán còn dùng được trong thực tế, None nếu không giới hạn
+    - step_limit: Số bước tối đa mặc định; vượt quá thì trả về danh sách rỗng dù có đường đi
+    - complexity: Mô hình chi phí: 'local' (duyệt quanh nguồn), 'global' (luôn duyệt toàn đồ thị),
+      'quadratic' (O(n·m)) hoặc 'lookup' (truy vấn trên dữ liệu tiền xử lý)
+    - cost_factor: Hệ số chi phí tương đối so với Dijkstra (đo bằng benchmarks/compare.py)
+    """
+    name: str
+    module: str
+    quality: str = 'heuristic'
+    uses_weight: bool = True
+    randomized: bool = False
+    needs_coordinates: bool = False
+    preprocessing: Optional[str] = None
+    one_to_many: Optional[str] = None
+    max_nodes: Optional[int] = None
+    step_limit: Optional[int] = None
+    complexity: str = 'local'
+    cost_factor: float = 1.0
+
+    @property
+    def optimal(self) -> bool:
+        return self.quality == 'optimal'
+
+    @property
+    def step_limited(self) -> bool:
+        # Có thể trả về danh sách rỗng dù có đường đi (khác với quality='bounded')
+        return self.step_limit is not None
+
+# Danh mục các thuật toán có sẵn, theo thứ tự tên module để giữ nguyên màu của từng thuật toán.
+# Các thuật toán đọc trọng số qua graph[u][v].get(weight, 1) thực tế dùng trọng số 1 trên
+# MultiDiGraph (graph[u][v] là dict theo key của cạnh song song) nên được khai báo uses_weight=False.
+# cost_factor lấy từ cột Runtime_vs_Dijkstra của statistics/statistics_summary.csv.
+MANIFEST: List[AlgorithmSpec] = [
+    AlgorithmSpec('A* Algorithm', 'a_star_algorithm', quality='optimal', needs_coordinates=True, cost_factor=2.2),
+    AlgorithmSpec('Bellman-Ford Algorithm', 'bellman_ford_algorithm', quality='optimal', max_nodes=20000,
+                  complexity='quadratic', cost_factor=15.8),
+    AlgorithmSpec('Breadth-First Search', 'breadth_first_search', uses_weight=False, cost_factor=0.17),
+    AlgorithmSpec('Delta-Stepping', 'delta_stepping_algorithm', uses_weight=False, complexity='global', cost_factor=2.1),
+    AlgorithmSpec('Depth-First Search', 'depth_first_search', uses_weight=False, cost_factor=0.17),
+    AlgorithmSpec('Dijkstra', 'dijkstra_algorithm', quality='optimal', one_to_many='dijkstra_one_to_many'),
+    AlgorithmSpec('Greedy Best-First Search', 'greedy_best_first_search', uses_weight=False, needs_coordinates=True,
+                  cost_factor=0.08),
+    AlgorithmSpec('Hybrid Breadth-Depth First Search', 'hybrid_breadth_depth_search', uses_weight=False, randomized=True,
+                  step_limit=1000, cost_factor=0.55),
+    AlgorithmSpec('Multi-Heuristic A* Algorithm', 'multi_heuristic_a_star_algorithm', uses_weight=False,
+                  needs_coordinates=True, cost_factor=1.9),
+    AlgorithmSpec('Random Weighted A* Algorithm', 'radom_weighted_a_star_algorithm', uses_weight=False,
+                  needs_coordinates=True, cost_factor=1.5),
+    AlgorithmSpec('Random Breadth-First Search', 'random_breadth_first_search', uses_weight=False, randomized=True,
+                  step_limit=1000, cost_factor=0.5),
+    AlgorithmSpec('Random Depth-First Search', 'random_depth_first_search', uses_weight=False, randomized=True,
+                  step_limit=1000, cost_factor=1.5),
+    AlgorithmSpec('Randomized A* Algorithm', 'randomized_a_star_algorithm', uses_weight=False, randomized=True,
+                  needs_coordinates=True, cost_factor=2.2),
+    AlgorithmSpec('Auto', 'auto_router', quality='optimal'),
+    AlgorithmSpec('Dijkstra (CSR)', 'csr_dijkstra', quality='optimal', one_to_many='csr_dijkstra_one_to_many',
+                  cost_factor=0.22),
+    AlgorithmSpec('Arc-Flags Dijkstra', 'arc_flags_search', quality='optimal', preprocessing='arc_flags',
+                  cost_factor=0.022),
+    AlgorithmSpec('Arc-Flags A*', 'arc_flags_search', quality='optimal', needs_coordinates=True,
+                  preprocessing='arc_flags', cost_factor=0.03),
+    AlgorithmSpec('CRP', 'crp_search', quality='optimal', preprocessing='crp', cost_factor=0.12),
+    # Truy vấn khoảng cách chỉ trộn hai nhãn; khôi phục đường đi tỉ lệ với số nút trên đường (~sqrt(n))
+    AlgorithmSpec('Hub Labels', 'hub_label_search', quality='optimal', preprocessing='hub_labels',
+                  one_to_many='hub_labels_one_to_many', complexity='lookup', cost_factor=150),
+]
+
+# Các module hỗ trợ không đăng ký thuật toán nào, bỏ qua khi quét
+HELPER_MODULES = {'alternatives', 'bitset_bfs', 'facilities', 'heuristic', 'isochrones', 'kernels', 'map_matching',
+                  'multi_stop', 'trace'}
 
 # Tạo một generator để tạo màu sắc khác nhau
 def color_generator():
     # Sử dụng hệ màu HSV và phân chia đều các màu theo hue
     for i in itertools.count():
         hue = (i * 0.618033988749895) % 1  # Sử dụng số vàng phi để phân bố màu
-        rgb = mcolors.hsv_to_rgb((hue, 0.5, 0.95))  # Điều chỉnh độ bão hòa và giá trị
-        yield mcolors.to_hex(rgb)
+        rgb = colorsys.hsv_to_rgb(hue, 0.5, 0.95)  # Điều chỉnh độ bão hòa và giá trị
+        yield '#' + ''.join(format(round(channel * 255), '02x') for channel in rgb)
 
 # Khởi tạo bộ tạo màu
 color_gen = color_generator()
 
-def register_algorithm(name: str, func: Callable, color: str = None):
-    if name in ALGORITHMS:
-        raise ValueError(f"Thuật toán '{name}' đã được đăng ký.")
+class AlgorithmEntry(Mapping):
+    """
+    Một mục trong registry, dùng như dict {'color': ..., 'func': ...} như trước đây.
+
+    Hàm thuật toán chỉ được import ở lần đầu truy cập entry['func'].
+    """
+
+    def __init__(self, spec: AlgorithmSpec, color: str, func: Optional[Callable] = None):
+        self.spec = spec
+        self.color = color
+        self._func = func
+
+    @property
+    def func(self) -> Callable:
+        if self._func is None:
+            # Module tự gọi register_algorithm khi được import, gắn hàm vào mục này
+            importlib.import_module(f".{self.spec.module}", package=__name__)
+            if self._func is None:
+                raise LookupError(f"Module '{self.spec.module}' không đăng ký thuật toán '{self.spec.name}'.")
+        return self._func
+
+    @property
+    def loaded(self) -> bool:
+        return self._func is not None
+
+    @property
+    def one_to_many(self) -> Optional[Callable]:
+        """
+        Hàm một-nhiều của thuật toán (nếu có), import module khi cần.
+        """
+        if self.spec.one_to_many is None:
+            return None
+        module = importlib.import_module(f".{self.spec.module}", package=__name__)
+        return getattr(module, self.spec.one_to_many)
+
+    def __getitem__(self, key):
+        if key == 'func':
+            return self.func
+        if key == 'color':
+            return self.color
+        if key == 'spec':
+            return self.spec
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(('color', 'func', 'spec'))
+
+    def __len__(self):
+        return 3
+
+    def __repr__(self):
+        state = 'loaded' if self.loaded else 'lazy'
+        return f"AlgorithmEntry({self.spec.name!r}, module={self.spec.module!r}, {state})"
+
+# Registry để lưu trữ các thuật toán
+ALGORITHMS: Dict[str, AlgorithmEntry] = {}
+
+def _add_entry(spec: AlgorithmSpec, color: str = None, func: Callable = None) -> AlgorithmEntry:
     if color is None:
         color = next(color_gen)
-    ALGORITHMS[name] = {
-        'color': color,
-        'func': func
-    }
-
-# Tự động tải tất cả các module trong thư mục algorithms/
-for finder, name, ispkg in pkgutil.iter_modules(__path__):
-    module = importlib.import_module(f".{name}", package=__name__)
+    entry = AlgorithmEntry(spec, color, func)
+    ALGORITHMS[spec.name] = entry
+    return entry
+
+def register_algorithm(name: str, func: Callable, color: str = None, **capabilities):
+    """
+    Đăng ký một thuật toán vào registry.
+
+    Nếu thuật toán đã được khai báo trong MANIFEST (hoặc được phát hiện khi quét) thì chỉ
+    gắn hàm vào mục có sẵn; ngược lại tạo mục mới với metadata từ capabilities.
+    """
+    entry = ALGORITHMS.get(name)
+    if entry is not None:
+        if entry.loaded:
+            raise ValueError(f"Thuật toán '{name}' đã được đăng ký.")
+        entry._func = func
+        if capabilities:
+            entry.spec = AlgorithmSpec(name, entry.spec.module, **capabilities)
+        if color is not None:
+            entry.color = color
+        return entry
+    module = func.__module__.rpartition('.')[2]
+    return _add_entry(AlgorithmSpec(name, module, **capabilities), color, func)
+
+def find_algorithms(**capabilities) -> List[str]:
+    """
+    Tìm tên các thuật toán có metadata khớp với điều kiện, ví dụ find_algorithms(optimal=True)
+    hoặc find_algorithms(uses_weight=True, randomized=False).
+    """
+    return [
+        name for name, entry in ALGORITHMS.items()
+        if all(getattr(entry.spec, key) == value for key, value in capabilities.items())
+    ]
+
+def _scan_registered_names(path: str) -> List[str]:
+    """
+    Đọc tên các thuật toán được đăng ký ở cấp module mà không thực thi module.
+    """
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    if 'register_algorithm' not in source:
+        return []
+    names = []
+    for node in ast.parse(source).body:
+        call = node.value if isinstance(node, ast.Expr) else None
+        if not isinstance(call, ast.Call) or getattr(call.func, 'id', None) != 'register_algorithm':
+            continue
+        # Hỗ trợ cả register_algorithm('Tên', f) và register_algorithm(name='Tên', func=f)
+        name = call.args[0] if call.args else next((k.value for k in call.keywords if k.arg == 'name'), None)
+        if isinstance(name, ast.Constant) and isinstance(name.value, str):
+            names.append(name.value)
+    return names
+
+def _discover():
+    for spec in MANIFEST:
+        _add_entry(spec)
+
+    # Module mới được thêm vào thư mục nhưng chưa có trong MANIFEST vẫn được tự động nhận
+    known = {spec.module for spec in MANIFEST} | HELPER_MODULES
+    for filename in sorted(os.listdir(__path__[0])):
+        module, ext = os.path.splitext(filename)
+        if ext != '.py' or module.startswith('_') or module in known:
+            continue
+        for name in _scan_registered_names(os.path.join(__path__[0], filename)):
+            if name not in ALGORITHMS:
+                _add_entry(AlgorithmSpec(name, module))
+
+_discover()
@@ -1,6 +1,6 @@
 import heapq
 from .heuristic import heuristic
-from algorithms import register_algorithm
+from algorithms import kernels, register_algorithm
 
 def a_star(graph, start, end, weight='length'):
     """
@@ -15,6 +15,10 @@ def a_star(graph, start, end, weight='length'):
     Returns:
     - Danh sách các nút đại diện cho đường đi ngắn nhất. Nếu không tìm thấy đường, trả về danh sách rỗng.
     """
+    # Có numba thì chạy kernel biên dịch trên mảng CSR (xem algorithms/kernels.py)
+    if kernels.accelerated(graph):
+        return kernels.dijkstra_path(graph, start, end, weight, use_heuristic=True)
+
     queue = []
     heapq.heappush(queue, (0 + heuristic(start, end, graph), 0, start))
     distances = {start: 0}
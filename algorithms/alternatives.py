@@ -0,0 +1,326 @@
+# algorithms/alternatives.py
+
+import heapq
+from algorithms.csr_dijkstra import csr_shortest_path
+from loader.compiled import get_compiled
+
+def _shortest_path_tree(compiled, root):
+    """
+    Dijkstra đầy đủ từ root trên CompiledGraph (dùng compiled.reverse() để có cây lùi).
+
+    Returns:
+    - Tuple (khoảng cách, nút cha) dạng list theo chỉ số nút; nút không tới được có inf và -1.
+    """
+    indptr, indices, weights = compiled.lists()
+    inf = float('inf')
+    distances = [inf] * compiled.num_nodes
+    parent = [-1] * compiled.num_nodes
+    distances[root] = 0.0
+    queue = [(0.0, root)]
+    heappop, heappush = heapq.heappop, heapq.heappush
+    while queue:
+        distance, node = heappop(queue)
+        if distance > distances[node]:
+            continue
+        for k in range(indptr[node], indptr[node + 1]):
+            neighbor = indices[k]
+            new_distance = distance + weights[k]
+            if new_distance < distances[neighbor]:
+                distances[neighbor] = new_distance
+                parent[neighbor] = node
+                heappush(queue, (new_distance, neighbor))
+    return distances, parent
+
+def _edge_weight(compiled, u, v):
+    indptr, indices, weights = compiled.lists()
+    for k in range(indptr[u], indptr[u + 1]):
+        if indices[k] == v:
+            return weights[k]
+    raise ValueError(f"Không có cạnh {u} -> {v} trong đồ thị.")
+
+def _prefix_costs(compiled, path):
+    costs = [0.0]
+    for u, v in zip(path[:-1], path[1:]):
+        costs.append(costs[-1] + _edge_weight(compiled, u, v))
+    return costs
+
+def _tree_path(parent, node):
+    # Lần theo con trỏ cha tới gốc: với cây tiến là đường gốc -> node (đảo ngược),
+    # với cây lùi là chính đường node -> gốc
+    path = []
+    while node != -1:
+        path.append(node)
+        node = parent[node]
+    return path
+
+def _spur_search(compiled, spur, target, to_target, banned_nodes, banned_edges):
+    # A* từ spur tới target trên đồ thị đã bỏ một số nút/cạnh. Khoảng cách tới đích trên đồ thị
+    # đầy đủ (to_target) là cận dưới chấp nhận được và nhất quán trên mọi đồ thị con.
+    indptr, indices, weights = compiled.lists()
+    inf = float('inf')
+    distances = {spur: 0.0}
+    parent = {spur: -1}
+    queue = [(to_target[spur], 0.0, spur)]
+    heappop, heappush = heapq.heappop, heapq.heappush
+    while queue:
+        _, distance, node = heappop(queue)
+        if node == target:
+            path = _tree_path(parent, node)
+            return distance, path[::-1]
+        if distance > distances[node]:
+            continue
+        for k in range(indptr[node], indptr[node + 1]):
+            neighbor = indices[k]
+            if neighbor in banned_nodes or (node, neighbor) in banned_edges:
+                continue
+            new_distance = distance + weights[k]
+            if new_distance < distances.get(neighbor, inf):
+                distances[neighbor] = new_distance
+                parent[neighbor] = node
+                heappush(queue, (new_distance + to_target[neighbor], new_distance, neighbor))
+    return inf, []
+
+def yen_k_shortest(compiled, source, target, k=3):
+    """
+    K đường đi ngắn nhất không lặp (thuật toán Yen) trên CompiledGraph.
+
+    Cây đường đi ngắn nhất lùi từ đích được tính một lần và dùng lại cho mọi spur search:
+    - Nếu đường trên cây từ nút spur tới đích không chạm nút/cạnh bị cấm thì nó chính là spur
+      path tối ưu, không cần tìm kiếm.
+    - Ngược lại, khoảng cách trên cây là heuristic A* chính xác trên đồ thị đầy đủ, nên spur
+      search chỉ duyệt vùng quanh chỗ bị chặn.
+
+    Returns:
+    - Danh sách tối đa k tuple (chi phí, đường đi theo chỉ số), tăng dần theo chi phí.
+    """
+    if source == target:
+        return [(0.0, [source])]
+    to_target, successor = _shortest_path_tree(compiled.reverse(), target)
+    if to_target[source] == float('inf'):
+        return []
+
+    found = [(to_target[source], _tree_path(successor, source))]
+    candidates = []
+    seen = {tuple(found[0][1])}
+    while len(found) < k:
+        _, last = found[-1]
+        prefix = _prefix_costs(compiled, last)
+        for i in range(len(last) - 1):
+            spur = last[i]
+            root = last[:i + 1]
+            banned_nodes = set(root[:-1])
+            banned_edges = {(path[i], path[i + 1]) for _, path in found if path[:i + 1] == root}
+
+            tree_path = _tree_path(successor, spur)
+            if (spur, tree_path[1]) not in banned_edges and banned_nodes.isdisjoint(tree_path):
+                cost, spur_path = to_target[spur], tree_path
+            else:
+                cost, spur_path = _spur_search(compiled, spur, target, to_target, banned_nodes, banned_edges)
+            if not spur_path:
+                continue
+
+            path = root[:-1] + spur_path
+            key = tuple(path)
+            if key not in seen:
+                seen.add(key)
+                heapq.heappush(candidates, (prefix[i] + cost, path))
+        if not candidates:
+            break
+        found.append(heapq.heappop(candidates))
+    return found
+
+def _edge_set(path):
+    return set(zip(path[:-1], path[1:]))
+
+def _shared_cost(compiled, path, other_edges):
+    return sum(_edge_weight(compiled, u, v) for u, v in zip(path[:-1], path[1:]) if (u, v) in other_edges)
+
+def _is_locally_optimal(compiled, path, prefix, best_edges, window):
+    """
+    T-test: đoạn dài window quanh điểm giữa phần lệch khỏi đường tối ưu phải là đường đi ngắn
+    nhất giữa hai đầu của nó, để loại các đường vòng vô lý (đi vào rồi quay ra một ngõ).
+    """
+    detour = [i for i, edge in enumerate(zip(path[:-1], path[1:])) if edge not in best_edges]
+    if not detour:
+        return True
+    middle = (prefix[detour[0]] + prefix[detour[-1] + 1]) / 2
+    first = max((i for i in range(len(path)) if prefix[i] <= middle - window / 2), default=0)
+    last = min((i for i in range(len(path)) if prefix[i] >= middle + window / 2), default=len(path) - 1)
+    expected = prefix[last] - prefix[first]
+    cost, _ = csr_shortest_path(compiled, path[first], path[last])
+    return cost >= expected * (1 - 1e-9) - 1e-9
+
+def _select(compiled, candidates, k, stretch, max_sharing, local_optimality):
+    """
+    Lọc và chọn tuần tự các đường thay thế theo thứ tự ưu tiên của candidates.
+
+    Một đường được nhận khi: chi phí không vượt quá stretch lần tối ưu, phần chung với mỗi
+    đường đã chọn không vượt quá max_sharing chi phí của nó, và qua được T-test với
+    T = local_optimality * chi phí tối ưu. Kết quả: đường tối ưu rồi các đường thay thế
+    tăng dần theo chi phí.
+    """
+    best_cost, best_path = candidates[0]
+    best_edges = _edge_set(best_path)
+    selected = [(best_cost, best_path)]
+    selected_edges = [best_edges]
+    for cost, path in candidates[1:]:
+        if len(selected) >= k:
+            break
+        if cost > stretch * best_cost or len(set(path)) != len(path):
+            continue
+        if any(_shared_cost(compiled, path, edges) > max_sharing * cost for edges in selected_edges):
+            continue
+        prefix = _prefix_costs(compiled, path)
+        if not _is_locally_optimal(compiled, path, prefix, best_edges, local_optimality * best_cost):
+            continue
+        selected.append((cost, path))
+        selected_edges.append(_edge_set(path))
+    return selected[:1] + sorted(selected[1:], key=lambda route: route[0])
+
+def plateau_alternatives(compiled, source, target, k=3, stretch=1.25, max_sharing=0.8, local_optimality=0.25):
+    """
+    Đường thay thế theo phương pháp plateau.
+
+    Tính cây đường đi ngắn nhất tiến từ nguồn và cây lùi từ đích (hai lần Dijkstra). Plateau
+    là chuỗi cạnh nằm trên cả hai cây; mỗi plateau a..b cho một đường nguồn -> a -> b -> đích
+    mà mọi đoạn con dài tới độ dài plateau đều tối ưu. Plateau dài được ưu tiên.
+
+    Returns:
+    - Danh sách tối đa k tuple (chi phí, đường đi theo chỉ số); phần tử đầu là đường tối ưu.
+    """
+    if source == target:
+        return [(0.0, [source])]
+    from_source, parent = _shortest_path_tree(compiled, source)
+    to_target, successor = _shortest_path_tree(compiled.reverse(), target)
+    best = from_source[target]
+    if best == float('inf'):
+        return []
+    limit = stretch * best
+
+    def on_plateau(u):
+        v = successor[u]
+        return v != -1 and parent[v] == u
+
+    plateaus = []
+    for a in range(compiled.num_nodes):
+        if from_source[a] + to_target[a] > limit or not on_plateau(a):
+            continue
+        previous = parent[a]
+        if previous != -1 and successor[previous] == a:
+            continue  # a nằm giữa một plateau, plateau được xét từ nút đầu
+        b = a
+        while on_plateau(b):
+            b = successor[b]
+        plateaus.append((from_source[b] - from_source[a], from_source[a] + to_target[a], a, b))
+
+    plateaus.sort(key=lambda plateau: (-plateau[0], plateau[1]))
+    # Đường tối ưu luôn đứng đầu, kể cả khi hai cây chọn khác nhau giữa các đường bằng chi phí
+    candidates = [(best, _tree_path(parent, target)[::-1])]
+    for _, cost, a, b in plateaus:
+        # Nguồn -> a theo cây tiến, a -> b -> đích theo cây lùi
+        path = _tree_path(parent, a)[::-1][:-1] + _tree_path(successor, a)
+        candidates.append((cost, path))
+    return _select(compiled, candidates, k, stretch, max_sharing, local_optimality)
+
+def penalty_alternatives(compiled, source, target, k=3, stretch=1.25, max_sharing=0.8, local_optimality=0.25,
+                         penalty=1.4, max_iterations=None):
+    """
+    Đường thay thế theo phương pháp phạt: sau mỗi lần tìm đường, tăng trọng số các cạnh trên
+    đường vừa tìm penalty lần rồi tìm lại. Các đường mới được đánh giá bằng chi phí thật.
+
+    Returns:
+    - Danh sách tối đa k tuple (chi phí, đường đi theo chỉ số); phần tử đầu là đường tối ưu.
+    """
+    if source == target:
+        return [(0.0, [source])]
+    indptr, indices, weights = compiled.lists()
+    penalized = list(weights)
+    max_iterations = max_iterations or 4 * k
+    candidates, seen = [], set()
+    heappop, heappush = heapq.heappop, heapq.heappush
+    inf = float('inf')
+    for _ in range(max_iterations):
+        distances = {source: 0.0}
+        parent = {source: (-1, -1)}
+        queue = [(0.0, source)]
+        while queue:
+            distance, node = heappop(queue)
+            if node == target:
+                break
+            if distance > distances[node]:
+                continue
+            for e in range(indptr[node], indptr[node + 1]):
+                neighbor = indices[e]
+                new_distance = distance + penalized[e]
+                if new_distance < distances.get(neighbor, inf):
+                    distances[neighbor] = new_distance
+                    parent[neighbor] = (node, e)
+                    heappush(queue, (new_distance, neighbor))
+        if target not in parent:
+            return []
+        path, edges, node = [], [], target
+        while node != -1:
+            path.append(node)
+            node, e = parent[node]
+            if e != -1:
+                edges.append(e)
+        path.reverse()
+        for e in edges:
+            penalized[e] *= penalty
+        key = tuple(path)
+        if key not in seen:
+            seen.add(key)
+            candidates.append((sum(weights[e] for e in edges), path))
+            if len(_select(compiled, candidates, k, stretch, max_sharing, local_optimality)) >= k:
+                break
+    return _select(compiled, candidates, k, stretch, max_sharing, local_optimality)
+
+def k_shortest_paths(graph, start, end, k=3, weight='length'):
+    """
+    Tìm k đường đi ngắn nhất không lặp từ start tới end.
+
+    Parameters:
+    - graph: Đồ thị dưới dạng đối tượng NetworkX
+    - start: Nút bắt đầu
+    - end: Nút kết thúc
+    - k: Số đường cần tìm
+    - weight: Thuộc tính của cạnh dùng làm trọng số (mặc định là 'length')
+
+    Returns:
+    - Danh sách tuple (chi phí, đường đi) tăng dần theo chi phí. Không có đường thì danh sách rỗng.
+    """
+    compiled = get_compiled(graph, weight)
+    results = yen_k_shortest(compiled, compiled.index[start], compiled.index[end], k)
+    return [(cost, compiled.to_ids(path)) for cost, path in results]
+
+ALTERNATIVE_METHODS = {'plateau': plateau_alternatives, 'penalty': penalty_alternatives}
+
+def alternative_routes(graph, start, end, k=3, weight='length', method='plateau', stretch=1.25, max_sharing=0.8,
+                       local_optimality=0.25):
+    """
+    Tìm tối đa k đường đi khác biệt rõ rệt, hợp lý để đưa cho người dùng lựa chọn.
+
+    Khác với k đường ngắn nhất (thường chỉ lệch nhau vài cạnh), mỗi đường thay thế phải đủ
+    ngắn, ít trùng với các đường đã chọn và không chứa đường vòng vô lý.
+
+    Parameters:
+    - graph: Đồ thị dưới dạng đối tượng NetworkX
+    - start: Nút bắt đầu
+    - end: Nút kết thúc
+    - k: Số đường tối đa (kể cả đường tối ưu)
+    - weight: Thuộc tính của cạnh dùng làm trọng số (mặc định là 'length')
+    - method: 'plateau' (hai lần Dijkstra, nhanh) hoặc 'penalty' (tìm lại với cạnh bị phạt)
+    - stretch: Chi phí tối đa so với đường tối ưu
+    - max_sharing: Tỉ lệ chi phí tối đa được trùng với mỗi đường đã chọn
+    - local_optimality: Độ dài đoạn T-test, tính theo tỉ lệ chi phí tối ưu
+
+    Returns:
+    - Danh sách tuple (chi phí, đường đi); phần tử đầu là đường tối ưu. Không có đường thì danh sách rỗng.
+    """
+    if method not in ALTERNATIVE_METHODS:
+        raise ValueError(f"Phương pháp không hỗ trợ: {method}. Chọn 'plateau' hoặc 'penalty'.")
+    compiled = get_compiled(graph, weight)
+    results = ALTERNATIVE_METHODS[method](compiled, compiled.index[start], compiled.index[end], k=k,
+                                          stretch=stretch, max_sharing=max_sharing,
+                                          local_optimality=local_optimality)
+    return [(cost, compiled.to_ids(path)) for cost, path in results]
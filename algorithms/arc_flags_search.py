@@ -0,0 +1,110 @@
+# algorithms/arc_flags_search.py
+
+import heapq
+import math
+from algorithms import register_algorithm
+from loader.arc_flags import get_arc_flags
+from loader.spatial_index import EARTH_RADIUS_M
+
+def _flagged_search(arc_flags, source, target, heuristic=None):
+    """
+    Dijkstra/A* trên CompiledGraph chỉ duyệt các cạnh có cờ của vùng chứa đích.
+
+    Returns:
+    - Tuple (chi phí, đường đi theo chỉ số). Không tìm thấy đường thì (inf, []).
+    """
+    compiled = arc_flags.compiled
+    indptr, indices, weights = compiled.lists()
+    region, flags = arc_flags.lists()
+    bit = 1 << region[target]
+    distances = {source: 0.0}
+    parent = {source: -1}
+    queue = [(heuristic(source) if heuristic else 0.0, 0.0, source)]
+    heappop, heappush = heapq.heappop, heapq.heappush
+    inf = float('inf')
+
+    while queue:
+        _, distance, node = heappop(queue)
+        if node == target:
+            path = []
+            while node != -1:
+                path.append(node)
+                node = parent[node]
+            return distance, path[::-1]
+        if distance > distances[node]:
+            continue
+        for k in range(indptr[node], indptr[node + 1]):
+            if not flags[k] & bit:
+                continue
+            neighbor = indices[k]
+            new_distance = distance + weights[k]
+            if new_distance < distances.get(neighbor, inf):
+                distances[neighbor] = new_distance
+                parent[neighbor] = node
+                priority = new_distance + heuristic(neighbor) if heuristic else new_distance
+                heappush(queue, (priority, new_distance, neighbor))
+    return inf, []
+
+def _haversine_heuristic(compiled, target):
+    # Khoảng cách đường tròn lớn là cận dưới của độ dài đường đi (độ dài cạnh OSM tính theo mét)
+    xs, ys = compiled.x, compiled.y
+    lat2, lon2 = math.radians(ys[target]), math.radians(xs[target])
+    cos_lat2 = math.cos(lat2)
+    # Nhân 0.999 để bù sai số làm tròn, giữ heuristic luôn chấp nhận được
+    scale = 2 * EARTH_RADIUS_M * 0.999
+
+    def heuristic(node):
+        lat1, lon1 = math.radians(ys[node]), math.radians(xs[node])
+        a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * cos_lat2 * math.sin((lon2 - lon1) / 2) ** 2
+        return scale * math.asin(min(1.0, math.sqrt(a)))
+
+    return heuristic
+
+def arc_flags_dijkstra(graph, start, end, weight='length'):
+    """
+    Tìm đường đi ngắn nhất bằng Dijkstra có cắt tỉa theo arc flags.
+
+    Cờ cung được lấy từ graph.graph['preprocessing']['arc_flags'] (xem loader/arc_flags.py);
+    nếu chưa có thì được tính ở lần gọi đầu, việc này có thể mất nhiều thời gian (gọi
+    loader.preprocess.prepare() trước để tách bước này khỏi truy vấn).
+
+    Parameters:
+    - graph: Đồ thị dưới dạng đối tượng NetworkX
+    - start: Nút bắt đầu
+    - end: Nút kết thúc
+    - weight: Thuộc tính của cạnh dùng làm trọng số (mặc định là 'length')
+
+    Returns:
+    - Danh sách các nút đại diện cho đường đi ngắn nhất. Nếu không tìm thấy đường, trả về danh sách rỗng.
+    """
+    arc_flags = get_arc_flags(graph, weight)
+    compiled = arc_flags.compiled
+    _, path = _flagged_search(arc_flags, compiled.index[start], compiled.index[end])
+    return compiled.to_ids(path)
+
+register_algorithm('Arc-Flags Dijkstra', arc_flags_dijkstra)
+
+def arc_flags_a_star(graph, start, end, weight='length'):
+    """
+    Tìm đường đi ngắn nhất bằng A* có cắt tỉa theo arc flags.
+
+    Heuristic là khoảng cách đường tròn lớn tới đích, chỉ dùng khi trọng số là 'length'
+    (với trọng số khác, thuật toán chạy như Arc-Flags Dijkstra).
+
+    Parameters:
+    - graph: Đồ thị dưới dạng đối tượng NetworkX
+    - start: Nút bắt đầu
+    - end: Nút kết thúc
+    - weight: Thuộc tính của cạnh dùng làm trọng số (mặc định là 'length')
+
+    Returns:
+    - Danh sách các nút đại diện cho đường đi ngắn nhất. Nếu không tìm thấy đường, trả về danh sách rỗng.
+    """
+    arc_flags = get_arc_flags(graph, weight)
+    compiled = arc_flags.compiled
+    source, target = compiled.index[start], compiled.index[end]
+    heuristic = _haversine_heuristic(compiled, target) if weight == 'length' else None
+    _, path = _flagged_search(arc_flags, source, target, heuristic)
+    return compiled.to_ids(path)
+
+register_algorithm('Arc-Flags A*', arc_flags_a_star)
@@ -0,0 +1,154 @@
+# algorithms/auto_router.py
+
+import math
+import weakref
+from typing import List, Optional, Tuple
+from algorithms import ALGORITHMS, register_algorithm
+
+# Bounding box của từng đồ thị đã định tuyến: {đồ thị: (số nút, bbox)}. Giữ ở đây thay vì trong
+# graph.graph để không để lại khóa ẩn trên đồ thị của người gọi (sẽ bị ghi ra khi lưu GraphML);
+# tính lại khi số nút thay đổi
+_BBOXES = weakref.WeakKeyDictionary()
+
+def available_preprocessing(graph):
+    """
+    Các khóa dữ liệu tiền xử lý đã được gắn vào đồ thị (graph.graph['preprocessing']).
+    """
+    return set(graph.graph.get('preprocessing', {}))
+
+def _has_coordinates(graph, *nodes):
+    return all('x' in graph.nodes[node] and 'y' in graph.nodes[node] for node in nodes)
+
+def _query_ratio(graph, start, end):
+    """
+    Khoảng cách Euclidean giữa hai nút so với đường chéo của bounding box đồ thị (0..1).
+    """
+    num_nodes = graph.number_of_nodes()
+    cached = _BBOXES.get(graph)
+    if cached is not None and cached[0] == num_nodes:
+        bbox = cached[1]
+    else:
+        xs = [data['x'] for _, data in graph.nodes(data=True)]
+        ys = [data['y'] for _, data in graph.nodes(data=True)]
+        bbox = (min(xs), min(ys), max(xs), max(ys))
+        _BBOXES[graph] = (num_nodes, bbox)
+    diagonal = math.hypot(bbox[2] - bbox[0], bbox[3] - bbox[1])
+    if diagonal == 0:
+        return 1.0
+    a, b = graph.nodes[start], graph.nodes[end]
+    return min(1.0, math.hypot(a['x'] - b['x'], a['y'] - b['y']) / diagonal)
+
+def estimate_cost(spec, num_nodes, num_edges, ratio=1.0):
+    """
+    Ước lượng chi phí tương đối của một truy vấn theo mô hình chi phí trong metadata.
+
+    Parameters:
+    - spec: AlgorithmSpec của thuật toán
+    - num_nodes, num_edges: Kích thước đồ thị
+    - ratio: Khoảng cách truy vấn so với đường chéo đồ thị (0..1)
+
+    Returns:
+    - Chi phí ước lượng (đơn vị tùy ý, chỉ dùng để so sánh).
+    """
+    log_n = math.log2(max(num_nodes, 2))
+    if spec.complexity == 'lookup':
+        base = math.sqrt(num_nodes)
+    elif spec.complexity == 'quadratic':
+        # Bellman-Ford dừng sớm khi không còn cập nhật: khoảng (đường kính theo số cạnh) lần duyệt cạnh
+        base = num_edges * math.sqrt(num_nodes)
+    elif spec.complexity == 'global':
+        base = (num_nodes + num_edges) * log_n
+    else:
+        # Tìm kiếm cục bộ duyệt một "đĩa" quanh nút nguồn có bán kính bằng khoảng cách truy vấn
+        explored = min(1.0, max(0.01, math.pi * ratio * ratio))
+        base = explored * (num_nodes + num_edges) * log_n
+    return spec.cost_factor * base
+
+def rank_algorithms(graph, start=None, end=None, weight='length', require_optimal=True,
+                    allow_randomized=False) -> List[Tuple[float, str]]:
+    """
+    Xếp hạng các thuật toán dùng được cho truy vấn, từ nhanh nhất đến chậm nhất.
+
+    Một thuật toán bị loại nếu: không tối ưu khi require_optimal, bỏ qua trọng số khi truy vấn
+    có trọng số, cần tọa độ mà đồ thị không có, cần tiền xử lý chưa có, vượt max_nodes, có
+    giới hạn số bước (có thể trả về rỗng dù có đường) hoặc ngẫu nhiên khi không cho phép.
+
+    Returns:
+    - Danh sách (chi phí ước lượng, tên thuật toán) đã sắp xếp.
+    """
+    num_nodes = graph.number_of_nodes()
+    num_edges = graph.number_of_edges()
+    preprocessing = available_preprocessing(graph)
+    has_coordinates = start is None or _has_coordinates(graph, start, end)
+    ratio = _query_ratio(graph, start, end) if start is not None and has_coordinates else 1.0
+
+    ranking = []
+    for name, entry in ALGORITHMS.items():
+        spec = entry.spec
+        if spec.module == __name__.rpartition('.')[2]:
+            continue
+        if require_optimal and not spec.optimal:
+            continue
+        if weight is not None and not spec.uses_weight:
+            continue
+        if spec.needs_coordinates and not has_coordinates:
+            continue
+        if spec.preprocessing is not None and spec.preprocessing not in preprocessing:
+            continue
+        if spec.max_nodes is not None and num_nodes > spec.max_nodes:
+            continue
+        if spec.step_limit is not None and require_optimal:
+            continue
+        if spec.randomized and not allow_randomized:
+            continue
+        ranking.append((estimate_cost(spec, num_nodes, num_edges, ratio), name))
+    ranking.sort()
+    return ranking
+
+def select_algorithm(graph, start=None, end=None, weight='length', require_optimal=True) -> Optional[str]:
+    """
+    Chọn thuật toán nhanh nhất mà vẫn đúng cho truy vấn.
+
+    Returns:
+    - Tên thuật toán trong ALGORITHMS, hoặc None nếu không có thuật toán phù hợp.
+    """
+    ranking = rank_algorithms(graph, start, end, weight=weight, require_optimal=require_optimal)
+    return ranking[0][1] if ranking else None
+
+def select_one_to_many(weight='length', require_optimal=True) -> Optional[str]:
+    """
+    Chọn thuật toán có hàm một-nhiều (dùng cho gom lô truy vấn chung nút nguồn).
+
+    Returns:
+    - Tên thuật toán trong ALGORITHMS, hoặc None nếu không có thuật toán phù hợp.
+    """
+    candidates = [
+        (entry.spec.cost_factor, name) for name, entry in ALGORITHMS.items()
+        if entry.spec.one_to_many is not None
+        and entry.spec.preprocessing is None
+        and (entry.spec.optimal or not require_optimal)
+        and (entry.spec.uses_weight or weight is None)
+    ]
+    return min(candidates)[1] if candidates else None
+
+def auto(graph, start, end, weight='length', **kwargs):
+    """
+    Tìm đường đi bằng thuật toán được chọn tự động theo kích thước đồ thị, khoảng cách
+    truy vấn và dữ liệu tiền xử lý có sẵn.
+
+    Parameters:
+    - graph: Đồ thị dưới dạng đối tượng NetworkX
+    - start: Nút bắt đầu
+    - end: Nút kết thúc
+    - weight: Trọng số cạnh (mặc định 'length')
+
+    Returns:
+    - Danh sách các nút đại diện cho đường đi ngắn nhất. Nếu không tìm thấy đường, trả về danh sách rỗng.
+    """
+    name = select_algorithm(graph, start, end, weight=weight)
+    if name is None:
+        raise ValueError("Không có thuật toán phù hợp cho truy vấn.")
+    return ALGORITHMS[name]['func'](graph, start, end, weight=weight, **kwargs)
+
+# Đăng ký thuật toán vào registry
+register_algorithm('Auto', auto)
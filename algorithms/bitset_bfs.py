@@ -0,0 +1,259 @@
+# algorithms/bitset_bfs.py
+
+import networkx as nx
+import numpy as np
+
+from loader.compiled import get_compiled
+
+# Đặt False để bfs() luôn dùng bản Python thuần
+ENABLED = True
+
+# Dưới số nút này chi phí cố định của mỗi bước numpy lớn hơn vòng lặp Python, bfs() giữ bản Python
+MIN_NODES = 20000
+
+_ONE = np.uint64(1)
+
+def _test(words, nodes):
+    # Bit của từng nút trong bitmap (mảng uint64, nút i là bit i % 64 của từ i // 64)
+    return ((words[nodes >> 6] >> (nodes & 63).astype(np.uint64)) & _ONE).astype(np.bool_)
+
+def _set(words, nodes):
+    # Bật bit của các nút đã sắp xếp tăng dần: gộp các bit cùng từ bằng reduceat rồi OR một lần
+    if not len(nodes):
+        return
+    word = nodes >> 6
+    starts = np.flatnonzero(word[1:] != word[:-1]) + 1
+    starts = np.concatenate(([0], starts))
+    words[word[starts]] |= np.bitwise_or.reduceat(_ONE << (nodes & 63).astype(np.uint64), starts)
+
+def _first_unique(values):
+    # Các giá trị khác nhau đã sắp xếp và vị trí xuất hiện đầu tiên của mỗi giá trị (như np.unique
+    # với return_index nhưng không qua lớp bọc tổng quát của numpy)
+    order = np.argsort(values, kind='stable')
+    ordered = values[order]
+    first = np.concatenate(([True], ordered[1:] != ordered[:-1])) if len(ordered) else np.empty(0, dtype=np.bool_)
+    return ordered[first], order[first]
+
+def _gather(indptr, indices, nodes):
+    # Mọi cạnh ra của các nút: (đầu còn lại, nút sở hữu cạnh), không có vòng lặp Python
+    starts = indptr[nodes]
+    counts = indptr[nodes + 1] - starts
+    ends = np.cumsum(counts)
+    total = int(ends[-1]) if len(ends) else 0
+    if total == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    positions = np.repeat(starts - ends + counts, counts) + np.arange(total, dtype=np.int64)
+    return indices[positions].astype(np.int64), np.repeat(nodes, counts)
+
+class _Side:
+    # Trạng thái của một chiều tìm kiếm: bitmap đã thăm, frontier và các tầng (nút, cha) theo số cạnh
+    def __init__(self, engine, source, forward):
+        self.out_csr = engine.forward if forward else engine.backward
+        self.in_csr = engine.backward if forward else engine.forward
+        self.out_degree = engine.out_degree if forward else engine.in_degree
+        self.in_degree = engine.in_degree if forward else engine.out_degree
+        self.num_nodes = engine.num_nodes
+        self.visited = np.zeros((engine.num_nodes + 63) >> 6, dtype=np.uint64)
+        self.frontier = np.array([source], dtype=np.int64)
+        self.levels = [(self.frontier, self.frontier)]
+        self.frontier_edges = int(self.out_degree[source])
+        _set(self.visited, self.frontier)
+        # Số cạnh vào của các nút chưa thăm, chi phí của một bước bottom-up
+        self.unexplored = int(len(engine.forward[1])) - int(self.in_degree[source])
+        self.bottom_up_steps = 0
+
+    def step(self, alpha, beta):
+        """
+        Mở rộng một tầng. Bottom-up khi frontier có nhiều cạnh ra hơn unexplored / alpha và
+        còn lớn hơn num_nodes / beta (heuristic của Beamer), ngược lại top-down.
+        """
+        if self.frontier_edges * alpha > self.unexplored and len(self.frontier) * beta > self.num_nodes:
+            new, parents = self._bottom_up()
+            self.bottom_up_steps += 1
+        else:
+            new, parents = self._top_down()
+        _set(self.visited, new)
+        self.unexplored -= int(self.in_degree[new].sum())
+        self.frontier = new
+        self.frontier_edges = int(self.out_degree[new].sum())
+        if len(new):
+            self.levels.append((new, parents))
+        return new
+
+    def _top_down(self):
+        # Duyệt cạnh ra của frontier, giữ đích chưa thăm, khử trùng và sắp xếp
+        neighbors, parents = _gather(*self.out_csr, self.frontier)
+        fresh = ~_test(self.visited, neighbors)
+        new, first = _first_unique(neighbors[fresh])
+        return new, parents[fresh][first]
+
+    def _bottom_up(self):
+        # Mỗi nút chưa thăm tìm trong cạnh vào một nút thuộc frontier; frontier được đóng thành bitmap
+        frontier_bits = np.zeros_like(self.visited)
+        _set(frontier_bits, self.frontier)
+        seen = np.unpackbits(self.visited.astype('<u8').view(np.uint8), bitorder='little')[:self.num_nodes]
+        unvisited = np.flatnonzero(seen == 0)
+        predecessors, owners = _gather(*self.in_csr, unvisited)
+        hit = _test(frontier_bits, predecessors)
+        new, first = _first_unique(owners[hit])
+        return new, predecessors[hit][first]
+
+    def level_of(self, node, last):
+        # Tầng chứa node, tìm ngược từ tầng last
+        for level in range(last, -1, -1):
+            nodes = self.levels[level][0]
+            position = np.searchsorted(nodes, node)
+            if position < len(nodes) and nodes[position] == node:
+                return level
+        return -1
+
+    def trace(self, node, level):
+        # Các nút từ node (ở tầng level) về nguồn của chiều này
+        path = [int(node)]
+        for level in range(level, 0, -1):
+            nodes, parents = self.levels[level]
+            node = parents[np.searchsorted(nodes, node)]
+            path.append(int(node))
+        return path
+
+class BitsetBFS:
+    """
+    BFS không trọng số trên CompiledGraph: tập đã thăm là bitmap uint64, mỗi tầng được mở
+    rộng bằng các phép toán mảng numpy thay vì vòng lặp Python theo từng nút.
+
+    Mỗi bước chọn top-down (duyệt cạnh ra của frontier) hoặc bottom-up (mỗi nút chưa thăm
+    tìm cha trong frontier qua cạnh vào) theo heuristic direction-optimizing của Beamer.
+    Các tầng được lưu dưới dạng mảng (nút đã sắp xếp, cha), nên khôi phục đường đi không cần
+    mảng cha kích thước n và chi phí một truy vấn tỉ lệ với phần đồ thị đã duyệt.
+
+    Parameters:
+    - compiled: CompiledGraph (trọng số không dùng tới)
+    - alpha, beta: Ngưỡng chuyển sang/ra khỏi bottom-up. Bottom-up ở đây không dừng sớm trong
+      từng nút như bản tuần tự nên alpha nhỏ hơn giá trị 14 của bài báo
+    """
+
+    def __init__(self, compiled, alpha=4.0, beta=24.0):
+        self.compiled = compiled
+        self.num_nodes = compiled.num_nodes
+        reverse = compiled.reverse()
+        self.forward = (compiled.indptr.astype(np.int64), compiled.indices)
+        self.backward = (reverse.indptr.astype(np.int64), reverse.indices)
+        self.out_degree = np.diff(self.forward[0])
+        self.in_degree = np.diff(self.backward[0])
+        self.alpha = alpha
+        self.beta = beta
+
+    def search(self, source, target=None, max_hops=None):
+        """
+        BFS một chiều từ source, dừng khi tới target (nếu có) hoặc sau max_hops tầng.
+
+        Returns:
+        - Danh sách tầng [(mảng nút, mảng cha), ...]; tầng k gồm các nút cách source k cạnh.
+        """
+        side = _Side(self, source, forward=True)
+        while len(side.frontier) and (max_hops is None or len(side.levels) <= max_hops):
+            side.step(self.alpha, self.beta)
+            if target is not None and _test(side.visited, np.array([target]))[0]:
+                break
+        return side.levels
+
+    def hop_distances(self, source, max_hops=None):
+        """
+        Số cạnh ít nhất từ source tới mọi nút.
+
+        Returns:
+        - Mảng int32 độ dài num_nodes, -1 với nút không tới được (hoặc xa hơn max_hops).
+        """
+        distances = np.full(self.num_nodes, -1, dtype=np.int32)
+        for hops, (nodes, _) in enumerate(self.search(source, max_hops=max_hops)):
+            distances[nodes] = hops
+        return distances
+
+    def within_hops(self, source, max_hops):
+        """
+        Mảng chỉ số các nút tới được từ source trong tối đa max_hops cạnh.
+        """
+        return np.concatenate([nodes for nodes, _ in self.search(source, max_hops=max_hops)])
+
+    def shortest_path(self, source, target):
+        """
+        BFS hai chiều: mỗi bước mở rộng một tầng của chiều có frontier ít cạnh hơn, dừng ở tầng
+        đầu tiên mà hai chiều gặp nhau.
+
+        Hai chiều mở rộng theo tầng, nên khi lần đầu gặp nhau sau khi chiều A lên tầng a + 1 và
+        chiều B đã xong tầng b, mọi đường ngắn nhất dài đúng a + b + 1 cạnh và nút gặp nào cũng
+        nằm trên một đường ngắn nhất.
+
+        Returns:
+        - Tuple (số cạnh, đường đi theo chỉ số); (-1, []) nếu không có đường.
+        """
+        if source == target:
+            return 0, [source]
+        forward = _Side(self, source, forward=True)
+        backward = _Side(self, target, forward=False)
+        while len(forward.frontier) and len(backward.frontier):
+            side, other = (forward, backward) if forward.frontier_edges <= backward.frontier_edges \
+                else (backward, forward)
+            new = side.step(self.alpha, self.beta)
+            meeting = new[_test(other.visited, new)]
+            if len(meeting):
+                node = meeting[0]
+                a = len(side.levels) - 1
+                b = other.level_of(node, len(other.levels) - 1)
+                head, tail = side.trace(node, a), other.trace(node, b)
+                if side is backward:
+                    head, tail = tail, head
+                return a + b, head[::-1] + tail[1:]
+        return -1, []
+
+def usable(graph):
+    """
+    Dùng engine cho đồ thị này không: chỉ với đồ thị NetworkX thật (đồ thị bọc bởi TracingGraph
+    cần thuật toán gọi graph.neighbors()) và đủ lớn để các bước mảng có lợi.
+    """
+    return ENABLED and isinstance(graph, nx.Graph) and graph.number_of_nodes() >= MIN_NODES
+
+def get_engine(graph):
+    """
+    Lấy BitsetBFS của đồ thị, tạo ở lần gọi đầu và lưu trong graph.graph['_bitset_bfs'].
+    """
+    compiled = get_compiled(graph, None)
+    engine = graph.graph.get('_bitset_bfs')
+    if engine is None or engine.compiled is not compiled:
+        engine = graph.graph['_bitset_bfs'] = BitsetBFS(compiled)
+    return engine
+
+def bfs_path(graph, start, end):
+    """
+    Đường đi ít cạnh nhất bằng BFS hai chiều trên bitmap.
+
+    Returns:
+    - Danh sách id nút, rỗng nếu không có đường.
+    """
+    engine = get_engine(graph)
+    index = engine.compiled.index
+    _, path = engine.shortest_path(index[start], index[end])
+    return engine.compiled.to_ids(path) if path else []
+
+def hop_count(graph, start, end):
+    """
+    Số cạnh ít nhất giữa hai nút (BFS hai chiều), -1 nếu không có đường.
+    """
+    engine = get_engine(graph)
+    index = engine.compiled.index
+    hops, _ = engine.shortest_path(index[start], index[end])
+    return hops
+
+def hop_distances(graph, start, max_hops=None):
+    """
+    Số cạnh ít nhất từ start tới mọi nút tới được (trong tối đa max_hops cạnh).
+
+    Returns:
+    - Dict {id nút: số cạnh}.
+    """
+    engine = get_engine(graph)
+    result = {}
+    for hops, (nodes, _) in enumerate(engine.search(engine.compiled.index[start], max_hops=max_hops)):
+        result.update(dict.fromkeys(engine.compiled.to_ids(nodes), hops))
+    return result
@@ -1,4 +1,4 @@
-from algorithms import register_algorithm
+from algorithms import bitset_bfs, kernels, register_algorithm
 from collections import deque
 
 def bfs(graph, start, end, weight=None):
@@ -13,6 +13,13 @@ def bfs(graph, start, end, weight=None):
     Returns:
     - Danh sách các nút đại diện cho đường đi. Nếu không tìm thấy đường, trả về danh sách rỗng.
     """
+    # Có numba thì chạy kernel biên dịch trên mảng CSR (xem algorithms/kernels.py)
+    if kernels.accelerated(graph):
+        return kernels.bfs_path(graph, start, end)
+    # Đồ thị lớn không có numba: BFS hai chiều trên bitmap bằng các phép toán mảng (xem algorithms/bitset_bfs.py)
+    if bitset_bfs.usable(graph):
+        return bitset_bfs.bfs_path(graph, start, end)
+
     queue = deque([start])
     visited = {start}
     previous = {start: None}
@@ -0,0 +1,129 @@
+# algorithms/crp_search.py
+
+import heapq
+from algorithms import register_algorithm
+from loader.crp import get_crp, overlay_arcs
+
+def _unpack_arc(partition, metric, level, u, v):
+    """
+    Khôi phục đoạn đường gốc của một cung clique u -> v ở mức level.
+
+    Tìm đường từ u tới v trên overlay mức level - 1 trong cùng ô, rồi mở đệ quy các cung
+    clique của mức dưới, nên mỗi bước chỉ duyệt nút biên của các ô con thay vì cả ô lớn.
+    """
+    cell = partition.cells[level]
+    c = cell[u]
+    distances = {u: 0.0}
+    parent = {u: -1}
+    queue = [(0.0, u)]
+    while queue:
+        distance, node = heapq.heappop(queue)
+        if node == v:
+            break
+        if distance > distances[node]:
+            continue
+        for neighbor, cost in overlay_arcs(partition, metric, level - 1, node):
+            if cell[neighbor] != c:
+                continue
+            new_distance = distance + cost
+            if new_distance < distances.get(neighbor, float('inf')):
+                distances[neighbor] = new_distance
+                parent[neighbor] = node
+                heapq.heappush(queue, (new_distance, neighbor))
+    nodes = []
+    node = v
+    while node != -1:
+        nodes.append(node)
+        node = parent[node]
+    nodes.reverse()
+    return _unpack_arcs(partition, metric, [(a, b, level - 1) for a, b in zip(nodes[:-1], nodes[1:])])
+
+def _unpack_arcs(partition, metric, arcs):
+    # Cung mức l > 0 nối hai nút cùng ô mức l là cung clique; ngược lại là cạnh gốc
+    path = []
+    for u, v, level in arcs:
+        if level > 0 and partition.cells[level][u] == partition.cells[level][v]:
+            path.extend(_unpack_arc(partition, metric, level, u, v))
+        else:
+            path.append(v)
+    return path
+
+def crp_query(partition, metric, source, target):
+    """
+    Tìm kiếm hai chiều nhiều mức trên overlay CRP.
+
+    Mỗi nút được duyệt ở mức cao nhất mà ô của nó không chứa nguồn lẫn đích, nên chỉ các ô
+    chứa nguồn và đích được duyệt trên cạnh gốc; phần còn lại đi qua clique của các ô lớn.
+
+    Returns:
+    - Tuple (chi phí, đường đi theo chỉ số của CompiledGraph). Không có đường thì (inf, []).
+    """
+    inf = float('inf')
+    if source == target:
+        return 0.0, [source]
+    distances = ({source: 0.0}, {target: 0.0})
+    # parent[node] = (nút trước, mức của cung)
+    parents = ({source: (-1, 0)}, {target: (-1, 0)})
+    queues = ([(0.0, source)], [(0.0, target)])
+    best, meeting = inf, None
+
+    while queues[0] and queues[1]:
+        if queues[0][0][0] + queues[1][0][0] >= best:
+            break
+        side = 0 if queues[0][0][0] <= queues[1][0][0] else 1
+        distance, node = heapq.heappop(queues[side])
+        if distance > distances[side][node]:
+            continue
+        level = partition.query_level(node, source, target)
+        other = distances[1 - side]
+        for neighbor, cost in overlay_arcs(partition, metric, level, node, reverse=(side == 1)):
+            new_distance = distance + cost
+            if new_distance < distances[side].get(neighbor, inf):
+                distances[side][neighbor] = new_distance
+                parents[side][neighbor] = (node, level)
+                heapq.heappush(queues[side], (new_distance, neighbor))
+                if neighbor in other and new_distance + other[neighbor] < best:
+                    best, meeting = new_distance + other[neighbor], neighbor
+
+    if meeting is None:
+        return inf, []
+
+    # Ghép hai nửa đường đi, mở các cung clique thành đoạn đường gốc
+    forward = []
+    node = meeting
+    while node != -1:
+        forward.append((node, parents[0][node]))
+        node = parents[0][node][0]
+    forward.reverse()
+    arcs = [(prev, node, level) for node, (prev, level) in forward if prev != -1]
+    node = meeting
+    while parents[1][node][0] != -1:
+        succ, level = parents[1][node]
+        arcs.append((node, succ, level))
+        node = succ
+
+    return best, [source] + _unpack_arcs(partition, metric, arcs)
+
+def crp(graph, start, end, weight='length'):
+    """
+    Tìm đường đi ngắn nhất bằng Customizable Route Planning.
+
+    Phân vùng được tạo một lần cho đồ thị; mỗi trọng số mới chỉ cần một bước customization
+    (tính lại clique của các ô), sau đó truy vấn chỉ duyệt ô chứa nguồn, ô chứa đích và
+    overlay của các ô còn lại.
+
+    Parameters:
+    - graph: Đồ thị dưới dạng đối tượng NetworkX
+    - start: Nút bắt đầu
+    - end: Nút kết thúc
+    - weight: Thuộc tính của cạnh dùng làm trọng số (mặc định là 'length')
+
+    Returns:
+    - Danh sách các nút đại diện cho đường đi ngắn nhất. Nếu không tìm thấy đường, trả về danh sách rỗng.
+    """
+    index, metric = get_crp(graph, weight)
+    compiled = metric.compiled
+    _, path = crp_query(index.partition, metric, compiled.index[start], compiled.index[end])
+    return compiled.to_ids(path)
+
+register_algorithm('CRP', crp)
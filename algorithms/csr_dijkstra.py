@@ -0,0 +1,150 @@
+# algorithms/csr_dijkstra.py
+
+import heapq
+from algorithms import register_algorithm
+from loader.compiled import get_compiled
+
+def _unwind(parent, node):
+    path = []
+    while node != -1:
+        path.append(node)
+        node = parent[node]
+    return path[::-1]
+
+def csr_shortest_path(compiled, source, target):
+    """
+    Dijkstra trên CompiledGraph, làm việc trực tiếp với chỉ số nút.
+
+    Parameters:
+    - compiled: Đối tượng CompiledGraph
+    - source, target: Chỉ số nút bắt đầu và kết thúc
+
+    Returns:
+    - Tuple (chi phí, đường đi theo chỉ số). Không tìm thấy đường thì (inf, []).
+    """
+    indptr, indices, weights = compiled.lists()
+    distances = {source: 0.0}
+    parent = {source: -1}
+    queue = [(0.0, source)]
+    heappop, heappush = heapq.heappop, heapq.heappush
+
+    while queue:
+        distance, node = heappop(queue)
+        if node == target:
+            return distance, _unwind(parent, target)
+        if distance > distances[node]:
+            continue
+        for k in range(indptr[node], indptr[node + 1]):
+            neighbor = indices[k]
+            new_distance = distance + weights[k]
+            if new_distance < distances.get(neighbor, float('inf')):
+                distances[neighbor] = new_distance
+                parent[neighbor] = node
+                heappush(queue, (new_distance, neighbor))
+    return float('inf'), []
+
+def csr_one_to_many(compiled, source, targets):
+    """
+    Dijkstra một-nhiều trên CompiledGraph, dừng khi mọi đích đã được cố định.
+
+    Returns:
+    - Dict {chỉ số đích: (chi phí, đường đi theo chỉ số)}.
+    """
+    indptr, indices, weights = compiled.lists()
+    remaining = set(targets)
+    distances = {source: 0.0}
+    parent = {source: -1}
+    settled = set()
+    queue = [(0.0, source)]
+    heappop, heappush = heapq.heappop, heapq.heappush
+
+    while queue and remaining:
+        distance, node = heappop(queue)
+        if node in settled:
+            continue
+        settled.add(node)
+        remaining.discard(node)
+        for k in range(indptr[node], indptr[node + 1]):
+            neighbor = indices[k]
+            new_distance = distance + weights[k]
+            if new_distance < distances.get(neighbor, float('inf')):
+                distances[neighbor] = new_distance
+                parent[neighbor] = node
+                heappush(queue, (new_distance, neighbor))
+
+    return {
+        target: (distances[target], _unwind(parent, target)) if target in settled else (float('inf'), [])
+        for target in targets
+    }
+
+def array_one_to_many(indptr, indices, weights, source, targets):
+    """
+    Như csr_one_to_many nhưng đọc thẳng các mảng CSR numpy (ví dụ view chỉ đọc trên shared
+    memory). Hàng CSR của một nút chỉ được chuyển thành list khi nút đó được cố định, nên bộ
+    nhớ tỉ lệ với phần đồ thị đã duyệt, không có bản sao list của cả đồ thị như CompiledGraph.lists().
+
+    Returns:
+    - Dict {chỉ số đích: (chi phí, đường đi theo chỉ số)}.
+    """
+    remaining = set(targets)
+    distances = {source: 0.0}
+    parent = {source: -1}
+    settled = set()
+    queue = [(0.0, source)]
+    heappop, heappush = heapq.heappop, heapq.heappush
+
+    while queue and remaining:
+        distance, node = heappop(queue)
+        if node in settled:
+            continue
+        settled.add(node)
+        remaining.discard(node)
+        start, end = int(indptr[node]), int(indptr[node + 1])
+        for neighbor, weight in zip(indices[start:end].tolist(), weights[start:end].tolist()):
+            new_distance = distance + weight
+            if new_distance < distances.get(neighbor, float('inf')):
+                distances[neighbor] = new_distance
+                parent[neighbor] = node
+                heappush(queue, (new_distance, neighbor))
+
+    return {
+        target: (distances[target], _unwind(parent, target)) if target in settled else (float('inf'), [])
+        for target in targets
+    }
+
+def csr_dijkstra(graph, start, end, weight='length'):
+    """
+    Tìm đường đi ngắn nhất bằng Dijkstra trên đồ thị đã biên dịch sang mảng CSR.
+
+    Lần gọi đầu biên dịch đồ thị (đánh số lại nút theo đường cong Hilbert) và lưu lại;
+    các lần sau chỉ duyệt mảng, không qua lớp dict lồng nhau của NetworkX.
+
+    Parameters:
+    - graph: Đồ thị dưới dạng đối tượng NetworkX
+    - start: Nút bắt đầu
+    - end: Nút kết thúc
+    - weight: Thuộc tính của cạnh dùng làm trọng số (mặc định là 'length')
+
+    Returns:
+    - Danh sách các nút đại diện cho đường đi ngắn nhất. Nếu không tìm thấy đường, trả về danh sách rỗng.
+    """
+    compiled = get_compiled(graph, weight)
+    _, path = csr_shortest_path(compiled, compiled.index[start], compiled.index[end])
+    return compiled.to_ids(path)
+
+register_algorithm('Dijkstra (CSR)', csr_dijkstra)
+
+def csr_dijkstra_one_to_many(graph, start, targets, weight='length'):
+    """
+    Tìm đường đi ngắn nhất từ một nút nguồn tới nhiều nút đích trên đồ thị đã biên dịch.
+
+    Returns:
+    - Dict {đích: (chi phí, đường đi)}. Đích không tới được có chi phí inf và đường đi rỗng.
+    """
+    compiled = get_compiled(graph, weight)
+    index = compiled.index
+    results = csr_one_to_many(compiled, index[start], [index[target] for target in targets])
+    return {
+        target: (cost, compiled.to_ids(path))
+        for target, (cost, path) in zip(targets, (results[index[target]] for target in targets))
+    }
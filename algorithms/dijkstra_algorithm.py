@@ -1,4 +1,4 @@
-from algorithms import register_algorithm
+from algorithms import kernels, register_algorithm
 
 def dijkstra(graph, start, end, weight='length'):
     """
@@ -14,6 +14,10 @@ def dijkstra(graph, start, end, weight='length'):
     - Danh sách các nút đại diện cho đường đi ngắn nhất. Nếu không tìm thấy đường, trả về danh sách rỗng.
     """
     import heapq
+
+    # Có numba thì chạy kernel biên dịch trên mảng CSR (xem algorithms/kernels.py)
+    if kernels.accelerated(graph):
+        return kernels.dijkstra_path(graph, start, end, weight)
     
     queue = []
     heapq.heappush(queue, (0, start))
@@ -54,4 +58,61 @@ def dijkstra(graph, start, end, weight='length'):
     else:
         return []
 
-register_algorithm('Dijkstra', dijkstra)
\ No newline at end of file
+register_algorithm('Dijkstra', dijkstra)
+
+def dijkstra_one_to_many(graph, start, targets, weight='length'):
+    """
+    Tìm đường đi ngắn nhất từ một nút nguồn tới nhiều nút đích trong cùng một lần duyệt.
+
+    Parameters:
+    - graph: Đồ thị dưới dạng đối tượng NetworkX
+    - start: Nút bắt đầu
+    - targets: Tập các nút đích
+    - weight: Thuộc tính của cạnh dùng làm trọng số (mặc định là 'length')
+
+    Returns:
+    - Dict {đích: (chi phí, đường đi)}. Đích không tới được có chi phí inf và đường đi rỗng.
+    """
+    import heapq
+
+    remaining = set(targets)
+    queue = [(0, start)]
+    distances = {start: 0}
+    previous = {start: None}
+    settled = set()
+
+    while queue and remaining:
+        current_distance, current_node = heapq.heappop(queue)
+        if current_node in settled:
+            continue
+        settled.add(current_node)
+        remaining.discard(current_node)
+
+        for neighbor in graph.neighbors(current_node):
+            edge_data = graph.get_edge_data(current_node, neighbor)
+            if isinstance(edge_data, dict):
+                weight_values = [data.get(weight, 1) for data in edge_data.values()]
+                edge_weight = min(weight_values)
+            else:
+                edge_weight = edge_data.get(weight, 1)
+
+            distance = current_distance + edge_weight
+
+            if neighbor not in distances or distance < distances[neighbor]:
+                distances[neighbor] = distance
+                previous[neighbor] = current_node
+                heapq.heappush(queue, (distance, neighbor))
+
+    results = {}
+    for target in targets:
+        if target not in settled:
+            results[target] = (float('inf'), [])
+            continue
+        # Khôi phục đường đi
+        path = []
+        node = target
+        while node is not None:
+            path.append(node)
+            node = previous.get(node)
+        results[target] = (distances[target], path[::-1])
+    return results
@@ -0,0 +1,193 @@
+# algorithms/facilities.py
+
+import heapq
+
+import numpy as np
+
+from loader.compiled import get_compiled
+from loader.spatial_index import NodeIndex
+
+# Số tập cơ sở được giữ trong cache của mỗi đồ thị
+CACHE_SIZE = 8
+
+def multi_source_search(compiled, sources):
+    """
+    Dijkstra đa nguồn trên CompiledGraph: mọi nguồn được đưa vào hàng đợi với chi phí 0,
+    nên mỗi nút được cố định đúng một lần với nguồn gần nhất của nó.
+
+    Parameters:
+    - compiled: Đối tượng CompiledGraph
+    - sources: Danh sách chỉ số nút nguồn
+
+    Returns:
+    - Tuple (distances, owner, parent) dạng mảng numpy theo chỉ số nút: chi phí tới nguồn gần
+      nhất (inf nếu không tới được), vị trí của nguồn đó trong sources (-1 nếu không tới được)
+      và nút liền trước trên cây đường đi (-1 với nguồn và nút không tới được).
+    """
+    indptr, indices, weights = compiled.lists()
+    n = compiled.num_nodes
+    inf = float('inf')
+    distances = [inf] * n
+    owner = [-1] * n
+    parent = [-1] * n
+    settled = [False] * n
+    queue = []
+    for i, source in enumerate(sources):
+        if distances[source] > 0.0:
+            distances[source] = 0.0
+            owner[source] = i
+            queue.append((0.0, source))
+    heapq.heapify(queue)
+    heappop, heappush = heapq.heappop, heapq.heappush
+
+    while queue:
+        distance, node = heappop(queue)
+        if settled[node]:
+            continue
+        settled[node] = True
+        node_owner = owner[node]
+        for k in range(indptr[node], indptr[node + 1]):
+            neighbor = indices[k]
+            new_distance = distance + weights[k]
+            if new_distance < distances[neighbor]:
+                distances[neighbor] = new_distance
+                owner[neighbor] = node_owner
+                parent[neighbor] = node
+                heappush(queue, (new_distance, neighbor))
+
+    return np.array(distances), np.array(owner, dtype=np.int32), np.array(parent, dtype=np.int64)
+
+class FacilityPartition:
+    """
+    Phân vùng Voronoi theo khoảng cách trên mạng lưới đường: mỗi nút được gán cho cơ sở gần
+    nhất cùng khoảng cách tới cơ sở đó, tính bằng một lần multi_source_search().
+
+    Sau khi tính, tra cứu một nút là O(1) (tra chỉ số rồi đọc mảng), một điểm (lat, lon) chỉ
+    cần thêm bước tìm nút gần nhất.
+
+    Parameters:
+    - compiled: CompiledGraph của đồ thị (theo chiều thuận)
+    - facilities: Danh sách id nút của các cơ sở
+    - direction: 'to' nếu khoảng cách tính từ nút tới cơ sở (tìm kiếm trên đồ thị ngược),
+      'from' nếu tính từ cơ sở tới nút
+    - node_index: NodeIndex dùng cho locate(), tạo khi cần nếu không truyền vào
+    """
+
+    def __init__(self, compiled, facilities, direction='to', node_index=None):
+        if direction not in ('to', 'from'):
+            raise ValueError(f"direction phải là 'to' hoặc 'from', không phải {direction!r}.")
+        self.compiled = compiled
+        self.facilities = list(facilities)
+        self.direction = direction
+        self._node_index = node_index
+        search_graph = compiled.reverse() if direction == 'to' else compiled
+        sources = [compiled.index[facility] for facility in self.facilities]
+        self.distances, self.owner, self.parent = multi_source_search(search_graph, sources)
+
+    @property
+    def node_index(self):
+        if self._node_index is None:
+            self._node_index = NodeIndex(self.compiled.to_ids(range(self.compiled.num_nodes)),
+                                         self.compiled.x, self.compiled.y)
+        return self._node_index
+
+    def nearest(self, node):
+        """
+        Cơ sở gần nhất của một nút.
+
+        Returns:
+        - Tuple (id cơ sở, khoảng cách); (None, inf) nếu không tới được cơ sở nào.
+        """
+        i = self.compiled.index[node]
+        owner = self.owner[i]
+        if owner < 0:
+            return None, float('inf')
+        return self.facilities[owner], float(self.distances[i])
+
+    def nearest_many(self, nodes):
+        """
+        Cơ sở gần nhất của nhiều nút cùng lúc.
+
+        Returns:
+        - Tuple (owner, distances) dạng mảng numpy: vị trí của cơ sở trong self.facilities
+          (-1 nếu không tới được) và khoảng cách.
+        """
+        index = self.compiled.index
+        rows = np.fromiter((index[node] for node in nodes), dtype=np.int64, count=len(nodes))
+        return self.owner[rows], self.distances[rows]
+
+    def locate(self, lat, lon):
+        """
+        Cơ sở gần nhất của một điểm: gắn điểm vào nút gần nhất rồi tra như nearest().
+
+        Returns:
+        - Tuple (id cơ sở, khoảng cách trên mạng lưới, khoảng cách gắn điểm tính bằng mét).
+        """
+        node, offset = self.node_index.nearest(lat, lon)
+        facility, distance = self.nearest(node)
+        return facility, distance, offset
+
+    def path(self, node):
+        """
+        Đường đi ngắn nhất giữa nút và cơ sở gần nhất của nó, theo chiều của direction
+        (nút -> cơ sở với 'to', cơ sở -> nút với 'from'); rỗng nếu không tới được.
+        """
+        i = self.compiled.index[node]
+        if self.owner[i] < 0:
+            return []
+        path = [i]
+        while self.parent[path[-1]] >= 0:
+            path.append(int(self.parent[path[-1]]))
+        if self.direction == 'from':
+            path.reverse()
+        return self.compiled.to_ids(path)
+
+    def regions(self):
+        """
+        Các nút thuộc vùng của từng cơ sở.
+
+        Returns:
+        - Dict {id cơ sở: danh sách id nút}.
+        """
+        order = np.argsort(self.owner, kind='stable')
+        counts = np.bincount(self.owner[self.owner >= 0], minlength=len(self.facilities))
+        start = np.count_nonzero(self.owner < 0)
+        regions = {}
+        for facility, count in zip(self.facilities, counts.tolist()):
+            regions.setdefault(facility, []).extend(self.compiled.to_ids(order[start:start + count].tolist()))
+            start += count
+        return regions
+
+def nearest_facilities(graph, facilities, weight='length', direction='to'):
+    """
+    Tìm cơ sở gần nhất theo khoảng cách mạng lưới cho mọi nút của đồ thị.
+
+    Thay cho việc gọi thuật toán điểm-điểm trong ALGORITHMS cho từng cặp (điểm, cơ sở): một
+    lần Dijkstra đa nguồn cho cả tập cơ sở, kết quả được lưu trong
+    graph.graph['_facilities'] theo (weight, direction, danh sách cơ sở) để các lần gọi sau với
+    cùng danh sách cơ sở không phải tính lại. Khóa giữ thứ tự của danh sách vì vị trí trả về
+    bởi nearest_many() là vị trí trong danh sách này.
+
+    Parameters:
+    - graph: Đồ thị dưới dạng đối tượng NetworkX
+    - facilities: Danh sách id nút của các cơ sở (kho, trạm...)
+    - weight: Thuộc tính của cạnh dùng làm trọng số (mặc định là 'length')
+    - direction: 'to' (từ nút tới cơ sở) hoặc 'from' (từ cơ sở tới nút)
+
+    Returns:
+    - Đối tượng FacilityPartition.
+    """
+    facilities = list(dict.fromkeys(facilities))
+    key = (weight, direction, tuple(facilities))
+    cache = graph.graph.setdefault('_facilities', {})
+    partition = cache.pop(key, None)
+    if partition is None:
+        compiled = get_compiled(graph, weight)
+        node_index = next((cached._node_index for cached in cache.values()
+                           if cached.compiled is compiled and cached._node_index is not None), None)
+        partition = FacilityPartition(compiled, facilities, direction, node_index)
+        while len(cache) >= CACHE_SIZE:
+            cache.pop(next(iter(cache)))
+    # Đưa về cuối dict để bỏ tập ít dùng nhất khi cache đầy
+    cache[key] = partition
+    return partition
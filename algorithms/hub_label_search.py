@@ -0,0 +1,46 @@
+# algorithms/hub_label_search.py
+
+from algorithms import register_algorithm
+from loader.hub_labels import get_hub_labels
+
+def hub_labels(graph, start, end, weight='length'):
+    """
+    Tìm đường đi ngắn nhất bằng hub labeling.
+
+    Khoảng cách được tính bằng cách trộn nhãn ra của nút bắt đầu với nhãn vào của nút kết
+    thúc; đường đi được khôi phục từng bước bằng chính nhãn. Nhãn lấy từ
+    graph.graph['preprocessing']['hub_labels'] (xem loader/hub_labels.py), nếu chưa có thì
+    được tạo ở lần gọi đầu, phù hợp với đồ thị cỡ phường/quận. Gọi loader.preprocess.prepare()
+    trước để việc tạo nhãn không nằm trong truy vấn đầu tiên.
+
+    Parameters:
+    - graph: Đồ thị dưới dạng đối tượng NetworkX
+    - start: Nút bắt đầu
+    - end: Nút kết thúc
+    - weight: Thuộc tính của cạnh dùng làm trọng số (mặc định là 'length')
+
+    Returns:
+    - Danh sách các nút đại diện cho đường đi ngắn nhất. Nếu không tìm thấy đường, trả về danh sách rỗng.
+    """
+    labels = get_hub_labels(graph, weight)
+    compiled = labels.compiled
+    return compiled.to_ids(labels.path(compiled.index[start], compiled.index[end]))
+
+register_algorithm('Hub Labels', hub_labels)
+
+def hub_labels_one_to_many(graph, start, targets, weight='length'):
+    """
+    Tìm đường đi ngắn nhất từ một nút nguồn tới nhiều nút đích bằng hub labeling.
+
+    Returns:
+    - Dict {đích: (chi phí, đường đi)}. Đích không tới được có chi phí inf và đường đi rỗng.
+    """
+    labels = get_hub_labels(graph, weight)
+    compiled = labels.compiled
+    source = compiled.index[start]
+    results = {}
+    for target in targets:
+        path = labels.path(source, compiled.index[target])
+        cost = labels.distance(source, compiled.index[target]) if path else float('inf')
+        results[target] = (cost, compiled.to_ids(path))
+    return results
@@ -0,0 +1,138 @@
+# algorithms/isochrones.py
+
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+
+from shapely.geometry import MultiPoint
+
+from loader.compiled import get_compiled
+
+try:
+    from shapely import concave_hull
+except ImportError:  # shapely < 2.0 không có concave_hull, dùng bao lồi thay thế
+    concave_hull = None
+
+def bounded_search(compiled, source, limit):
+    """
+    Dijkstra từ source trên CompiledGraph, dừng khi chi phí vượt quá limit.
+
+    Returns:
+    - Dict {chỉ số nút: chi phí} của mọi nút có chi phí <= limit.
+    """
+    indptr, indices, weights = compiled.lists()
+    distances = {source: 0.0}
+    settled = {}
+    queue = [(0.0, source)]
+    heappop, heappush = heapq.heappop, heapq.heappush
+    inf = float('inf')
+    while queue:
+        distance, node = heappop(queue)
+        if distance > limit:
+            break
+        if node in settled:
+            continue
+        settled[node] = distance
+        for k in range(indptr[node], indptr[node + 1]):
+            neighbor = indices[k]
+            new_distance = distance + weights[k]
+            if new_distance <= limit and new_distance < distances.get(neighbor, inf):
+                distances[neighbor] = new_distance
+                heappush(queue, (new_distance, neighbor))
+    return settled
+
+def _boundary_points(compiled, settled, limit):
+    # Điểm cuối cùng tới được trên các cạnh đi ra khỏi vùng (nội suy thẳng theo phần chi phí còn lại),
+    # để đa giác bám theo đường thay vì chỉ nối các nút bên trong
+    indptr, indices, weights = compiled.lists()
+    xs, ys = compiled.x, compiled.y
+    points = []
+    for node, distance in settled.items():
+        for k in range(indptr[node], indptr[node + 1]):
+            neighbor = indices[k]
+            if neighbor in settled and settled[neighbor] <= limit:
+                continue
+            fraction = (limit - distance) / weights[k] if weights[k] > 0 else 0.0
+            if 0.0 < fraction < 1.0:
+                points.append((xs[node] + fraction * (xs[neighbor] - xs[node]),
+                               ys[node] + fraction * (ys[neighbor] - ys[node])))
+    return points
+
+def isochrone_polygon(points, concave_ratio=0.3):
+    """
+    Đa giác bao một tập điểm (x, y).
+
+    Dùng bao lõm (shapely.concave_hull) để không phủ lên các vùng không tới được giữa các
+    nhánh đường; concave_ratio càng nhỏ thì đa giác càng ôm sát. Nếu shapely không hỗ trợ
+    concave_hull thì dùng bao lồi. Ít hơn 3 điểm cho Point/LineString thay vì Polygon.
+    """
+    geometry = MultiPoint(points)
+    if concave_hull is not None and len(points) >= 3:
+        return concave_hull(geometry, ratio=concave_ratio)
+    return geometry.convex_hull
+
+def compute_isochrones(compiled, source, thresholds, concave_ratio=0.3):
+    """
+    Tính vùng tới được cho nhiều ngưỡng chi phí bằng một lần duyệt tới ngưỡng lớn nhất.
+
+    Returns:
+    - Dict {ngưỡng: (danh sách chỉ số nút tới được, đa giác)}.
+    """
+    thresholds = sorted(thresholds)
+    settled = bounded_search(compiled, source, thresholds[-1])
+    xs, ys = compiled.x, compiled.y
+    results = {}
+    for threshold in thresholds:
+        reached = {node: distance for node, distance in settled.items() if distance <= threshold}
+        points = [(xs[node], ys[node]) for node in reached] + _boundary_points(compiled, reached, threshold)
+        results[threshold] = (list(reached), isochrone_polygon(points, concave_ratio))
+    return results
+
+def isochrones(graph, start, thresholds, weight='length', concave_ratio=0.3):
+    """
+    Tìm mọi nút tới được từ start trong từng ngưỡng chi phí, kèm đa giác vùng tới được.
+
+    Parameters:
+    - graph: Đồ thị dưới dạng đối tượng NetworkX
+    - start: Nút bắt đầu
+    - thresholds: Một hoặc nhiều ngưỡng, cùng đơn vị với weight (mét cho 'length', giây cho
+      'travel_time'...)
+    - weight: Thuộc tính của cạnh dùng làm trọng số (mặc định là 'length')
+    - concave_ratio: Độ ôm sát của đa giác, xem isochrone_polygon()
+
+    Returns:
+    - Dict {ngưỡng: (danh sách nút tới được, đa giác shapely theo tọa độ x/y của đồ thị)}.
+    """
+    if isinstance(thresholds, (int, float)):
+        thresholds = [thresholds]
+    compiled = get_compiled(graph, weight)
+    results = compute_isochrones(compiled, compiled.index[start], thresholds, concave_ratio)
+    return {
+        threshold: (compiled.to_ids(nodes), polygon)
+        for threshold, (nodes, polygon) in results.items()
+    }
+
+def batch_isochrones(place_name, filepath, sources, thresholds, weight='length', concave_ratio=0.3, max_workers=None,
+                     chunksize=8):
+    """
+    Tính isochrone cho nhiều nút nguồn song song trên một process pool.
+
+    Mỗi tiến trình con tải đồ thị một lần (service.worker.init_worker, không gộp chuỗi nút
+    để giữ nguyên hình học), sau đó chỉ nhận id nút nguồn.
+
+    Parameters:
+    - place_name, filepath: Đồ thị cần tải, như load_map()
+    - sources: Danh sách nút nguồn
+    - thresholds, weight, concave_ratio: Như isochrones()
+    - max_workers: Số tiến trình (mặc định bằng số CPU)
+    - chunksize: Số nguồn gửi cho một tiến trình mỗi lần
+
+    Returns:
+    - Dict {nút nguồn: kết quả của isochrones()}.
+    """
+    from service import worker
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=worker.init_worker,
+                             initargs=(place_name, filepath, False, weight)) as executor:
+        results = executor.map(worker.solve_isochrones, sources, [thresholds] * len(sources),
+                               [weight] * len(sources), [concave_ratio] * len(sources), chunksize=chunksize)
+        return dict(zip(sources, results))
@@ -0,0 +1,297 @@
+# algorithms/kernels.py
+
+import argparse
+import random
+import time
+
+import networkx as nx
+import numpy as np
+
+from loader.compiled import get_compiled
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # Không có numba: các kernel vẫn chạy được (chậm) để kiểm tra, registry dùng bản Python
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Đặt False để buộc các thuật toán dùng bản Python thuần dù có numba
+ENABLED = True
+
+def accelerated(graph):
+    """
+    Kiểm tra có dùng kernel biên dịch cho đồ thị này không.
+
+    Chỉ dùng khi có numba và graph là đồ thị NetworkX thật: đồ thị được bọc bởi TracingGraph
+    (GUI theo dõi quá trình duyệt, hủy tác vụ) cần thuật toán gọi graph.neighbors() nên
+    luôn chạy bản Python thuần.
+    """
+    return ENABLED and NUMBA_AVAILABLE and isinstance(graph, nx.Graph)
+
+@njit(cache=True)
+def _heap_push(keys, nodes, size, key, node):
+    # Heap nhị phân nhỏ nhất trên hai mảng song song, trả về kích thước mới
+    i = size
+    while i > 0:
+        parent = (i - 1) >> 1
+        if keys[parent] <= key:
+            break
+        keys[i] = keys[parent]
+        nodes[i] = nodes[parent]
+        i = parent
+    keys[i] = key
+    nodes[i] = node
+    return size + 1
+
+@njit(cache=True)
+def _heap_pop(keys, nodes, size):
+    # Lấy phần tử nhỏ nhất ra khỏi heap, trả về (khóa, nút, kích thước mới)
+    top_key, top_node = keys[0], nodes[0]
+    size -= 1
+    key, node = keys[size], nodes[size]
+    i = 0
+    while True:
+        child = 2 * i + 1
+        if child >= size:
+            break
+        if child + 1 < size and keys[child + 1] < keys[child]:
+            child += 1
+        if key <= keys[child]:
+            break
+        keys[i] = keys[child]
+        nodes[i] = nodes[child]
+        i = child
+    keys[i] = key
+    nodes[i] = node
+    return top_key, top_node, size
+
+@njit(cache=True)
+def dijkstra_kernel(indptr, indices, weights, xs, ys, source, target, use_heuristic):
+    """
+    Dijkstra (hoặc A* với heuristic Euclid trên tọa độ x/y, giống algorithms/heuristic.py)
+    trên mảng CSR với heap nhị phân dạng mảng.
+
+    Returns:
+    - Mảng nút cha (-1 nếu chưa tới); parent[target] == -1 và target != source nghĩa là không có đường.
+    """
+    n = len(indptr) - 1
+    distances = np.full(n, np.inf)
+    parent = np.full(n, -1, dtype=np.int64)
+    settled = np.zeros(n, dtype=np.bool_)
+    # Mỗi lần nới cạnh đẩy tối đa một phần tử, nên heap không vượt quá số cạnh + 1
+    keys = np.empty(len(indices) + 1, dtype=np.float64)
+    nodes = np.empty(len(indices) + 1, dtype=np.int64)
+    distances[source] = 0.0
+    size = _heap_push(keys, nodes, 0, 0.0, source)
+    tx, ty = xs[target], ys[target]
+    while size > 0:
+        _, node, size = _heap_pop(keys, nodes, size)
+        if node == target:
+            break
+        if settled[node]:
+            continue
+        settled[node] = True
+        for k in range(indptr[node], indptr[node + 1]):
+            neighbor = indices[k]
+            distance = distances[node] + weights[k]
+            if distance < distances[neighbor]:
+                distances[neighbor] = distance
+                parent[neighbor] = node
+                priority = distance
+                if use_heuristic:
+                    priority += np.hypot(tx - xs[neighbor], ty - ys[neighbor])
+                size = _heap_push(keys, nodes, size, priority, neighbor)
+    return parent
+
+@njit(cache=True)
+def dijkstra_many_kernel(indptr, indices, weights, source, targets):
+    """
+    Dijkstra một-nhiều trên mảng CSR, dừng khi mọi đích đã được cố định.
+
+    Returns:
+    - Tuple (distances, parent); distances của đích không tới được là inf.
+    """
+    n = len(indptr) - 1
+    distances = np.full(n, np.inf)
+    parent = np.full(n, -1, dtype=np.int64)
+    settled = np.zeros(n, dtype=np.bool_)
+    is_target = np.zeros(n, dtype=np.bool_)
+    remaining = 0
+    for target in targets:
+        if not is_target[target]:
+            is_target[target] = True
+            remaining += 1
+    keys = np.empty(len(indices) + 1, dtype=np.float64)
+    nodes = np.empty(len(indices) + 1, dtype=np.int64)
+    distances[source] = 0.0
+    size = _heap_push(keys, nodes, 0, 0.0, source)
+    while size > 0 and remaining > 0:
+        _, node, size = _heap_pop(keys, nodes, size)
+        if settled[node]:
+            continue
+        settled[node] = True
+        if is_target[node]:
+            remaining -= 1
+        for k in range(indptr[node], indptr[node + 1]):
+            neighbor = indices[k]
+            distance = distances[node] + weights[k]
+            if distance < distances[neighbor]:
+                distances[neighbor] = distance
+                parent[neighbor] = node
+                size = _heap_push(keys, nodes, size, distance, neighbor)
+    return distances, parent
+
+@njit(cache=True)
+def bfs_kernel(indptr, indices, source, target):
+    """
+    BFS trên mảng CSR với hàng đợi là một mảng và hai con trỏ đầu/cuối.
+
+    Returns:
+    - Mảng nút cha như dijkstra_kernel().
+    """
+    n = len(indptr) - 1
+    parent = np.full(n, -1, dtype=np.int64)
+    visited = np.zeros(n, dtype=np.bool_)
+    queue = np.empty(n, dtype=np.int64)
+    queue[0] = source
+    visited[source] = True
+    head, tail = 0, 1
+    while head < tail:
+        node = queue[head]
+        head += 1
+        if node == target:
+            break
+        for k in range(indptr[node], indptr[node + 1]):
+            neighbor = indices[k]
+            if not visited[neighbor]:
+                visited[neighbor] = True
+                parent[neighbor] = node
+                queue[tail] = neighbor
+                tail += 1
+    return parent
+
+def _unwind(compiled, parent, source, target):
+    if source != target and parent[target] == -1:
+        return []
+    path = [target]
+    node = target
+    while node != source:
+        node = int(parent[node])
+        path.append(node)
+    return compiled.to_ids(path[::-1])
+
+def dijkstra_many(indptr, indices, weights, source, targets):
+    """
+    Dijkstra một-nhiều bằng kernel trên các mảng CSR (không cần CompiledGraph, dùng được với
+    view chỉ đọc trên shared memory).
+
+    Returns:
+    - Dict {chỉ số đích: (chi phí, đường đi theo chỉ số)} như csr_dijkstra.csr_one_to_many().
+    """
+    distances, parent = dijkstra_many_kernel(indptr, indices, weights, source, np.asarray(targets, dtype=np.int64))
+    results = {}
+    for target in targets:
+        cost = float(distances[target])
+        if cost == np.inf:
+            results[target] = (cost, [])
+            continue
+        path = [target]
+        node = target
+        while node != source:
+            node = int(parent[node])
+            path.append(node)
+        results[target] = (cost, path[::-1])
+    return results
+
+def dijkstra_path(graph, start, end, weight='length', use_heuristic=False):
+    """
+    Đường đi của Dijkstra (hoặc A* nếu use_heuristic) chạy bằng kernel trên CompiledGraph.
+    Cạnh song song lấy trọng số nhỏ nhất, cạnh thiếu thuộc tính có trọng số 1, như bản Python.
+    """
+    compiled = get_compiled(graph, weight)
+    source, target = compiled.index[start], compiled.index[end]
+    parent = dijkstra_kernel(compiled.indptr, compiled.indices, compiled.weights, compiled.x, compiled.y,
+                             source, target, use_heuristic)
+    return _unwind(compiled, parent, source, target)
+
+def bfs_path(graph, start, end):
+    """
+    Đường đi ít cạnh nhất của BFS chạy bằng kernel trên CompiledGraph.
+    """
+    compiled = get_compiled(graph, None)
+    source, target = compiled.index[start], compiled.index[end]
+    parent = bfs_kernel(compiled.indptr, compiled.indices, source, target)
+    return _unwind(compiled, parent, source, target)
+
+def check_parity(graph, num_queries=100, seed=0, weight='length'):
+    """
+    So sánh kernel với bản Python thuần của Dijkstra, A* và BFS trên các cặp nút ngẫu nhiên.
+
+    Đường đi có thể khác nhau khi có nhiều đường cùng chi phí, nên so sánh chi phí (số cạnh
+    với BFS) và việc có tìm thấy đường hay không. Chạy được cả khi không có numba.
+
+    Returns:
+    - Dict {tên thuật toán: (số truy vấn lệch, thời gian bản Python, thời gian kernel)}.
+    """
+    from algorithms import ALGORITHMS
+    from algorithms.trace import TracingGraph
+    from loader.paths import path_cost
+
+    # Bọc đồ thị để thuật toán trong registry luôn chạy bản Python thuần
+    plain = TracingGraph(graph)
+    rng = random.Random(seed)
+    nodes = list(graph.nodes)
+    queries = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(num_queries)]
+    cases = {
+        'Dijkstra': (lambda s, t: dijkstra_path(graph, s, t, weight), weight),
+        'A* Algorithm': (lambda s, t: dijkstra_path(graph, s, t, weight, use_heuristic=True), weight),
+        'Breadth-First Search': (lambda s, t: bfs_path(graph, s, t), None),
+    }
+    results = {}
+    for name, (kernel, cost_weight) in cases.items():
+        func = ALGORITHMS[name].func
+        reference, reference_time = [], time.perf_counter()
+        for s, t in queries:
+            reference.append(func(plain, s, t, weight=weight))
+        reference_time = time.perf_counter() - reference_time
+        paths, kernel_time = [], time.perf_counter()
+        for s, t in queries:
+            paths.append(kernel(s, t))
+        kernel_time = time.perf_counter() - kernel_time
+        mismatches = 0
+        for expected, path in zip(reference, paths):
+            if cost_weight is None:
+                same = len(expected) == len(path)
+            elif not expected or not path:
+                same = not expected and not path
+            else:
+                expected_cost = path_cost(graph, expected, cost_weight)
+                same = abs(expected_cost - path_cost(graph, path, cost_weight)) <= 1e-6 * max(1.0, expected_cost)
+            mismatches += not same
+        results[name] = (mismatches, reference_time, kernel_time)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Kiểm tra kernel biên dịch so với bản Python thuần.")
+    parser.add_argument('graphml', help="File GraphML của đồ thị")
+    parser.add_argument('--queries', type=int, default=100, help="Số cặp nút ngẫu nhiên")
+    args = parser.parse_args()
+
+    import osmnx as ox
+
+    graph = ox.load_graphml(args.graphml)
+    if not NUMBA_AVAILABLE:
+        print("Không có numba: kernel chạy như Python thường, chỉ kiểm tra tính đúng.")
+    # Lần gọi đầu biên dịch kernel và đồ thị, không tính vào thời gian
+    check_parity(graph, num_queries=1)
+    for name, (mismatches, reference_time, kernel_time) in check_parity(graph, args.queries).items():
+        print(f"{name}: {mismatches}/{args.queries} truy vấn lệch, Python {reference_time:.3f}s, "
+              f"kernel {kernel_time:.3f}s (x{reference_time / max(kernel_time, 1e-9):.1f})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,333 @@
+# algorithms/map_matching.py
+
+import argparse
+import heapq
+import json
+import math
+import sys
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from loader.compiled import get_compiled
+from loader.spatial_index import EARTH_RADIUS_M
+
+# Số cây tìm kiếm tối đa được giữ lại giữa các bước (và giữa các vệt GPS) của một MapMatcher
+TREE_CACHE_SIZE = 4096
+
+class EdgeIndex:
+    """
+    Chỉ mục lưới đều trên các cạnh của CompiledGraph (đoạn thẳng nối hai nút) để tìm các cạnh
+    nằm trong bán kính cho trước quanh một điểm GPS.
+
+    Khoảng cách dùng phép chiếu equirectangular quanh vĩ độ trung tâm như NodeIndex.
+    """
+
+    def __init__(self, compiled, cell_size_m=100.0):
+        self.compiled = compiled
+        self.sources = np.repeat(np.arange(compiled.num_nodes, dtype=np.int64), np.diff(compiled.indptr))
+        self.targets = compiled.indices.astype(np.int64)
+        xs, ys = np.asarray(compiled.x, dtype=np.float64), np.asarray(compiled.y, dtype=np.float64)
+        self.cos_lat = math.cos(math.radians((ys.min() + ys.max()) / 2)) if len(ys) else 1.0
+        self.meters_y = EARTH_RADIUS_M * math.pi / 180
+        self.meters_x = self.meters_y * self.cos_lat
+        self.x0, self.y0 = xs[self.sources], ys[self.sources]
+        self.x1, self.y1 = xs[self.targets], ys[self.targets]
+        self.origin = (xs.min(), ys.min()) if len(xs) else (0.0, 0.0)
+        self.cell = (cell_size_m / self.meters_x, cell_size_m / self.meters_y)
+
+        cells = defaultdict(list)
+        cx0, cx1 = self._col(np.minimum(self.x0, self.x1)), self._col(np.maximum(self.x0, self.x1))
+        cy0, cy1 = self._row(np.minimum(self.y0, self.y1)), self._row(np.maximum(self.y0, self.y1))
+        for edge, (a, b, c, d) in enumerate(zip(cx0.tolist(), cx1.tolist(), cy0.tolist(), cy1.tolist())):
+            for i in range(a, b + 1):
+                for j in range(c, d + 1):
+                    cells[(i, j)].append(edge)
+        self.cells = {cell: np.array(edges, dtype=np.int64) for cell, edges in cells.items()}
+
+    def _col(self, x):
+        return ((np.asarray(x) - self.origin[0]) // self.cell[0]).astype(np.int64)
+
+    def _row(self, y):
+        return ((np.asarray(y) - self.origin[1]) // self.cell[1]).astype(np.int64)
+
+    def candidates(self, lat, lon, radius_m, limit):
+        """
+        Các cạnh gần điểm (lat, lon) nhất trong bán kính radius_m.
+
+        Returns:
+        - Tuple mảng (cạnh, khoảng cách tính bằng mét, vị trí hình chiếu trên cạnh trong [0, 1]),
+          sắp xếp theo khoảng cách, tối đa limit phần tử.
+        """
+        rx, ry = math.ceil(radius_m / (self.cell[0] * self.meters_x)), math.ceil(radius_m / (self.cell[1] * self.meters_y))
+        col, row = int(self._col(lon)), int(self._row(lat))
+        found = [self.cells[(i, j)] for i in range(col - rx, col + rx + 1) for j in range(row - ry, row + ry + 1)
+                 if (i, j) in self.cells]
+        empty = np.zeros(0, dtype=np.int64)
+        if not found:
+            return empty, np.zeros(0), np.zeros(0)
+        edges = np.unique(np.concatenate(found))
+        # Tọa độ mét với gốc tại điểm GPS
+        ax = (self.x0[edges] - lon) * self.meters_x
+        ay = (self.y0[edges] - lat) * self.meters_y
+        dx = (self.x1[edges] - self.x0[edges]) * self.meters_x
+        dy = (self.y1[edges] - self.y0[edges]) * self.meters_y
+        norm = dx * dx + dy * dy
+        fraction = np.clip(-(ax * dx + ay * dy) / np.where(norm > 0, norm, 1.0), 0.0, 1.0)
+        distances = np.hypot(ax + fraction * dx, ay + fraction * dy)
+        keep = distances <= radius_m
+        edges, distances, fraction = edges[keep], distances[keep], fraction[keep]
+        order = np.argsort(distances, kind='stable')[:limit]
+        return edges[order], distances[order], fraction[order]
+
+class MapMatcher:
+    """
+    Gắn vệt GPS vào mạng lưới đường bằng mô hình Markov ẩn và thuật toán Viterbi
+    (Newson & Krumm, 2009).
+
+    Trạng thái ẩn của mỗi điểm GPS là một cạnh ứng viên trong bán kính radius_m. Xác suất
+    phát xạ giảm theo khoảng cách từ điểm tới cạnh (phân phối chuẩn với độ lệch sigma_m);
+    xác suất chuyển giảm theo chênh lệch giữa quãng đường trên mạng lưới và khoảng cách
+    đường chim bay giữa hai điểm liên tiếp (phân phối mũ với tham số beta_m). Quãng đường
+    được tính bằng Dijkstra có giới hạn từ nút cuối của cạnh ứng viên, cây tìm kiếm được
+    lưu lại và dùng lại cho các bước và các vệt sau.
+
+    Trọng số phải là độ dài theo mét ('length') để so sánh được với khoảng cách GPS.
+
+    Parameters:
+    - graph: Đồ thị dưới dạng đối tượng NetworkX
+    - sigma_m: Độ lệch chuẩn của sai số GPS (mét)
+    - beta_m: Tham số của xác suất chuyển (mét)
+    - radius_m: Bán kính tìm cạnh ứng viên (mét)
+    - max_candidates: Số cạnh ứng viên tối đa cho mỗi điểm
+    """
+
+    def __init__(self, graph, sigma_m=10.0, beta_m=50.0, radius_m=50.0, max_candidates=8):
+        self.compiled = get_compiled(graph, 'length')
+        self.edge_index = EdgeIndex(self.compiled, cell_size_m=max(radius_m, 25.0))
+        self.sigma_m = sigma_m
+        self.beta_m = beta_m
+        self.radius_m = radius_m
+        self.max_candidates = max_candidates
+        self._trees = {}
+        self.searches = 0
+        self.reused = 0
+
+    def _tree(self, source, limit):
+        # Cây Dijkstra từ source tới chi phí limit, dùng lại cây đã có nếu nó đủ xa
+        cached = self._trees.get(source)
+        if cached is not None and cached[0] >= limit:
+            self.reused += 1
+            return cached[1], cached[2]
+        self.searches += 1
+        indptr, indices, weights = self.compiled.lists()
+        distances = {source: 0.0}
+        parent = {source: -1}
+        settled = {}
+        queue = [(0.0, source)]
+        heappop, heappush = heapq.heappop, heapq.heappush
+        inf = float('inf')
+        while queue:
+            distance, node = heappop(queue)
+            if distance > limit:
+                break
+            if node in settled:
+                continue
+            settled[node] = distance
+            for k in range(indptr[node], indptr[node + 1]):
+                neighbor = indices[k]
+                new_distance = distance + weights[k]
+                if new_distance <= limit and new_distance < distances.get(neighbor, inf):
+                    distances[neighbor] = new_distance
+                    parent[neighbor] = node
+                    heappush(queue, (new_distance, neighbor))
+        if len(self._trees) >= TREE_CACHE_SIZE:
+            self._trees.clear()
+        self._trees[source] = (limit, settled, parent)
+        return settled, parent
+
+    def _candidates(self, lat, lon):
+        edges, distances, fractions = self.edge_index.candidates(lat, lon, self.radius_m, self.max_candidates)
+        emission = -0.5 * (distances / self.sigma_m) ** 2
+        return edges.tolist(), fractions.tolist(), emission.tolist()
+
+    def _transitions(self, previous, current, straight):
+        # Ma trận log xác suất chuyển giữa ứng viên của hai điểm liên tiếp
+        weights = self.compiled.weights
+        sources, targets = self.edge_index.sources, self.edge_index.targets
+        limit = self._limit(straight)
+        result = []
+        for edge_a, fraction_a in zip(*previous):
+            length_a = float(weights[edge_a])
+            tree, _ = self._tree(int(targets[edge_a]), limit)
+            row = []
+            for edge_b, fraction_b in zip(*current):
+                if edge_a == edge_b and fraction_b >= fraction_a:
+                    route = (fraction_b - fraction_a) * length_a
+                else:
+                    between = tree.get(int(sources[edge_b]))
+                    if between is None:
+                        row.append(-math.inf)
+                        continue
+                    route = (1.0 - fraction_a) * length_a + between + fraction_b * float(weights[edge_b])
+                row.append(-abs(route - straight) / self.beta_m)
+            result.append(row)
+        return result
+
+    def _limit(self, straight):
+        # Quãng đường tối đa được xét giữa hai điểm liên tiếp
+        return straight * 2 + 2 * self.radius_m
+
+    def _straight(self, a, b):
+        dx = math.radians(b[1] - a[1]) * self.edge_index.cos_lat
+        dy = math.radians(b[0] - a[0])
+        return EARTH_RADIUS_M * math.hypot(dx, dy)
+
+    def match(self, points):
+        """
+        Gắn một vệt GPS vào mạng lưới đường.
+
+        Điểm không có cạnh nào trong bán kính bị bỏ qua. Khi hai điểm liên tiếp không có
+        đường nối hợp lý, mô hình được khởi động lại (một lần đứt), và đường đi được tách
+        thành nhiều đoạn.
+
+        Parameters:
+        - points: Danh sách (lat, lon) theo thứ tự thời gian
+
+        Returns:
+        - Dict gồm 'matched' (mỗi điểm: [u, v, lat, lon] của cạnh được chọn và vị trí gắn vào,
+          hoặc None), 'paths' (danh sách đường đi theo id nút, mỗi đoạn liền một đường) và
+          'breaks' (số lần đứt).
+        """
+        compiled = self.compiled
+        sources, targets = self.edge_index.sources, self.edge_index.targets
+        # Mỗi đoạn liền: danh sách (chỉ số điểm, ứng viên, điểm số, cha) theo từng bước
+        segments, steps = [], []
+        previous_point = None
+        for i, (lat, lon) in enumerate(points):
+            edges, fractions, emission = self._candidates(lat, lon)
+            if not edges:
+                continue
+            if steps:
+                _, (prev_edges, prev_fractions), prev_scores, _ = steps[-1]
+                transitions = self._transitions((prev_edges, prev_fractions), (edges, fractions),
+                                                self._straight(previous_point, (lat, lon)))
+                scores, back = [], []
+                for j, emit in enumerate(emission):
+                    best, best_from = -math.inf, -1
+                    for k, prev_score in enumerate(prev_scores):
+                        score = prev_score + transitions[k][j]
+                        if score > best:
+                            best, best_from = score, k
+                    scores.append(best + emit)
+                    back.append(best_from)
+                if max(scores) == -math.inf:
+                    segments.append(steps)
+                    steps = []
+            if not steps:
+                scores, back = emission, [-1] * len(edges)
+            steps.append((i, (edges, fractions), scores, back))
+            previous_point = (lat, lon)
+        if steps:
+            segments.append(steps)
+
+        matched = [None] * len(points)
+        paths = []
+        for steps in segments:
+            choice = int(np.argmax(steps[-1][2]))
+            chosen = []
+            for i, (edges, fractions), _, back in reversed(steps):
+                chosen.append((i, edges[choice], fractions[choice]))
+                choice = back[choice]
+            chosen.reverse()
+
+            path = [int(sources[chosen[0][1]]), int(targets[chosen[0][1]])]
+            for (i_a, edge_a, fraction_a), (i_b, edge_b, fraction_b) in zip(chosen, chosen[1:]):
+                if edge_a == edge_b and fraction_b >= fraction_a:
+                    continue
+                # Cùng giới hạn như lúc tính xác suất chuyển nên cây thường vẫn còn trong cache
+                _, parent = self._tree(int(targets[edge_a]), self._limit(self._straight(points[i_a], points[i_b])))
+                leg, node = [], int(sources[edge_b])
+                while node != path[-1]:
+                    leg.append(node)
+                    node = parent[node]
+                path.extend(reversed(leg))
+                path.append(int(targets[edge_b]))
+            paths.append(compiled.to_ids(path))
+
+            for i, edge, fraction in chosen:
+                u, v = int(sources[edge]), int(targets[edge])
+                lon = compiled.x[u] + fraction * (compiled.x[v] - compiled.x[u])
+                lat = compiled.y[u] + fraction * (compiled.y[v] - compiled.y[u])
+                matched[i] = compiled.to_ids([u, v]) + [float(lat), float(lon)]
+        return {'matched': matched, 'paths': paths, 'breaks': max(len(segments) - 1, 0)}
+
+def _bounded_map(executor, func, items, window):
+    # Như executor.map nhưng chỉ giữ tối đa window tác vụ đang chờ, để đọc và ghi kiểu luồng
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def match_traces(place_name, filepath, traces, max_workers=None, window=256, **options):
+    """
+    Gắn nhiều vệt GPS song song trên một process pool, kết quả trả về theo thứ tự đầu vào.
+
+    Mỗi tiến trình con tải đồ thị một lần (service.worker.init_worker, không gộp chuỗi nút)
+    và giữ một MapMatcher riêng. traces có thể là generator: chỉ tối đa window vệt được đọc
+    trước, nên dùng được với file rất lớn.
+
+    Parameters:
+    - place_name, filepath: Đồ thị cần tải, như load_map()
+    - traces: Iterable các dict {'id': ..., 'points': [[lat, lon], ...]}
+    - max_workers: Số tiến trình (mặc định bằng số CPU)
+    - window: Số vệt tối đa đang được xử lý cùng lúc
+    - options: Tham số của MapMatcher (sigma_m, beta_m, radius_m, max_candidates)
+
+    Returns:
+    - Generator các dict {'id': ..., 'matched': ..., 'paths': ..., 'breaks': ...}.
+    """
+    from functools import partial
+    from service import worker
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=worker.init_worker,
+                             initargs=(place_name, filepath, False, 'length')) as executor:
+        yield from _bounded_map(executor, partial(worker.solve_match, **options), traces, window)
+
+def main():
+    parser = argparse.ArgumentParser(description="Gắn các vệt GPS (JSON Lines) vào mạng lưới đường.")
+    parser.add_argument('graphml', help="File GraphML của đồ thị (tải bằng load_map)")
+    parser.add_argument('traces', help="File vào, mỗi dòng {\"id\": ..., \"points\": [[lat, lon], ...]}; '-' là stdin")
+    parser.add_argument('output', help="File kết quả JSON Lines; '-' là stdout")
+    parser.add_argument('--workers', type=int, default=None, help="Số tiến trình")
+    parser.add_argument('--sigma', type=float, default=10.0, help="Độ lệch chuẩn sai số GPS (mét)")
+    parser.add_argument('--beta', type=float, default=50.0, help="Tham số xác suất chuyển (mét)")
+    parser.add_argument('--radius', type=float, default=50.0, help="Bán kính tìm cạnh ứng viên (mét)")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.traces == '-' else open(args.traces, encoding='utf-8')
+    target = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    traces = (json.loads(line) for line in source if line.strip())
+    started, count, breaks = time.perf_counter(), 0, 0
+    try:
+        for result in match_traces(None, args.graphml, traces, max_workers=args.workers,
+                                   sigma_m=args.sigma, beta_m=args.beta, radius_m=args.radius):
+            target.write(json.dumps(result) + '\n')
+            count += 1
+            breaks += result['breaks']
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    elapsed = time.perf_counter() - started
+    print(f"Đã gắn {count} vệt trong {elapsed:.1f}s ({count / max(elapsed, 1e-9):.1f} vệt/s), {breaks} lần đứt.",
+          file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
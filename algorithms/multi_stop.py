@@ -0,0 +1,231 @@
+# algorithms/multi_stop.py
+
+import heapq
+import time
+
+import numpy as np
+
+from algorithms.csr_dijkstra import csr_shortest_path
+from loader.compiled import get_compiled
+
+def _costs_to_targets(indptr, indices, weights, source, targets):
+    # Dijkstra một-nhiều chỉ lấy chi phí, dừng khi mọi đích đã được cố định
+    remaining = set(targets)
+    distances = {source: 0.0}
+    settled = set()
+    queue = [(0.0, source)]
+    heappop, heappush = heapq.heappop, heapq.heappush
+    inf = float('inf')
+    while queue and remaining:
+        distance, node = heappop(queue)
+        if node in settled:
+            continue
+        settled.add(node)
+        remaining.discard(node)
+        for k in range(indptr[node], indptr[node + 1]):
+            neighbor = indices[k]
+            new_distance = distance + weights[k]
+            if new_distance < distances.get(neighbor, inf):
+                distances[neighbor] = new_distance
+                heappush(queue, (new_distance, neighbor))
+    return [distances[target] if target in settled else inf for target in targets]
+
+def stop_matrix(graph, stops, weight='length'):
+    """
+    Ma trận chi phí giữa các điểm dừng trong một lần tính.
+
+    Nếu đồ thị đã gắn hub labels cho đúng trọng số (loader/hub_labels.py) thì tra nhãn,
+    ngược lại chạy một Dijkstra một-nhiều trên CompiledGraph từ mỗi điểm dừng, dừng ngay khi
+    đã tới mọi điểm dừng khác.
+
+    Returns:
+    - Mảng numpy (len(stops), len(stops)); inf nếu không có đường.
+    """
+    compiled = get_compiled(graph, weight)
+    rows = [compiled.index[stop] for stop in stops]
+    labels = graph.graph.get('preprocessing', {}).get('hub_labels')
+    if labels is not None and labels.weight == weight:
+        return labels.distance_matrix(rows, rows)
+    indptr, indices, weights = compiled.lists()
+    return np.array([_costs_to_targets(indptr, indices, weights, row, rows) for row in rows], dtype=np.float64)
+
+def _prefix_costs(matrix, sequence):
+    # forward[k]: chi phí đi theo sequence tới vị trí k; backward[k]: như trên nhưng mọi chặng đi ngược chiều
+    forward, backward = [0.0], [0.0]
+    for a, b in zip(sequence, sequence[1:]):
+        forward.append(forward[-1] + matrix[a][b])
+        backward.append(backward[-1] + matrix[b][a])
+    return forward, backward
+
+def nearest_neighbor_sequence(matrix, start, end=None, closed=False):
+    """
+    Thứ tự ban đầu theo láng giềng gần nhất: từ start luôn đi tới điểm chưa thăm gần nhất.
+
+    Returns:
+    - Danh sách chỉ số điểm dừng; phần tử cuối là start nếu closed, là end nếu end được cố định.
+    """
+    n = len(matrix)
+    unvisited = set(range(n)) - {start}
+    if end is not None:
+        unvisited.discard(end)
+    sequence = [start]
+    while unvisited:
+        row = matrix[sequence[-1]]
+        nearest = min(unvisited, key=lambda stop: (row[stop], stop))
+        unvisited.remove(nearest)
+        sequence.append(nearest)
+    if closed:
+        sequence.append(start)
+    elif end is not None and end != start:
+        sequence.append(end)
+    return sequence
+
+def _two_opt(matrix, sequence, last, deadline):
+    # Đảo ngược đoạn sequence[i..j]; với ma trận bất đối xứng chi phí của đoạn đảo lấy từ prefix ngược
+    forward, backward = _prefix_costs(matrix, sequence)
+    size = len(sequence)
+    for i in range(1, last):
+        if time.perf_counter() > deadline:
+            return False
+        before = matrix[sequence[i - 1]]
+        for j in range(i + 1, last):
+            after = sequence[j + 1] if j + 1 < size else None
+            old = before[sequence[i]] + forward[j] - forward[i]
+            new = before[sequence[j]] + backward[j] - backward[i]
+            if after is not None:
+                old += matrix[sequence[j]][after]
+                new += matrix[sequence[i]][after]
+            if new < old - 1e-9:
+                sequence[i:j + 1] = sequence[i:j + 1][::-1]
+                return True
+    return False
+
+def _or_opt(matrix, sequence, last, deadline, max_segment=3):
+    # Chuyển một đoạn 1..max_segment điểm liên tiếp (giữ chiều) sang vị trí khác
+    size = len(sequence)
+    for length in range(1, max_segment + 1):
+        for i in range(1, last - length + 1):
+            if time.perf_counter() > deadline:
+                return False
+            first, tail = sequence[i], sequence[i + length - 1]
+            prev = sequence[i - 1]
+            nxt = sequence[i + length] if i + length < size else None
+            removed = matrix[prev][first]
+            if nxt is not None:
+                removed += matrix[tail][nxt] - matrix[prev][nxt]
+            for p in range(0, last):
+                if i - 1 <= p < i + length:
+                    continue
+                a = sequence[p]
+                b = sequence[p + 1] if p + 1 < size else None
+                added = matrix[a][first]
+                if b is not None:
+                    added += matrix[tail][b] - matrix[a][b]
+                if added < removed - 1e-9:
+                    segment = sequence[i:i + length]
+                    rest = sequence[:i] + sequence[i + length:]
+                    position = p + 1 if p < i else p + 1 - length
+                    sequence[:] = rest[:position] + segment + rest[position:]
+                    return True
+    return False
+
+def improve_sequence(matrix, sequence, fixed_end=True, time_limit=1.0):
+    """
+    Cải thiện thứ tự bằng 2-opt và Or-opt cho tới khi không còn bước cải thiện nào hoặc hết
+    time_limit giây. Phần tử đầu (và cuối nếu fixed_end) không bị di chuyển.
+
+    Returns:
+    - sequence sau khi cải thiện (sửa tại chỗ).
+    """
+    deadline = time.perf_counter() + time_limit
+    # Các vị trí 1..last-1 được phép di chuyển
+    last = len(sequence) - 1 if fixed_end else len(sequence)
+    while time.perf_counter() <= deadline:
+        if _two_opt(matrix, sequence, last, deadline):
+            continue
+        if not _or_opt(matrix, sequence, last, deadline):
+            break
+    return sequence
+
+class MultiStopRoute:
+    """
+    Kết quả của optimize_stops().
+
+    Attributes:
+    - order: Các điểm dừng (id nút) theo thứ tự đi, kể cả điểm cuối
+    - cost: Tổng chi phí (inf nếu có chặng không có đường)
+    - leg_costs: Chi phí từng chặng giữa hai điểm dừng liên tiếp
+    - path: Đường đi đầy đủ (danh sách nút) nối tất cả các chặng; rỗng nếu có chặng không có đường
+    - matrix_time, solve_time: Thời gian tính ma trận chi phí và thời gian tìm thứ tự (giây)
+    """
+
+    def __init__(self, order, cost, leg_costs, path, matrix_time, solve_time):
+        self.order = order
+        self.cost = cost
+        self.leg_costs = leg_costs
+        self.path = path
+        self.matrix_time = matrix_time
+        self.solve_time = solve_time
+
+    def __repr__(self):
+        return f"MultiStopRoute(stops={len(self.order)}, cost={self.cost:.1f}, path_nodes={len(self.path)})"
+
+def optimize_stops(graph, stops, weight='length', start=0, end=None, closed=False, time_limit=1.0):
+    """
+    Tìm thứ tự đi qua nhiều điểm dừng với tổng chi phí nhỏ (bài toán người du lịch trên mạng
+    lưới đường) và nối thành một đường đi đầy đủ.
+
+    Ma trận chi phí được tính một lần (stop_matrix), thứ tự được dựng bằng láng giềng gần nhất
+    rồi cải thiện bằng 2-opt và Or-opt trong giới hạn thời gian. Đồ thị có hướng nên ma trận
+    không đối xứng và chi phí của đoạn bị đảo được tính lại đúng chiều. Các chặng của thứ tự
+    cuối cùng được nối bằng Dijkstra trên CompiledGraph.
+
+    Parameters:
+    - graph: Đồ thị dưới dạng đối tượng NetworkX
+    - stops: Danh sách nút cần đi qua (trùng lặp bị bỏ)
+    - weight: Thuộc tính của cạnh dùng làm trọng số (mặc định là 'length')
+    - start: Vị trí trong stops của điểm xuất phát
+    - end: Vị trí trong stops của điểm kết thúc cố định, None nếu kết thúc ở đâu cũng được
+    - closed: Quay về điểm xuất phát ở cuối (bỏ qua end)
+    - time_limit: Thời gian tối đa (giây) cho bước cải thiện
+
+    Returns:
+    - Đối tượng MultiStopRoute.
+    """
+    stops = list(stops)
+    start_node = stops[start]
+    end_node = stops[end] if end is not None and not closed else None
+    stops = list(dict.fromkeys(stops))
+    if not stops:
+        return MultiStopRoute([], 0.0, [], [], 0.0, 0.0)
+    start = stops.index(start_node)
+    end = stops.index(end_node) if end_node is not None else None
+
+    started = time.perf_counter()
+    matrix = stop_matrix(graph, stops, weight)
+    matrix_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    # Chặng không có đường được thay bằng chi phí phạt lớn để heuristic tránh chúng
+    finite = np.isfinite(matrix)
+    penalty = (matrix[finite].max() + 1.0) * len(stops) * 10 if finite.any() else 1.0
+    costs = np.where(finite, matrix, penalty).tolist()
+    sequence = nearest_neighbor_sequence(costs, start, end, closed)
+    sequence = improve_sequence(costs, sequence, fixed_end=closed or end is not None, time_limit=time_limit)
+    solve_time = time.perf_counter() - started
+
+    compiled = get_compiled(graph, weight)
+    leg_costs, path = [], []
+    for a, b in zip(sequence, sequence[1:]):
+        leg_costs.append(float(matrix[a][b]))
+        if not np.isfinite(matrix[a][b]):
+            path = None
+        if path is not None:
+            _, leg = csr_shortest_path(compiled, compiled.index[stops[a]], compiled.index[stops[b]])
+            path.extend(compiled.to_ids(leg)[1 if path else 0:])
+    if path is None:
+        path = []
+    elif len(sequence) == 1:
+        path = [stops[start]]
+    order = [stops[i] for i in sequence]
+    return MultiStopRoute(order, float(sum(leg_costs)), leg_costs, path, matrix_time, solve_time)
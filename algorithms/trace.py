@@ -0,0 +1,146 @@
+# algorithms/trace.py
+
+import itertools
+import threading
+
+class ExplorationTrace:
+    """
+    Ghi lại quá trình duyệt của một thuật toán: thứ tự các nút được mở rộng và ảnh chụp frontier.
+
+    Để dùng được với lần duyệt hàng trăm nghìn nút, dấu vết được lấy mẫu: chỉ giữ một
+    nút sau mỗi `stride` lần mở rộng, và khi số mẫu vượt quá max_points thì bỏ một nửa
+    số mẫu và tăng gấp đôi stride. Bộ nhớ vì vậy luôn bị chặn bởi max_points.
+
+    Parameters:
+    - max_points: Số mẫu nút đã mở rộng tối đa được giữ lại
+    - frontier_every: Chụp frontier sau mỗi bao nhiêu lần mở rộng (0 để tắt theo dõi frontier;
+      khi bật, tập frontier và tập nút đã mở rộng tốn bộ nhớ tỉ lệ với số nút đã thấy)
+    - frontier_sample: Số nút tối đa trong mỗi ảnh chụp frontier
+    """
+
+    def __init__(self, max_points=5000, frontier_every=0, frontier_sample=200):
+        self.max_points = max_points
+        self.frontier_every = frontier_every
+        self.frontier_sample = frontier_sample
+        self.expanded = 0
+        self.stride = 1
+        self.samples = []
+        self.frontier_snapshot = []
+        self._settled = set() if frontier_every else None
+        self._frontier = set() if frontier_every else None
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def record(self, node, neighbors):
+        """
+        Ghi nhận việc mở rộng một nút; được gọi từ TracingGraph.neighbors().
+
+        Returns:
+        - Iterable các láng giềng để thuật toán tiếp tục duyệt như bình thường.
+        """
+        count = self.expanded
+        self.expanded = count + 1
+        if count % self.stride == 0:
+            with self._lock:
+                self.samples.append(node)
+                self._pending.append(node)
+                if len(self._pending) > self.max_points:
+                    self._pending = self._pending[::2]
+                if len(self.samples) > self.max_points:
+                    self.samples = self.samples[::2]
+                    self.stride *= 2
+
+        if self._frontier is None:
+            return neighbors
+
+        # Theo dõi frontier: nút đã thấy nhưng chưa được mở rộng
+        neighbors = list(neighbors)
+        self._settled.add(node)
+        self._frontier.discard(node)
+        for neighbor in neighbors:
+            if neighbor not in self._settled:
+                self._frontier.add(neighbor)
+        if count % self.frontier_every == 0:
+            snapshot = list(itertools.islice(iter(self._frontier), self.frontier_sample))
+            with self._lock:
+                self.frontier_snapshot = snapshot
+        return neighbors
+
+    def drain(self):
+        """
+        Lấy các mẫu mới kể từ lần gọi trước; an toàn khi gọi từ luồng khác luồng thuật toán.
+
+        Returns:
+        - Tuple (danh sách nút mới được mở rộng, ảnh chụp frontier gần nhất).
+        """
+        with self._lock:
+            batch, self._pending = self._pending, []
+            return batch, self.frontier_snapshot
+
+    def summary(self, path=None):
+        """
+        Tóm tắt mức độ duyệt, dùng để chẩn đoán chất lượng heuristic.
+
+        Returns:
+        - Dict gồm số nút đã mở rộng, số nút frontier và tỉ lệ độ dài đường đi / số nút mở rộng
+          (càng gần 1 thì thuật toán càng ít duyệt thừa).
+        """
+        result = {
+            'expanded': self.expanded,
+            'sampled': len(self.samples),
+            'stride': self.stride,
+        }
+        if self._frontier is not None:
+            result['frontier'] = len(self._frontier)
+        if path:
+            result['path_nodes'] = len(path)
+            result['efficiency'] = len(path) / self.expanded if self.expanded else 0.0
+        return result
+
+class TracingGraph:
+    """
+    Lớp bọc đồ thị NetworkX ghi lại dấu vết duyệt của thuật toán qua graph.neighbors().
+
+    Thuật toán không cần biết mình đang bị theo dõi; khi không bọc đồ thị thì thuật toán
+    chạy với chi phí như cũ. Các thuộc tính khác được chuyển thẳng tới đồ thị gốc.
+    """
+
+    def __init__(self, graph, trace=None):
+        self._graph = graph
+        self.trace = trace
+        # Gắn trực tiếp các thuộc tính được truy cập nhiều để tránh chi phí của __getattr__
+        self.nodes = graph.nodes
+        self.get_edge_data = graph.get_edge_data
+
+    def neighbors(self, node):
+        neighbors = self._graph.neighbors(node)
+        if self.trace is not None:
+            return self.trace.record(node, neighbors)
+        return neighbors
+
+    def __getattr__(self, name):
+        return getattr(self._graph, name)
+
+    def __getitem__(self, node):
+        return self._graph[node]
+
+    def __contains__(self, node):
+        return node in self._graph
+
+    def __iter__(self):
+        return iter(self._graph)
+
+    def __len__(self):
+        return len(self._graph)
+
+def run_traced(func, graph, start, end, weight='length', trace=None, **kwargs):
+    """
+    Chạy một thuật toán trong registry và thu dấu vết duyệt.
+
+    Returns:
+    - Tuple (đường đi, ExplorationTrace).
+    """
+    if trace is None:
+        trace = ExplorationTrace()
+    path = func(TracingGraph(graph, trace), start, end, weight=weight, **kwargs)
+    return path, trace
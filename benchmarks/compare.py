@@ -1,3 +1,4 @@
+import argparse
 import os
 import time
 import random
@@ -7,6 +8,9 @@ import osmnx as ox
 from typing import List, Tuple
 from algorithms import ALGORITHMS  # Import tất cả các thuật toán đã đăng ký
 from loader.loader import load_map  # Import hàm load_map từ loader/loader.py
+from loader.preprocess import is_prepared, prepare, preprocess_graph, reachable
+from loader.paths import path_cost
+from benchmarks.profiling import PROFILE_MODES, profile_algorithms
 import logging
 
 # Cấu hình logging
@@ -57,6 +61,8 @@ def select_random_coordinates(graph: nx.Graph, num_pairs: int = 100) -> List[Tup
 def map_coordinates_to_nodes(graph: nx.Graph, coord_pairs: List[Tuple[Tuple[float, float], Tuple[float, float]]]) -> List[Tuple[str, str]]:
     """
     Chuyển đổi các cặp tọa độ thành các cặp nút gần nhất, đảm bảo rằng Start != End.
+    Cặp nút không có đường đi (theo SCC đã tính trong preprocess_graph) bị loại ngay,
+    không cần chạy thuật toán tìm đường nào.
     
     Returns:
         List of tuples containing pairs of node IDs.
@@ -66,10 +72,12 @@ def map_coordinates_to_nodes(graph: nx.Graph, coord_pairs: List[Tuple[Tuple[floa
         try:
             node_A = ox.nearest_nodes(graph, X=lon1, Y=lat1)
             node_B = ox.nearest_nodes(graph, X=lon2, Y=lat2)
-            if node_A != node_B:
-                node_pairs.append((node_A, node_B))
-            else:
+            if node_A == node_B:
                 logging.error(f"Cặp nút trùng lặp: Start={node_A}, End={node_B}. Bỏ qua.")
+            elif not reachable(graph, node_A, node_B):
+                logging.error(f"Không có đường đi: Start={node_A}, End={node_B}. Bỏ qua.")
+            else:
+                node_pairs.append((node_A, node_B))
         except Exception as e:
             logging.error(f"Lỗi khi tìm node gần nhất với tọa độ ({lat1}, {lon1}) hoặc ({lat2}, {lon2}): {e}")
     return node_pairs
@@ -95,10 +103,9 @@ def run_algorithm(algorithm_func, graph: nx.Graph, start: str, end: str, weight:
         runtime = end_time - start_time
         
         if path:
-            # Sử dụng OSMnx để lấy thuộc tính 'length' của từng cạnh trong đường đi
-            edge_lengths = ox.utils_graph.get_route_edge_attributes(graph, path, 'length')
-            path_length = sum(edge_lengths)
-            success = True
+            # Độ dài đường đi tính từ mảng cạnh đã biên dịch (cạnh song song lấy cạnh ngắn nhất)
+            path_length = path_cost(graph, path, 'length')
+            success = path_length != float('inf')
         else:
             path_length = float('inf')
             success = False
@@ -112,6 +119,16 @@ def run_algorithm(algorithm_func, graph: nx.Graph, start: str, end: str, weight:
     return runtime, path_length, success
 
 def main():
+    parser = argparse.ArgumentParser(description="So sánh thời gian chạy và độ dài đường đi của các thuật toán.")
+    parser.add_argument('--profile', choices=PROFILE_MODES, default=None,
+                        help="Profile các thuật toán trên tập cặp điểm thay vì đo thời gian")
+    parser.add_argument('--algorithms', nargs='+', default=None, help="Tên thuật toán cần profile (mặc định tất cả)")
+    parser.add_argument('--interval', type=float, default=0.001, help="Chu kỳ lấy mẫu (giây) ở chế độ sample")
+    parser.add_argument('--top', type=int, default=20, help="Số hàm trong bảng hotspot")
+    parser.add_argument('--compact', action='store_true',
+                        help="Tải đồ thị ở chế độ gọn (chỉ giữ thuộc tính cần cho định tuyến, hình học dạng mảng)")
+    args = parser.parse_args()
+
     # Thông tin địa lý
     ward_name = "Dien Bien Ward"  # Tên phường
     district_name = "Ba Dinh District"  # Tên quận
@@ -128,8 +145,11 @@ def main():
         return
     
     # Tải đồ thị sử dụng hàm load_map từ loader/loader.py
-    graph = load_map(" ".join([ward_name, district_name, city_name, country_name]), filepath=map_filepath)
+    graph = load_map(" ".join([ward_name, district_name, city_name, country_name]), filepath=map_filepath, compact=args.compact)
     print("Đã tải đồ thị thành công.")
+
+    # Tính SCC để loại ngay các cặp điểm không có đường đi
+    graph = preprocess_graph(graph)
     
     # Chọn 100 cặp tọa độ ngẫu nhiên
     num_pairs = 100
@@ -159,6 +179,11 @@ def main():
     # Kiểm tra tất cả các cặp nút đã có Start != End
     for start, end in node_pairs:
         assert start != end, f"Cặp nút không hợp lệ: Start={start}, End={end}"
+
+    # Chế độ profile: ghi flame graph và bảng hotspot cho từng thuật toán rồi dừng
+    if args.profile:
+        profile_algorithms(graph, node_pairs, args.algorithms, args.profile, args.interval, args.top)
+        return
     
     # Chuẩn bị dữ liệu cho CSV
     data = []
@@ -168,6 +193,20 @@ def main():
     algorithm_names = list(algorithms.keys())
     
     print(f"Đang chạy {len(algorithm_names)} thuật toán trên {len(node_pairs)} cặp điểm...")
+
+    # Tạo trước dữ liệu tiền xử lý (arc flags, CRP, hub labels...) để chi phí tạo một lần này
+    # không bị tính vào Runtime_Seconds của cặp đầu tiên
+    for algo_name, algo_info in algorithms.items():
+        key = algo_info.spec.preprocessing
+        if key is None or is_prepared(graph, key):
+            continue
+        start_time = time.perf_counter()
+        try:
+            prepare(graph, key)
+            print(f"Tiền xử lý '{key}' cho {algo_name}: {time.perf_counter() - start_time:.2f}s")
+        except Exception as e:
+            print(f"Lỗi khi tiền xử lý '{key}' cho {algo_name}: {e}")
+            logging.error(f"Lỗi khi tiền xử lý '{key}' cho {algo_name}: {e}")
     
     # Duyệt qua từng cặp điểm
     for idx, (start, end) in enumerate(node_pairs, 1):
@@ -0,0 +1,340 @@
+import cProfile
+import logging
+import os
+import pstats
+import re
+import signal
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import matplotlib.pyplot as plt
+import networkx as nx
+import pandas as pd
+from matplotlib.patches import Rectangle
+
+from algorithms import ALGORITHMS  # Import tất cả các thuật toán đã đăng ký
+
+PROFILE_MODES = ('sample', 'deterministic')
+
+def _label(filename: str, line: int, name: str) -> str:
+    # Tên hàm kèm file:dòng; hàm built-in của cProfile không có file (filename '~')
+    if filename == '~':
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+def _code_label(code) -> str:
+    return _label(code.co_filename, code.co_firstlineno, code.co_name)
+
+class StackSampler:
+    """
+    Profiler lấy mẫu: cứ mỗi interval giây thời gian CPU ghi lại ngăn xếp Python của luồng
+    đang chạy truy vấn. Mẫu của nhiều lần runcall() được cộng dồn vào samples.
+
+    Trên Linux/macOS dùng tín hiệu SIGPROF (signal.setitimer) nên không có luồng phụ tranh GIL
+    và chi phí chỉ là một lần duyệt ngăn xếp mỗi mẫu. Nơi không có setitimer (Windows) hoặc khi
+    không chạy ở luồng chính thì dùng một luồng phụ đọc sys._current_frames().
+
+    Attributes:
+    - samples: Counter {tuple code object từ lá lên gốc: số mẫu}, chỉ gồm các frame bên dưới runcall()
+    - interval: Chu kỳ lấy mẫu (giây)
+    - seconds: Tổng thời gian (đồng hồ thường) của các lần runcall()
+    """
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.samples = Counter()
+        self.seconds = 0.0
+        self._use_signal = hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread()
+
+    def _record(self, frame):
+        # Chỉ giữ các frame nằm dưới runcall(): bỏ frame của chính profiler và của chương trình gọi
+        codes = []
+        while frame is not None and frame.f_code is not _RUNCALL_CODE:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        if frame is not None and codes:
+            self.samples[tuple(codes)] += 1
+
+    def _handler(self, signum, frame):
+        self._record(frame)
+
+    def _poll(self, ident, stop):
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(ident)
+            if frame is not None:
+                self._record(frame)
+
+    def runcall(self, func, *args, **kwargs):
+        """
+        Gọi func(*args, **kwargs) trong khi lấy mẫu và trả về kết quả của nó.
+        """
+        started = time.perf_counter()
+        if self._use_signal:
+            previous = signal.signal(signal.SIGPROF, self._handler)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                signal.setitimer(signal.ITIMER_PROF, 0, 0)
+                signal.signal(signal.SIGPROF, previous)
+                self.seconds += time.perf_counter() - started
+        stop = threading.Event()
+        poller = threading.Thread(target=self._poll, args=(threading.get_ident(), stop), daemon=True)
+        poller.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stop.set()
+            poller.join()
+            self.seconds += time.perf_counter() - started
+
+_RUNCALL_CODE = StackSampler.runcall.__code__
+
+class QueryProfile:
+    """
+    Kết quả profile một thuật toán trên tập truy vấn, cộng dồn qua mọi truy vấn.
+
+    Attributes:
+    - mode: 'sample' hoặc 'deterministic'
+    - stacks: Counter {tuple nhãn hàm từ gốc xuống lá: số mẫu} (chế độ sample)
+    - stats: pstats.Stats của cProfile (chế độ deterministic)
+    - interval: Chu kỳ lấy mẫu (giây), None với chế độ deterministic
+    - seconds: Tổng thời gian chạy các truy vấn khi đang profile
+    - queries, errors: Số truy vấn đã chạy và số truy vấn bị lỗi
+    """
+
+    def __init__(self, mode: str, stacks: Counter = None, stats: pstats.Stats = None,
+                 interval: Optional[float] = None, seconds: float = 0.0, queries: int = 0, errors: int = 0):
+        self.mode = mode
+        self.stacks = stacks if stacks is not None else Counter()
+        self.stats = stats
+        self.interval = interval
+        self.seconds = seconds
+        self.queries = queries
+        self.errors = errors
+
+    def hotspots(self, top: int = 20) -> pd.DataFrame:
+        """
+        Bảng top hàm tốn thời gian nhất, xếp theo thời gian tự thân (không tính hàm con).
+
+        Returns:
+            pd.DataFrame: Chế độ sample có Self_Samples/Total_Samples, chế độ deterministic có Calls;
+            cả hai có Self_Seconds, Total_Seconds, Self_Percent, Total_Percent.
+        """
+        if self.mode == 'sample':
+            rows = self._sample_rows()
+        else:
+            rows = self._deterministic_rows()
+        columns = ['Function', 'Self_Seconds', 'Total_Seconds', 'Self_Percent', 'Total_Percent']
+        if not rows:
+            return pd.DataFrame(columns=columns)
+        df = pd.DataFrame(rows)
+        return df.sort_values(['Self_Seconds', 'Total_Seconds'], ascending=False).head(top).reset_index(drop=True)
+
+    def _sample_rows(self) -> List[dict]:
+        total = sum(self.stacks.values())
+        # Chu kỳ thực của bộ định thời có thể thô hơn interval, nên thời gian được suy ra từ tỉ lệ mẫu
+        # nhân tổng thời gian đo được thay vì số mẫu nhân interval
+        per_sample = self.seconds / total if total else 0.0
+        self_samples, total_samples = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            self_samples[stack[-1]] += count
+            # Hàm đệ quy xuất hiện nhiều lần trong một ngăn xếp chỉ tính một lần
+            for name in set(stack):
+                total_samples[name] += count
+        return [{
+            'Function': name,
+            'Self_Samples': self_samples[name],
+            'Total_Samples': count,
+            'Self_Seconds': self_samples[name] * per_sample,
+            'Total_Seconds': count * per_sample,
+            'Self_Percent': 100.0 * self_samples[name] / total,
+            'Total_Percent': 100.0 * count / total,
+        } for name, count in total_samples.items()]
+
+    def _deterministic_rows(self) -> List[dict]:
+        if self.stats is None:
+            return []
+        entries = [(key, value) for key, value in self.stats.stats.items()
+                   if not (key[0] == '~' and '_lsprof.Profiler' in key[2])]
+        total = sum(value[2] for _, value in entries) or 1.0
+        return [{
+            'Function': _label(*key),
+            'Calls': calls,
+            'Self_Seconds': self_time,
+            'Total_Seconds': cumulative,
+            'Self_Percent': 100.0 * self_time / total,
+            'Total_Percent': 100.0 * cumulative / total,
+        } for key, (_, calls, self_time, cumulative, _) in entries]
+
+def profile_queries(func, graph: nx.Graph, pairs: List[Tuple[int, int]], mode: str = 'sample',
+                    interval: float = 0.001, weight: str = 'length') -> QueryProfile:
+    """
+    Profile một thuật toán trên các cặp điểm, cộng dồn ngăn xếp (hoặc thống kê cProfile) qua mọi truy vấn.
+
+    Args:
+        func: Hàm thuật toán tìm đường đi.
+        graph (nx.Graph): Đồ thị.
+        pairs (List[Tuple[int, int]]): Các cặp (start, end).
+        mode (str): 'sample' (lấy mẫu, chi phí thấp) hoặc 'deterministic' (cProfile, đếm mọi lần gọi).
+        interval (float): Chu kỳ lấy mẫu (giây) ở chế độ sample.
+        weight (str): Thuộc tính trọng số của các cạnh.
+
+    Returns:
+        QueryProfile: Kết quả đã cộng dồn.
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Chế độ profile không hợp lệ: {mode!r}, chọn một trong {PROFILE_MODES}.")
+    profiler = StackSampler(interval) if mode == 'sample' else cProfile.Profile()
+    errors = 0
+    started = time.perf_counter()
+    for start, end in pairs:
+        try:
+            profiler.runcall(func, graph, start, end, weight=weight)
+        except Exception as e:
+            errors += 1
+            logging.error(f"Lỗi khi profile thuật toán {func.__name__} từ {start} đến {end}: {e}")
+    if mode == 'sample':
+        stacks = Counter()
+        labels = {}
+        for codes, count in profiler.samples.items():
+            for code in codes:
+                if code not in labels:
+                    labels[code] = _code_label(code)
+            stacks[tuple(labels[code] for code in reversed(codes))] += count
+        return QueryProfile(mode, stacks=stacks, interval=interval, seconds=profiler.seconds,
+                            queries=len(pairs), errors=errors)
+    stats = pstats.Stats(profiler) if profiler.getstats() else None
+    return QueryProfile(mode, stats=stats, seconds=time.perf_counter() - started, queries=len(pairs), errors=errors)
+
+def write_collapsed(stacks: Counter, output_path: str):
+    """
+    Ghi ngăn xếp dạng collapsed ("gốc;...;lá số_mẫu" mỗi dòng), đọc được bằng flamegraph.pl,
+    speedscope hoặc inferno.
+    """
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{';'.join(stack)} {count}\n")
+
+def plot_flamegraph(stacks: Counter, title: str, output_path: str, min_fraction: float = 0.002):
+    """
+    Vẽ flame graph từ ngăn xếp đã cộng dồn: mỗi hình chữ nhật là một hàm, rộng theo số mẫu,
+    hàm con nằm trên hàm gọi nó. Các khung hẹp hơn min_fraction tổng số mẫu bị bỏ.
+    """
+    total = sum(stacks.values())
+    if not total:
+        return
+    # Cây tiền tố của các ngăn xếp: {tên: [số mẫu, cây con]}
+    tree = {}
+    for stack, count in stacks.items():
+        level = tree
+        for name in stack:
+            node = level.setdefault(name, [0, {}])
+            node[0] += count
+            level = node[1]
+
+    boxes = []
+
+    def layout(level, x, depth):
+        for name, (count, children) in sorted(level.items()):
+            if count >= min_fraction * total:
+                boxes.append((x, depth, count, name))
+                layout(children, x, depth + 1)
+            x += count
+
+    layout(tree, 0, 0)
+    depth = max(box[1] for box in boxes) + 1
+    fig, ax = plt.subplots(figsize=(14, max(3.0, 0.28 * depth + 1.0)))
+    for x, y, width, name in boxes:
+        # Màu ấm cố định theo tên hàm để cùng hàm cùng màu giữa các thuật toán
+        shade = zlib.crc32(name.encode('utf-8')) % 1000 / 1000
+        ax.add_patch(Rectangle((x, y), width, 1, facecolor=(1.0, 0.35 + 0.5 * shade, 0.1 + 0.2 * shade),
+                               edgecolor='white', linewidth=0.5))
+        chars = int(width / total * 180)
+        if chars >= 4:
+            text = name if len(name) <= chars else name[:chars - 2] + '..'
+            ax.text(x + total * 0.002, y + 0.5, text, va='center', fontsize=7, clip_on=True)
+    ax.set_xlim(0, total)
+    ax.set_ylim(0, depth)
+    ax.set_yticks([])
+    ax.set_xlabel('Số mẫu')
+    ax.set_title(title)
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close(fig)
+
+def _slug(name: str) -> str:
+    return re.sub(r'[^0-9a-z]+', '_', name.lower()).strip('_')
+
+def write_profile(profile: QueryProfile, name: str, output_dir: str, top: int = 20) -> pd.DataFrame:
+    """
+    Ghi kết quả profile của một thuật toán vào output_dir.
+
+    Chế độ sample ghi <thuật toán>.collapsed và <thuật toán>_flame.png; chế độ deterministic ghi
+    <thuật toán>.prof (mở bằng snakeviz hoặc pstats). Cả hai ghi <thuật toán>_hotspots.csv.
+
+    Returns:
+        pd.DataFrame: Bảng top-N hàm tốn thời gian nhất.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, _slug(name))
+    if profile.mode == 'sample':
+        write_collapsed(profile.stacks, base + '.collapsed')
+        plot_flamegraph(profile.stacks, f"{name}: {sum(profile.stacks.values())} mẫu, {profile.queries} truy vấn",
+                        base + '_flame.png')
+    elif profile.stats is not None:
+        profile.stats.dump_stats(base + '.prof')
+    hotspots = profile.hotspots(top)
+    hotspots.to_csv(base + '_hotspots.csv', index=False)
+    return hotspots
+
+def profile_algorithms(graph: nx.Graph, pairs: List[Tuple[int, int]], algorithms: Optional[List[str]] = None,
+                       mode: str = 'sample', interval: float = 0.001, top: int = 20,
+                       output_dir: str = os.path.join('statistics', 'profiles'),
+                       weight: str = 'length') -> Dict[str, pd.DataFrame]:
+    """
+    Chế độ profile của benchmark: profile từng thuật toán trên cùng tập truy vấn, ghi file
+    flame graph/hotspot và in bảng top-N của mỗi thuật toán.
+
+    Lần gọi đầu tiên chạy ngoài profiler vì nó gồm cả biên dịch đồ thị và tiền xử lý (arc flags,
+    CRP, hub labels...), không phải chi phí của truy vấn.
+
+    Args:
+        graph (nx.Graph): Đồ thị.
+        pairs (List[Tuple[int, int]]): Các cặp (start, end).
+        algorithms (Optional[List[str]]): Tên các thuật toán cần profile, mặc định tất cả.
+        mode (str): 'sample' hoặc 'deterministic'.
+        interval (float): Chu kỳ lấy mẫu (giây) ở chế độ sample.
+        top (int): Số hàm trong bảng hotspot.
+        output_dir (str): Thư mục ghi kết quả.
+        weight (str): Thuộc tính trọng số của các cạnh.
+
+    Returns:
+        Dict[str, pd.DataFrame]: {tên thuật toán: bảng hotspot}.
+    """
+    names = algorithms or list(ALGORITHMS.keys())
+    results = {}
+    summary = []
+    for name in names:
+        func = ALGORITHMS[name].func
+        if pairs:
+            try:
+                func(graph, *pairs[0], weight=weight)
+            except Exception as e:
+                logging.error(f"Lỗi khi chạy thuật toán {name}: {e}")
+        profile = profile_queries(func, graph, pairs, mode, interval, weight)
+        hotspots = write_profile(profile, name, output_dir, top)
+        results[name] = hotspots
+        summary.append(pd.concat([pd.DataFrame({'Algorithm': [name] * len(hotspots)}), hotspots], axis=1))
+        detail = f"{sum(profile.stacks.values())} mẫu, " if mode == 'sample' else ''
+        print(f"\n{name}: {profile.queries} truy vấn trong {profile.seconds:.2f}s ({detail}{profile.errors} lỗi)")
+        print(hotspots.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    if summary:
+        summary_csv = os.path.join(output_dir, 'hotspots.csv')
+        pd.concat(summary, ignore_index=True).to_csv(summary_csv, index=False)
+        print(f"\nĐã lưu kết quả profile vào thư mục: {output_dir}")
+    return results
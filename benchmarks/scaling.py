@@ -0,0 +1,257 @@
+import argparse
+import math
+import os
+import random
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+from algorithms import ALGORITHMS  # Import tất cả các thuật toán đã đăng ký
+from loader.paths import path_cost
+from loader.preprocess import preprocess_graph
+from loader.synthetic import GENERATORS
+from benchmarks.profiling import PROFILE_MODES, profile_queries, write_profile
+
+DEFAULT_SIZES = [1000, 4000, 16000, 64000]
+
+def build_graph(num_nodes: int, generator: str = 'grid', seed: int = 0) -> nx.MultiDiGraph:
+    """
+    Sinh đồ thị giả lập và chỉ giữ SCC lớn nhất để mọi cặp điểm truy vấn đều có đường đi.
+
+    Args:
+        num_nodes (int): Số nút của đồ thị sinh ra.
+        generator (str): Tên generator trong loader/synthetic.py.
+        seed (int): Hạt giống ngẫu nhiên.
+
+    Returns:
+        nx.MultiDiGraph: Đồ thị đã tiền xử lý.
+    """
+    graph = GENERATORS[generator](num_nodes, seed=seed).to_networkx()
+    return preprocess_graph(graph, largest_component=True)
+
+def select_node_pairs(graph: nx.Graph, num_pairs: int, seed: int = 0) -> List[Tuple[int, int]]:
+    """
+    Chọn ngẫu nhiên num_pairs cặp nút khác nhau (đồ thị đã là một SCC nên luôn có đường đi).
+    """
+    rng = random.Random(seed)
+    nodes = list(graph.nodes)
+    if len(nodes) < 2:
+        return []
+    return [tuple(rng.sample(nodes, 2)) for _ in range(num_pairs)]
+
+def time_query(func, graph: nx.Graph, start, end, weight: str = 'length') -> Tuple[float, bool]:
+    """
+    Chạy một truy vấn và đo thời gian.
+
+    Returns:
+        Tuple[float, bool]: Thời gian chạy (giây) và có tìm thấy đường đi hợp lệ hay không.
+    """
+    started = time.perf_counter()
+    path = func(graph, start, end, weight=weight)
+    runtime = time.perf_counter() - started
+    return runtime, bool(path) and path_cost(graph, path, weight) != float('inf')
+
+def peak_memory(func, graph: nx.Graph, pairs: List[Tuple[int, int]], weight: str = 'length') -> float:
+    """
+    Bộ nhớ cấp phát lớn nhất (MB) trong một truy vấn, đo bằng tracemalloc trên một vài cặp.
+    Đo riêng với lần đo thời gian vì tracemalloc làm chậm thuật toán.
+    """
+    peak = 0
+    for start, end in pairs:
+        tracemalloc.start()
+        try:
+            func(graph, start, end, weight=weight)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    return peak / 2 ** 20
+
+def fit_power_law(sizes: List[float], values: List[float]) -> Optional[Tuple[float, float]]:
+    """
+    Khớp values ≈ coefficient * size^exponent bằng hồi quy tuyến tính trên thang log-log.
+
+    Returns:
+        Optional[Tuple[float, float]]: (coefficient, exponent), None nếu có ít hơn hai điểm hợp lệ.
+    """
+    points = [(s, v) for s, v in zip(sizes, values) if s > 0 and v > 0 and math.isfinite(v)]
+    if len(points) < 2:
+        return None
+    exponent, intercept = np.polyfit(np.log([s for s, _ in points]), np.log([v for _, v in points]), 1)
+    return float(math.exp(intercept)), float(exponent)
+
+def usable_limit(fit: Optional[Tuple[float, float]], budget: float) -> float:
+    """
+    Số nút mà tại đó thời gian theo mô hình khớp được vượt quá budget giây (inf nếu không tăng).
+    """
+    if fit is None:
+        return float('nan')
+    coefficient, exponent = fit
+    if exponent <= 0:
+        return float('inf')
+    return (budget / coefficient) ** (1 / exponent)
+
+def run_scaling(sizes: List[int], generator: str = 'grid', num_queries: int = 20, budget: float = 1.0,
+                memory_queries: int = 3, algorithms: Optional[List[str]] = None, seed: int = 0,
+                profile: Optional[str] = None, profile_interval: float = 0.001,
+                profile_dir: str = os.path.join('statistics', 'profiles')) -> pd.DataFrame:
+    """
+    Chạy mọi thuật toán (hoặc các thuật toán trong algorithms) trên đồ thị giả lập ở từng kích thước.
+
+    Một thuật toán bị bỏ qua ở kích thước lớn hơn khi thời gian trung bình đã vượt budget,
+    khi mô hình khớp từ các kích thước trước dự đoán sẽ vượt budget, hoặc khi vượt max_nodes
+    của nó trong registry. Lần gọi đầu tiên được đo riêng (Setup_Seconds) vì nó bao gồm biên
+    dịch đồ thị và tiền xử lý (arc flags, CRP, hub labels...).
+
+    Args:
+        sizes (List[int]): Các kích thước đồ thị (số nút).
+        generator (str): Tên generator trong loader/synthetic.py.
+        num_queries (int): Số cặp điểm mỗi kích thước.
+        budget (float): Thời gian trung bình tối đa (giây) cho một truy vấn.
+        memory_queries (int): Số cặp dùng để đo bộ nhớ.
+        algorithms (Optional[List[str]]): Tên các thuật toán cần chạy, mặc định tất cả.
+        seed (int): Hạt giống ngẫu nhiên.
+        profile (Optional[str]): 'sample' hoặc 'deterministic' để profile thêm mỗi thuật toán đã chạy
+            ở từng kích thước, ghi vào profile_dir/<generator>_<kích thước>.
+        profile_interval (float): Chu kỳ lấy mẫu (giây) ở chế độ sample.
+        profile_dir (str): Thư mục ghi kết quả profile.
+
+    Returns:
+        pd.DataFrame: Mỗi dòng là một (kích thước, thuật toán).
+    """
+    names = algorithms or list(ALGORITHMS.keys())
+    history: Dict[str, List[Tuple[int, float]]] = {name: [] for name in names}
+    stopped = set()
+    rows = []
+    for size in sorted(sizes):
+        started = time.perf_counter()
+        graph = build_graph(size, generator, seed)
+        nodes, edges = graph.number_of_nodes(), graph.number_of_edges()
+        print(f"Đồ thị {generator} {size} nút: {nodes} nút, {edges} cạnh sau khi giữ SCC lớn nhất "
+              f"({time.perf_counter() - started:.1f}s).")
+        pairs = select_node_pairs(graph, num_queries, seed)
+        for name in names:
+            spec = ALGORITHMS[name].spec
+            row = {'Size': size, 'Nodes': nodes, 'Edges': edges, 'Algorithm': name, 'Setup_Seconds': np.nan,
+                   'Mean_Runtime_Seconds': np.nan, 'Median_Runtime_Seconds': np.nan, 'Peak_Memory_MB': np.nan,
+                   'Success_Rate': np.nan, 'Status': 'ok'}
+            fit = fit_power_law([n for n, _ in history[name]], [t for _, t in history[name]])
+            if spec.max_nodes is not None and nodes > spec.max_nodes:
+                row['Status'] = 'max_nodes'
+            elif name in stopped:
+                row['Status'] = 'over_budget'
+            elif fit is not None and fit[0] * nodes ** fit[1] > budget:
+                row['Status'] = 'predicted_over_budget'
+                stopped.add(name)
+            if row['Status'] != 'ok':
+                print(f"  {name}: bỏ qua ({row['Status']})")
+                rows.append(row)
+                continue
+
+            func = ALGORITHMS[name].func
+            try:
+                setup, _ = time_query(func, graph, *pairs[0])
+                results = [time_query(func, graph, start, end) for start, end in pairs]
+                memory = peak_memory(func, graph, pairs[:memory_queries])
+            except Exception as e:
+                print(f"  {name}: lỗi {e}")
+                row['Status'] = 'error'
+                rows.append(row)
+                continue
+            runtimes = [runtime for runtime, _ in results]
+            row.update({
+                'Setup_Seconds': setup,
+                'Mean_Runtime_Seconds': float(np.mean(runtimes)),
+                'Median_Runtime_Seconds': float(np.median(runtimes)),
+                'Peak_Memory_MB': memory,
+                'Success_Rate': sum(success for _, success in results) / len(results),
+            })
+            history[name].append((nodes, row['Mean_Runtime_Seconds']))
+            if row['Mean_Runtime_Seconds'] > budget:
+                stopped.add(name)
+            print(f"  {name}: {row['Mean_Runtime_Seconds'] * 1000:.2f} ms/truy vấn, "
+                  f"{memory:.1f} MB, chuẩn bị {setup:.2f}s")
+            if profile:
+                # Profile chạy riêng sau khi đo để không làm sai thời gian và bộ nhớ ở trên
+                result = profile_queries(func, graph, pairs, profile, profile_interval)
+                write_profile(result, name, os.path.join(profile_dir, f"{generator}_{size}"))
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+def summarize(df: pd.DataFrame, budget: float = 1.0) -> pd.DataFrame:
+    """
+    Khớp mô hình lũy thừa cho thời gian chạy và bộ nhớ của từng thuật toán.
+
+    Returns:
+        pd.DataFrame: Số mũ tăng trưởng thời gian/bộ nhớ và số nút ước tính mà tại đó thời gian
+        trung bình vượt budget (Usable_Limit_Nodes).
+    """
+    summary = []
+    for name, group in df[df['Status'] == 'ok'].groupby('Algorithm'):
+        runtime_fit = fit_power_law(group['Nodes'].tolist(), group['Mean_Runtime_Seconds'].tolist())
+        memory_fit = fit_power_law(group['Nodes'].tolist(), group['Peak_Memory_MB'].tolist())
+        summary.append({
+            'Algorithm': name,
+            'Largest_Size_Run': int(group['Nodes'].max()),
+            'Runtime_Exponent': runtime_fit[1] if runtime_fit else np.nan,
+            'Memory_Exponent': memory_fit[1] if memory_fit else np.nan,
+            'Usable_Limit_Nodes': usable_limit(runtime_fit, budget),
+        })
+    return pd.DataFrame(summary).sort_values('Usable_Limit_Nodes', ascending=False)
+
+def plot_growth(df: pd.DataFrame, column: str, ylabel: str, title: str, output_path: str):
+    """
+    Vẽ đường tăng trưởng của một cột theo số nút (thang log-log) cho từng thuật toán.
+    """
+    plt.figure(figsize=(10, 6))
+    for name, group in df[df['Status'] == 'ok'].groupby('Algorithm'):
+        plt.plot(group['Nodes'], group[column], marker='o', label=name)
+    plt.xscale('log')
+    plt.yscale('log')
+    plt.title(title)
+    plt.xlabel('Số nút')
+    plt.ylabel(ylabel)
+    plt.legend(fontsize='small', ncol=2)
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close()
+    print(f"Đã lưu biểu đồ vào {output_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo mức tăng thời gian chạy và bộ nhớ của các thuật toán "
+                                                 "theo kích thước đồ thị giả lập.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Các kích thước đồ thị (số nút)")
+    parser.add_argument('--generator', choices=sorted(GENERATORS), default='grid')
+    parser.add_argument('--queries', type=int, default=20, help="Số cặp điểm mỗi kích thước")
+    parser.add_argument('--budget', type=float, default=1.0, help="Thời gian tối đa (giây) cho một truy vấn")
+    parser.add_argument('--algorithms', nargs='+', default=None, help="Tên thuật toán cần chạy (mặc định tất cả)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output-dir', default='statistics')
+    parser.add_argument('--profile', choices=PROFILE_MODES, default=None,
+                        help="Profile thêm từng thuật toán ở mỗi kích thước (flame graph và bảng hotspot)")
+    parser.add_argument('--profile-interval', type=float, default=0.001, help="Chu kỳ lấy mẫu (giây) ở chế độ sample")
+    args = parser.parse_args()
+
+    df = run_scaling(args.sizes, args.generator, args.queries, args.budget, algorithms=args.algorithms, seed=args.seed,
+                     profile=args.profile, profile_interval=args.profile_interval,
+                     profile_dir=os.path.join(args.output_dir, 'profiles'))
+    results_csv = os.path.join(args.output_dir, f"scaling_{args.generator}.csv")
+    df.to_csv(results_csv, index=False)
+    print(f"Đã lưu kết quả vào file CSV: {results_csv}")
+
+    summary = summarize(df, args.budget)
+    summary_csv = os.path.join(args.output_dir, f"scaling_{args.generator}_summary.csv")
+    summary.to_csv(summary_csv, index=False)
+    print(summary.to_string(index=False))
+
+    plot_growth(df, 'Mean_Runtime_Seconds', 'Thời gian trung bình (giây)', 'Thời Gian Chạy Theo Kích Thước Đồ Thị',
+                os.path.join(args.output_dir, f"scaling_{args.generator}_runtime.png"))
+    plot_growth(df, 'Peak_Memory_MB', 'Bộ nhớ lớn nhất (MB)', 'Bộ Nhớ Theo Kích Thước Đồ Thị',
+                os.path.join(args.output_dir, f"scaling_{args.generator}_memory.png"))
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,15 @@ from typing import List, Tuple
 
 from algorithms import ALGORITHMS  # Import registry từ algorithms/__init__.py
 from loader.loader import load_map
+from gui.worker import RouteWorker
+from gui.renderer import MapRenderer
+from algorithms.trace import ExplorationTrace
+from algorithms.multi_stop import optimize_stops
+from loader.preprocess import is_prepared, reachable
+from loader.paths import path_cost, path_coordinates
+
+# Tên hiển thị (trong legend, nhãn chi phí) của lộ trình nhiều điểm dừng
+MULTI_STOP_NAME = "Lộ trình nhiều điểm"
 
 class MapApp:
     def __init__(self, master, graph):
@@ -17,6 +26,7 @@ class MapApp:
         self.points = []
         self.node_A = None
         self.node_B = None
+        self.nodes_reachable = True
 
         # Tạo Frame chính để chứa map và control
         self.main_frame = tk.Frame(self.master)
@@ -31,18 +41,13 @@ class MapApp:
         self.control_frame.pack(side=tk.RIGHT, fill=tk.Y)
 
         # Tạo Figure và Axes cho matplotlib với màu nền trắng và màu sắc đẹp hơn
-        self.fig, self.ax = ox.plot_graph(
-            self.graph,
-            show=False,
-            close=False,
-            edge_color='#999999',
-            node_size=0,
-            bgcolor='white'
-        )
-        self.ax.set_facecolor('white')  # Đặt màu nền cho Axes
+        self.fig, self.ax = plt.subplots(figsize=(8, 8))
 
         # Tạo Canvas cho matplotlib và nhúng vào tkinter
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.map_frame)
+
+        # Bản đồ nền được vẽ một lần, các đường đi được vẽ chồng lên bằng blitting
+        self.renderer = MapRenderer(self.fig, self.ax, self.graph, edge_color='#999999', bgcolor='white')
         self.canvas.draw()
         self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
 
@@ -54,6 +59,25 @@ class MapApp:
         self.cost_label = tk.Label(self.control_frame, text="Chi phí đường đi:\n", font=("Arial", 12), justify=tk.LEFT)
         self.cost_label.pack(pady=(0, 10))
 
+        # Thêm nhãn hiển thị tiến độ các thuật toán đang chạy nền
+        self.progress_label = tk.Label(self.control_frame, text="", font=("Arial", 10), justify=tk.LEFT, fg='#555555')
+        self.progress_label.pack(pady=(0, 10))
+
+        # Thêm tùy chọn hiển thị vùng duyệt của thuật toán
+        self.show_exploration = tk.BooleanVar(value=True)
+        self.exploration_check = tk.Checkbutton(self.control_frame, text="Hiển thị vùng duyệt", variable=self.show_exploration)
+        self.exploration_check.pack(pady=(0, 10))
+
+        # Chế độ nhiều điểm dừng: chọn nhiều điểm rồi tìm thứ tự đi tốt nhất
+        self.multi_stop = tk.BooleanVar(value=False)
+        self.multi_stop_check = tk.Checkbutton(self.control_frame, text="Nhiều điểm dừng", variable=self.multi_stop)
+        self.multi_stop_check.pack(pady=(0, 10))
+        self.return_to_start = tk.BooleanVar(value=False)
+        self.return_check = tk.Checkbutton(self.control_frame, text="Quay về điểm đầu", variable=self.return_to_start)
+
+        # Thêm nút tối ưu lộ trình nhiều điểm (ẩn ban đầu)
+        self.optimize_button = tk.Button(self.control_frame, text="Tối ưu lộ trình", command=self.optimize_route, width=15)
+
         # Thêm nhãn để chọn thuật toán
         self.algorithm_label = tk.Label(self.control_frame, text="Chọn thuật toán:", font=("Arial", 12))
         self.algorithm_label.pack(pady=(0, 5))
@@ -72,30 +96,51 @@ class MapApp:
         self.algorithm_dropdown.bind("<<ComboboxSelected>>", self.on_algorithm_selected)
         self.algorithm_dropdown.pack_forget()  # Ẩn dropdown ban đầu
 
+        # Thêm nút chạy đồng thời tất cả thuật toán (ẩn ban đầu)
+        self.run_all_button = tk.Button(self.control_frame, text="Chạy tất cả", command=self.run_all_algorithms, width=15)
+        self.run_all_button.pack(pady=(0, 10))
+        self.run_all_button.pack_forget()
+
         # Kết nối sự kiện click chuột
         self.cid = self.fig.canvas.mpl_connect('button_press_event', self.on_click)
 
         # Định nghĩa màu sắc cho từng thuật toán từ registry
         self.algorithm_colors = {name: info['color'] for name, info in ALGORITHMS.items()}
+        self.algorithm_colors[MULTI_STOP_NAME] = '#d62728'
 
         # Tạo danh sách để lưu các Line2D cho legend
         self.legend_handles = []
         self.legend_labels = []
 
         # Biến để quản lý animation
-        self.current_animation = None  # Giữ trạng thái animation hiện tại
+        self.animations = {}  # Trạng thái animation của từng thuật toán đang được vẽ
         self.animation_speed = 100  # Milliseconds giữa mỗi bước vẽ
+        self.animation_job = None  # Lần gọi after() kế tiếp của animation
+
+        # Biến để quản lý các thuật toán chạy nền
+        self.worker = RouteWorker()
+        self.requested_algorithms = set()  # Các thuật toán đã được yêu cầu từ lần reset gần nhất
+        self.batch_algorithms = set()  # Các thuật toán được chạy qua nút "Chạy tất cả"
+        self.poll_interval = 100  # Milliseconds giữa mỗi lần kiểm tra kết quả
+        self.poll_job = None
+        self.exploration_points = 5000  # Số mẫu tối đa của vùng duyệt cho mỗi thuật toán
 
     def on_click(self, event):
-        if event.xdata and event.ydata:
+        # Chỉ chuột trái dùng để chọn điểm; chuột phải dùng để kéo bản đồ
+        if event.button == 1 and event.xdata and event.ydata:
             # Chuyển đổi từ hệ trục matplotlib sang latitude và longitude
             lon, lat = event.xdata, event.ydata
             print(f"Bạn đã chọn điểm: Latitude={lat}, Longitude={lon}")
             self.points.append((lat, lon))
             # Vẽ điểm trên bản đồ
-            self.ax.plot(lon, lat, marker='o', markersize=8, markeredgecolor='red', markerfacecolor='yellow')
-            self.canvas.draw()
-            if len(self.points) == 2:
+            self.renderer.add_marker(lon, lat, marker='o', markersize=8, markeredgecolor='red', markerfacecolor='yellow')
+            if self.multi_stop.get():
+                # Chọn tiếp cho tới khi bấm "Tối ưu lộ trình"
+                self.multi_stop_check.config(state=tk.DISABLED)
+                if len(self.points) == 2:
+                    self.return_check.pack(pady=(0, 5))
+                    self.optimize_button.pack(pady=(0, 10))
+            elif len(self.points) == 2:
                 # Ngắt kết nối sự kiện sau khi chọn đủ hai điểm
                 self.fig.canvas.mpl_disconnect(self.cid)
                 self.find_nodes()
@@ -112,6 +157,11 @@ class MapApp:
 
             print(f"Node A: {self.node_A}, Node B: {self.node_B}")
 
+            # Kiểm tra bằng SCC đã tính sẵn: không có đường đi thì khỏi chạy thuật toán nào
+            self.nodes_reachable = reachable(self.graph, self.node_A, self.node_B)
+            if not self.nodes_reachable:
+                print("Hai điểm thuộc hai thành phần liên thông khác nhau, không có đường đi.")
+
         except Exception as e:
             messagebox.showerror("Lỗi", f"Không thể tìm node gần nhất: {e}")
             print(e)
@@ -120,16 +170,46 @@ class MapApp:
         # Hiển thị dropdown và label để chọn thuật toán
         self.algorithm_label.pack(pady=(0, 5))
         self.algorithm_dropdown.pack(pady=(0, 10))
+        self.run_all_button.pack(pady=(0, 10))
 
     def on_algorithm_selected(self, event):
         algorithm_name = self.selected_algorithm.get()
         print(f"Thuật toán được chọn: {algorithm_name}")
         self.find_and_plot_route(algorithm_name)
 
+    def optimize_route(self):
+        # Gắn mọi điểm đã chọn vào nút gần nhất rồi tìm thứ tự đi trên luồng nền
+        if len(self.points) < 2 or MULTI_STOP_NAME in self.requested_algorithms:
+            return
+        self.fig.canvas.mpl_disconnect(self.cid)
+        self.optimize_button.pack_forget()
+        self.return_check.pack_forget()
+        try:
+            stops = ox.nearest_nodes(self.graph, X=[lon for _, lon in self.points], Y=[lat for lat, _ in self.points])
+        except Exception as e:
+            messagebox.showerror("Lỗi", f"Không thể tìm node gần nhất: {e}")
+            print(e)
+            return
+        stops = [int(stop) for stop in stops]
+        closed = self.return_to_start.get()
+        print(f"Tối ưu lộ trình qua {len(stops)} điểm dừng...")
+
+        def solve(graph, start, end, weight='length'):
+            route = optimize_stops(graph, stops, weight=weight, closed=closed)
+            print(f"Thứ tự các điểm dừng: {route.order} (ma trận {route.matrix_time:.2f}s, "
+                  f"tối ưu {route.solve_time:.2f}s)")
+            return route.path
+
+        self.requested_algorithms.add(MULTI_STOP_NAME)
+        self.batch_algorithms.add(MULTI_STOP_NAME)
+        self.worker.submit(MULTI_STOP_NAME, solve, self.graph, stops[0], stops[-1],
+                           weight='length', evaluate=self.route_length)
+        self.schedule_poll()
+
     def find_and_plot_route(self, algorithm_name):
         try:
-            # Kiểm tra xem thuật toán đã được vẽ chưa
-            if algorithm_name in self.legend_labels:
+            # Kiểm tra xem thuật toán đã được vẽ hoặc đang chạy chưa
+            if algorithm_name in self.requested_algorithms:
                 messagebox.showinfo("Thông báo", f"Thuật toán {algorithm_name} đã được chọn và tuyến đường đã được vẽ.")
                 print(f"{algorithm_name} đã được vẽ trước đó.")
                 return
@@ -140,68 +220,163 @@ class MapApp:
                 return
 
             func = algorithm_info['func']
-            color = algorithm_info['color']
-
-            print(f"Tìm đường đi bằng thuật toán {algorithm_name}...")
 
-            # Gọi hàm thuật toán với các tham số chuẩn hóa
-            path = func(self.graph, self.node_A, self.node_B, weight='length')
-
-            if path:
-                route_gdf = ox.routing.route_to_gdf(self.graph, path)
-                total_length = route_gdf['length'].sum()
-                print(f"{algorithm_name} đường đi: {path} với chi phí {total_length:.2f} meters")
-
-                # Cập nhật nhãn chi phí đường đi trên dòng mới
-                current_text = self.cost_label.cget("text")
-                new_text = f"{current_text}{algorithm_name}: {total_length:.2f} meters\n"
-                self.cost_label.config(text=new_text)
-
-                # Lấy danh sách các node trong path và chuyển thành danh sách tọa độ
-                node_coords = [(self.graph.nodes[node]['x'], self.graph.nodes[node]['y']) for node in path]
+            if not self.nodes_reachable:
+                self.requested_algorithms.add(algorithm_name)
+                self.on_route_found(algorithm_name, [], None, None, 0.0)
+                return
 
-                # Bắt đầu animation vẽ đường đi
-                self.animate_route(node_coords, color, algorithm_name)
-            else:
-                messagebox.showinfo("Thông báo", f"Thuật toán {algorithm_name} không tìm thấy đường đi.")
-                print(f"{algorithm_name}: Không tìm thấy đường đi.")
+            print(f"Tìm đường đi bằng thuật toán {algorithm_name}...")
+            if not is_prepared(self.graph, algorithm_info.spec.preprocessing):
+                print(f"{algorithm_name}: lần chạy đầu tạo dữ liệu tiền xử lý "
+                      f"'{algorithm_info.spec.preprocessing}', bước này không hủy được.")
+
+            # Gọi hàm thuật toán trên luồng nền với các tham số chuẩn hóa
+            self.requested_algorithms.add(algorithm_name)
+            trace = None
+            if self.show_exploration.get():
+                trace = ExplorationTrace(max_points=self.exploration_points, frontier_every=50)
+                self.renderer.add_exploration(algorithm_name, algorithm_info['color'])
+            self.worker.submit(
+                algorithm_name, func, self.graph, self.node_A, self.node_B,
+                weight='length', evaluate=self.route_length, trace=trace
+            )
+            self.schedule_poll()
 
         except Exception as e:
             messagebox.showerror("Lỗi", f"Không thể tìm đường đi: {e}")
             print(f"Lỗi khi tìm đường đi: {e}")
 
+    def run_all_algorithms(self):
+        # Chạy đồng thời mọi thuật toán chưa được chọn. Thuật toán cần tiền xử lý chưa có thì bỏ qua:
+        # việc tạo arc flags/hub labels... không duyệt graph.neighbors() nên không hủy được bằng Reset
+        skipped = []
+        for algorithm_name, algorithm_info in ALGORITHMS.items():
+            if algorithm_name in self.requested_algorithms:
+                continue
+            if not is_prepared(self.graph, algorithm_info.spec.preprocessing):
+                skipped.append(algorithm_name)
+                continue
+            self.batch_algorithms.add(algorithm_name)
+            self.find_and_plot_route(algorithm_name)
+        if skipped:
+            current_text = self.cost_label.cget("text")
+            lines = "".join(f"{name}: bỏ qua (chưa tiền xử lý, chọn riêng để tạo)\n" for name in skipped)
+            self.cost_label.config(text=current_text + lines)
+            print(f"Bỏ qua các thuật toán chưa có dữ liệu tiền xử lý: {', '.join(skipped)}")
+
+    def route_length(self, path):
+        return path_cost(self.graph, path, 'length')
+
+    def schedule_poll(self):
+        if self.poll_job is None:
+            self.poll_job = self.master.after(self.poll_interval, self.poll_workers)
+
+    def poll_workers(self):
+        self.poll_job = None
+        self.update_explorations(self.worker.running_jobs())
+
+        finished = self.worker.poll()
+        if finished:
+            self.update_explorations([job for job, *_ in finished], final=True)
+        for job, path, total_length, error, elapsed in finished:
+            self.on_route_found(job.algorithm_name, path, total_length, error, elapsed)
+
+        running = self.worker.running_jobs()
+        if running:
+            lines = [f"{job.algorithm_name}: {job.expanded} bước, {job.elapsed:.1f}s" for job in running]
+            self.progress_label.config(text="Đang tính:\n" + "\n".join(lines))
+            self.schedule_poll()
+        else:
+            self.progress_label.config(text="")
+
+    def update_explorations(self, jobs, final=False):
+        # Lấy các lô nút mới được mở rộng từ trace và vẽ bằng một lần blit
+        changed = False
+        for job in jobs:
+            if job.trace is None or job.algorithm_name not in self.renderer.explorations:
+                continue
+            batch, frontier = job.trace.drain()
+            if batch:
+                xs = [self.graph.nodes[node]['x'] for node in batch]
+                ys = [self.graph.nodes[node]['y'] for node in batch]
+                self.renderer.extend_exploration(job.algorithm_name, xs, ys)
+            if final:
+                frontier = []
+                print(f"{job.algorithm_name}: {job.trace.summary()}")
+            xs = [self.graph.nodes[node]['x'] for node in frontier]
+            ys = [self.graph.nodes[node]['y'] for node in frontier]
+            self.renderer.set_frontier(job.algorithm_name, xs, ys)
+            changed = True
+        if changed:
+            self.renderer.blit()
+
+    def on_route_found(self, algorithm_name, path, total_length, error, elapsed):
+        if error is not None:
+            messagebox.showerror("Lỗi", f"Không thể tìm đường đi: {error}")
+            print(f"Lỗi khi tìm đường đi: {error}")
+            return
+
+        if path:
+            print(f"{algorithm_name} đường đi: {path} với chi phí {total_length:.2f} meters ({elapsed:.3f}s)")
+
+            # Cập nhật nhãn chi phí đường đi trên dòng mới
+            current_text = self.cost_label.cget("text")
+            new_text = f"{current_text}{algorithm_name}: {total_length:.2f} meters\n"
+            self.cost_label.config(text=new_text)
+
+            # Lấy danh sách các node trong path và chuyển thành danh sách tọa độ
+            xs, ys = path_coordinates(self.graph, path)
+            node_coords = list(zip(xs.tolist(), ys.tolist()))
+
+            # Bắt đầu animation vẽ đường đi
+            color = self.algorithm_colors[algorithm_name]
+            self.animate_route(node_coords, color, algorithm_name)
+        elif algorithm_name in self.batch_algorithms:
+            # Khi chạy tất cả thì chỉ ghi vào nhãn chi phí, tránh mở nhiều hộp thoại
+            current_text = self.cost_label.cget("text")
+            self.cost_label.config(text=f"{current_text}{algorithm_name}: không tìm thấy\n")
+            print(f"{algorithm_name}: Không tìm thấy đường đi.")
+        else:
+            messagebox.showinfo("Thông báo", f"Thuật toán {algorithm_name} không tìm thấy đường đi.")
+            print(f"{algorithm_name}: Không tìm thấy đường đi.")
+
     def animate_route(self, node_coords: List[Tuple[float, float]], color: str, algorithm_name: str):
         if len(node_coords) < 2:
             print("Không đủ điểm để vẽ đường.")
             return
 
-        # Tạo danh sách các đoạn cần vẽ
-        segments = []
-        for i in range(len(node_coords) - 1):
-            segments.append((node_coords[i], node_coords[i + 1]))
-
-        # Khởi tạo danh sách vẽ
-        self.current_animation = {
-            'segments': segments,
-            'current_index': 0,
-            'color': color,
-            'algorithm_name': algorithm_name
+        # Mỗi thuật toán có một Line2D duy nhất, được nối dài sau mỗi bước vẽ
+        self.renderer.add_route(algorithm_name, color)
+        self.animations[algorithm_name] = {
+            'xs': [x for x, _ in node_coords],
+            'ys': [y for _, y in node_coords],
+            'current_index': 1,
+            'color': color
         }
 
-        # Bắt đầu vẽ lần đầu tiên
-        self.draw_next_segment()
+        # Bắt đầu vẽ nếu chưa có animation nào đang chạy
+        if self.animation_job is None:
+            self.draw_next_segment()
 
     def draw_next_segment(self):
-        if not self.current_animation:
+        self.animation_job = None
+        if not self.animations:
             return
 
-        segments = self.current_animation['segments']
-        index = self.current_animation['current_index']
-        color = self.current_animation['color']
-        algorithm_name = self.current_animation['algorithm_name']
-
-        if index >= len(segments):
+        # Nối thêm một đoạn cho mỗi đường đang vẽ rồi blit một lần cho cả khung hình
+        finished = []
+        for algorithm_name, animation in self.animations.items():
+            animation['current_index'] += 1
+            index = animation['current_index']
+            self.renderer.set_route_data(algorithm_name, animation['xs'][:index], animation['ys'][:index])
+            if index >= len(animation['xs']):
+                finished.append(algorithm_name)
+        self.renderer.blit()
+
+        for algorithm_name in finished:
             # Hoàn thành animation, thêm vào legend
+            color = self.animations.pop(algorithm_name)['color']
             legend_line = Line2D(
                 [0], [0],
                 color=color,
@@ -213,57 +388,44 @@ class MapApp:
                 self.legend_handles.append(legend_line)
                 self.legend_labels.append(algorithm_name)
 
-                # Cập nhật legend
-                self.ax.legend(handles=self.legend_handles, labels=self.legend_labels, loc='upper right', title="Thuật toán")
-
+        if finished:
+            # Cập nhật legend; lần vẽ đầy đủ này cũng làm mới ảnh nền dùng cho blitting
+            self.ax.legend(handles=self.legend_handles, labels=self.legend_labels, loc='upper right', title="Thuật toán")
             self.canvas.draw()
-            self.current_animation = None  # Reset trạng thái animation
-            return
-
-        # Lấy đoạn hiện tại
-        segment = segments[index]
-        (x_start, y_start), (x_end, y_end) = segment
-
-        # Vẽ đoạn
-        line, = self.ax.plot([x_start, x_end], [y_start, y_end], color=color, linewidth=4)
-
-        self.canvas.draw()
-
-        # Cập nhật chỉ số
-        self.current_animation['current_index'] += 1
 
         # Đặt thời gian cho lần vẽ tiếp theo
-        self.master.after(self.animation_speed, self.draw_next_segment)
+        if self.animations:
+            self.animation_job = self.master.after(self.animation_speed, self.draw_next_segment)
 
     def reset_selection(self):
         try:
             # Hủy bất kỳ animation nào đang chạy
-            if self.current_animation:
-                self.current_animation = None
+            self.animations = {}
+            if self.animation_job is not None:
+                self.master.after_cancel(self.animation_job)
+                self.animation_job = None
+
+            # Hủy các thuật toán đang chạy nền
+            self.worker.cancel_all()
+            self.requested_algorithms = set()
+            self.batch_algorithms = set()
+            if self.poll_job is not None:
+                self.master.after_cancel(self.poll_job)
+                self.poll_job = None
+            self.progress_label.config(text="")
 
             # Xóa các điểm và đường đi
             self.points = []
             self.node_A = None
             self.node_B = None
+            self.nodes_reachable = True
 
             # Clear legend handles và labels
             self.legend_handles = []
             self.legend_labels = []
 
-            # Clear axes và vẽ lại bản đồ gốc
-            self.ax.cla()
-            ox.plot_graph(
-                self.graph,
-                ax=self.ax,
-                show=False,
-                close=False,
-                edge_color='#999999',
-                node_size=0,
-                bgcolor='white'
-            )
-            self.ax.set_facecolor('white')
-            self.ax.legend([], loc='upper right')  # Đặt lại legend trống
-            self.canvas.draw()
+            # Chỉ xóa các lớp phủ, bản đồ nền được giữ nguyên
+            self.renderer.clear_overlays()
 
             # Reset nhãn chi phí đường đi với dòng mới
             self.cost_label.config(text="Chi phí đường đi:\n")
@@ -272,6 +434,10 @@ class MapApp:
             self.algorithm_label.pack_forget()
             self.algorithm_dropdown.set('')
             self.algorithm_dropdown.pack_forget()
+            self.run_all_button.pack_forget()
+            self.optimize_button.pack_forget()
+            self.return_check.pack_forget()
+            self.multi_stop_check.config(state=tk.NORMAL)
 
             # Kết nối lại sự kiện click chuột
             self.cid = self.fig.canvas.mpl_connect('button_press_event', self.on_click)
@@ -0,0 +1,186 @@
+import math
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
+
+from gui.viewport import ViewportIndex
+
+class MapRenderer:
+    """
+    Vẽ bản đồ nền một lần và vẽ các lớp phủ (điểm chọn, đường đi) bằng blitting.
+
+    Bản đồ nền là một LineCollection duy nhất; sau mỗi lần vẽ đầy đủ (mở cửa sổ, đổi
+    kích thước, cập nhật legend) ảnh nền được lưu lại bằng copy_from_bbox. Các lớp phủ
+    là artist có animated=True nên không nằm trong ảnh nền; mỗi khung hình chỉ cần khôi
+    phục ảnh nền, vẽ lại các lớp phủ và blit, chi phí không phụ thuộc vào kích thước đồ thị.
+
+    LineCollection chỉ chứa các cạnh giao với khung nhìn hiện tại, ở mức chi tiết phù hợp
+    (xem ViewportIndex); khi phóng to/thu nhỏ hoặc kéo bản đồ thì tập cạnh được lấy lại.
+    Cuộn chuột để phóng to/thu nhỏ, giữ chuột phải và kéo để di chuyển bản đồ.
+    """
+
+    def __init__(self, fig, ax, graph, edge_color='#999999', edge_linewidth=1, bgcolor='white', budget=20000):
+        self.fig = fig
+        self.ax = ax
+        self.background = None
+        self.overlays = []
+        self.routes = {}
+        self.explorations = {}
+
+        fig.set_facecolor(bgcolor)
+        ax.set_facecolor(bgcolor)
+
+        self.viewport = ViewportIndex.from_graph(graph, budget=budget)
+        self.level = None
+        self.base_collection = LineCollection([], colors=edge_color, linewidths=edge_linewidth, zorder=1)
+        ax.add_collection(self.base_collection)
+        self._configure_axes(graph)
+        self.update_view()
+
+        self._pan_start = None
+        self.cid_draw = self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.cid_scroll = self.canvas.mpl_connect('scroll_event', self._on_scroll)
+        self.cid_press = self.canvas.mpl_connect('button_press_event', self._on_press)
+        self.cid_motion = self.canvas.mpl_connect('motion_notify_event', self._on_motion)
+        self.cid_release = self.canvas.mpl_connect('button_release_event', self._on_release)
+
+    @property
+    def canvas(self):
+        return self.fig.canvas
+
+    def _configure_axes(self, graph):
+        xs = [data['x'] for _, data in graph.nodes(data=True)]
+        ys = [data['y'] for _, data in graph.nodes(data=True)]
+        margin_x = (max(xs) - min(xs)) * 0.02
+        margin_y = (max(ys) - min(ys)) * 0.02
+        self.ax.set_xlim(min(xs) - margin_x, max(xs) + margin_x)
+        self.ax.set_ylim(min(ys) - margin_y, max(ys) + margin_y)
+        # Giống ox.plot_graph: giữ tỉ lệ đúng cho tọa độ kinh/vĩ độ
+        coslat = math.cos(math.radians((min(ys) + max(ys)) / 2))
+        self.ax.set_aspect(1 / coslat if coslat > 0 else 'equal')
+        self.ax.axis('off')
+        self.ax.margins(0)
+        self.fig.subplots_adjust(left=0, bottom=0, right=1, top=1)
+
+    def update_view(self):
+        """
+        Lấy lại các cạnh giao với khung nhìn hiện tại và cập nhật bản đồ nền.
+        """
+        self.level, segments = self.viewport.query(self.ax.get_xlim(), self.ax.get_ylim())
+        self.base_collection.set_segments(segments)
+
+    def zoom(self, factor, center=None):
+        """
+        Phóng to (factor < 1) hoặc thu nhỏ (factor > 1) quanh điểm center (x, y).
+        """
+        (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+        cx, cy = center if center is not None else ((x0 + x1) / 2, (y0 + y1) / 2)
+        self.ax.set_xlim(cx - (cx - x0) * factor, cx + (x1 - cx) * factor)
+        self.ax.set_ylim(cy - (cy - y0) * factor, cy + (y1 - cy) * factor)
+        self.update_view()
+        self.canvas.draw_idle()
+
+    def _on_scroll(self, event):
+        if event.inaxes is not self.ax:
+            return
+        factor = 1 / 1.25 if event.button == 'up' else 1.25
+        self.zoom(factor, (event.xdata, event.ydata))
+
+    def _on_press(self, event):
+        if event.inaxes is self.ax and event.button == 3:
+            self._pan_start = (event.x, event.y, self.ax.get_xlim(), self.ax.get_ylim())
+
+    def _on_motion(self, event):
+        if self._pan_start is None:
+            return
+        x, y, (x0, x1), (y0, y1) = self._pan_start
+        # Đổi độ dời tính bằng pixel sang đơn vị dữ liệu
+        inverse = self.ax.transData.inverted()
+        (dx0, dy0), (dx1, dy1) = inverse.transform([(x, y), (event.x, event.y)])
+        shift_x, shift_y = dx1 - dx0, dy1 - dy0
+        self.ax.set_xlim(x0 - shift_x, x1 - shift_x)
+        self.ax.set_ylim(y0 - shift_y, y1 - shift_y)
+        self.canvas.draw_idle()
+
+    def _on_release(self, event):
+        if self._pan_start is not None and event.button == 3:
+            self._pan_start = None
+            self.update_view()
+            self.canvas.draw_idle()
+
+    def _on_draw(self, event):
+        # Sau mỗi lần vẽ đầy đủ: lưu ảnh nền rồi vẽ các lớp phủ lên trên
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_overlays()
+
+    def _draw_overlays(self):
+        for artist in self.overlays:
+            self.ax.draw_artist(artist)
+
+    def blit(self):
+        """
+        Cập nhật các lớp phủ lên màn hình mà không vẽ lại bản đồ nền.
+        """
+        if self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_overlays()
+        self.canvas.blit(self.fig.bbox)
+
+    def add_marker(self, x, y, **style):
+        marker = Line2D([x], [y], animated=True, zorder=4, **style)
+        self.ax.add_line(marker)
+        self.overlays.append(marker)
+        self.blit()
+        return marker
+
+    def add_route(self, name, color, linewidth=4):
+        """
+        Tạo một Line2D rỗng cho đường đi của thuật toán; dữ liệu được nối dần khi animation chạy.
+        """
+        line = Line2D([], [], color=color, linewidth=linewidth, animated=True, zorder=3)
+        self.ax.add_line(line)
+        self.overlays.append(line)
+        self.routes[name] = line
+        return line
+
+    def set_route_data(self, name, xs, ys):
+        self.routes[name].set_data(xs, ys)
+
+    def add_exploration(self, name, color, size=6):
+        """
+        Tạo hai lớp scatter cho vùng duyệt của thuật toán: các nút đã mở rộng và frontier hiện tại.
+        """
+        visited = self.ax.scatter([], [], s=size, color=color, alpha=0.35, linewidths=0, animated=True, zorder=2)
+        frontier = self.ax.scatter([], [], s=size * 2, facecolors='none', edgecolors=color, linewidths=0.8, animated=True, zorder=2)
+        # Các lớp vùng duyệt nằm dưới đường đi và điểm chọn
+        self.overlays[:0] = [visited, frontier]
+        self.explorations[name] = {'visited': visited, 'frontier': frontier, 'offsets': np.empty((0, 2))}
+
+    def extend_exploration(self, name, xs, ys):
+        """
+        Nối thêm một lô nút đã mở rộng vào scatter (một lần set_offsets cho cả lô).
+        """
+        exploration = self.explorations[name]
+        batch = np.column_stack([xs, ys])
+        exploration['offsets'] = np.concatenate([exploration['offsets'], batch])
+        exploration['visited'].set_offsets(exploration['offsets'])
+
+    def set_frontier(self, name, xs, ys):
+        points = np.column_stack([xs, ys]) if len(xs) else np.empty((0, 2))
+        self.explorations[name]['frontier'].set_offsets(points)
+
+    def clear_overlays(self):
+        """
+        Xóa mọi lớp phủ (điểm, đường đi, legend); bản đồ nền được giữ nguyên.
+        """
+        for artist in self.overlays:
+            artist.remove()
+        self.overlays = []
+        self.routes = {}
+        self.explorations = {}
+        legend = self.ax.get_legend()
+        if legend is not None:
+            legend.remove()
+        self.canvas.draw()
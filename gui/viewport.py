@@ -0,0 +1,228 @@
+import math
+from collections import defaultdict
+import numpy as np
+
+# Phân loại đường theo mức chi tiết: mức 0 chỉ có đường lớn, mức 2 có cả đường đi bộ
+MAJOR_ROADS = {
+    'motorway', 'motorway_link', 'trunk', 'trunk_link', 'primary', 'primary_link',
+    'secondary', 'secondary_link', 'tertiary', 'tertiary_link'
+}
+MEDIUM_ROADS = {'residential', 'unclassified', 'living_street', 'service', 'road'}
+
+# Sai số đơn giản hóa hình học (độ) cho từng mức; None nghĩa là chỉ giữ hai đầu mút
+SIMPLIFY_TOLERANCE = {0: None, 1: 1e-4, 2: 0.0}
+
+def road_level(highway):
+    """
+    Mức chi tiết nhỏ nhất mà tại đó một cạnh với thuộc tính 'highway' được hiển thị.
+    """
+    if isinstance(highway, (list, tuple)):
+        return min((road_level(h) for h in highway), default=2)
+    if highway in MAJOR_ROADS:
+        return 0
+    if highway in MEDIUM_ROADS:
+        return 1
+    return 2
+
+def simplify(points, tolerance):
+    """
+    Đơn giản hóa polyline bằng thuật toán Douglas-Peucker (không đệ quy).
+    """
+    if tolerance is None:
+        return [points[0], points[-1]]
+    if tolerance <= 0 or len(points) <= 2:
+        return points
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        (x1, y1), (x2, y2) = points[first], points[last]
+        dx, dy = x2 - x1, y2 - y1
+        norm = math.hypot(dx, dy)
+        max_dist, index = 0.0, None
+        for i in range(first + 1, last):
+            px, py = points[i]
+            if norm == 0:
+                dist = math.hypot(px - x1, py - y1)
+            else:
+                dist = abs(dy * px - dx * py + x2 * y1 - y2 * x1) / norm
+            if dist > max_dist:
+                max_dist, index = dist, i
+        if index is not None and max_dist > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [p for p, k in zip(points, keep) if k]
+
+class EdgePolylines:
+    """
+    Polyline của các cạnh bản đồ nền, chỉ được tạo thành danh sách (x, y) khi cạnh được vẽ.
+
+    Mỗi cạnh chỉ giữ một tham chiếu tới nguồn hình học của nó: chỉ số trong kho hình học
+    chung (EdgeGeometry của đồ thị tải ở chế độ gọn), LineString có sẵn trên cạnh, hoặc tọa
+    độ hai đầu mút khi cạnh không có hình học.
+
+    Parameters:
+    - store: EdgeGeometry của đồ thị, None nếu không có
+    - geometry_ids: geometry_id trong store của từng cạnh, -1 nếu cạnh không lấy hình học từ store
+    - endpoints: Mảng (số cạnh, 4) tọa độ (x_u, y_u, x_v, y_v) của hai đầu mút
+    - linestrings: Dict {cạnh: LineString} với cạnh có thuộc tính 'geometry'
+    """
+
+    def __init__(self, store, geometry_ids, endpoints, linestrings):
+        self.store = store
+        self.geometry_ids = np.asarray(geometry_ids, dtype=np.int64)
+        self.endpoints = np.asarray(endpoints, dtype=np.float64).reshape(-1, 4)
+        self.linestrings = linestrings
+
+    def __len__(self):
+        return len(self.geometry_ids)
+
+    def __getitem__(self, edge):
+        geometry_id = self.geometry_ids[edge]
+        if geometry_id >= 0:
+            return self.store.points(geometry_id)
+        line = self.linestrings.get(edge)
+        if line is not None:
+            return list(line.coords)
+        x1, y1, x2, y2 = self.endpoints[edge].tolist()
+        return [(x1, y1), (x2, y2)]
+
+    def bounds(self):
+        """
+        Bounding box (min_x, min_y, max_x, max_y) của mọi cạnh, tính trên mảng tọa độ mà không
+        tạo polyline nào.
+        """
+        ends = self.endpoints
+        bounds = np.column_stack((
+            np.minimum(ends[:, 0], ends[:, 2]), np.minimum(ends[:, 1], ends[:, 3]),
+            np.maximum(ends[:, 0], ends[:, 2]), np.maximum(ends[:, 1], ends[:, 3]),
+        ))
+        stored = np.flatnonzero(self.geometry_ids >= 0)
+        if len(stored):
+            # Min/max theo từng hình học của kho bằng một lần reduceat trên toàn bộ mảng tọa độ
+            coords, starts = self.store.coords, self.store.offsets[:-1]
+            lows = np.minimum.reduceat(coords, starts, axis=0)
+            highs = np.maximum.reduceat(coords, starts, axis=0)
+            ids = self.geometry_ids[stored]
+            bounds[stored] = np.hstack((lows[ids], highs[ids]))
+        for edge, line in self.linestrings.items():
+            bounds[edge] = line.bounds
+        return bounds
+
+class ViewportIndex:
+    """
+    Chỉ mục không gian và hình học nhiều mức chi tiết cho các cạnh của bản đồ nền.
+
+    Các cạnh được gán vào lưới ô đều theo bounding box. Khi khung nhìn thay đổi, chỉ các
+    cạnh nằm trong những ô giao với khung nhìn được lấy ra, ở mức chi tiết cao nhất sao cho
+    số cạnh không vượt quá budget. Polyline của một cạnh chỉ được tạo (và đơn giản hóa cho
+    mức thấp hơn) khi cạnh đó được vẽ.
+
+    Parameters:
+    - polylines: Danh sách polyline [(x, y), ...] của các cạnh, hoặc EdgePolylines
+    - levels: Mức chi tiết nhỏ nhất của từng cạnh (0, 1 hoặc 2)
+    - grid_size: Số ô theo mỗi chiều của lưới
+    - budget: Số cạnh tối đa được vẽ trong một khung nhìn
+    """
+
+    def __init__(self, polylines, levels, grid_size=64, budget=20000):
+        self.polylines = polylines
+        self.levels = np.asarray(levels, dtype=np.int8)
+        self.budget = budget
+        self._simplified = {}
+
+        if isinstance(polylines, EdgePolylines):
+            bounds = polylines.bounds()
+        else:
+            bounds = np.array([
+                (min(x for x, _ in line), min(y for _, y in line), max(x for x, _ in line), max(y for _, y in line))
+                for line in polylines
+            ]).reshape(-1, 4)
+        self.bounds = bounds
+        self.min_x, self.min_y = bounds[:, 0].min(), bounds[:, 1].min()
+        max_x, max_y = bounds[:, 2].max(), bounds[:, 3].max()
+        self.cell_w = max((max_x - self.min_x) / grid_size, 1e-12)
+        self.cell_h = max((max_y - self.min_y) / grid_size, 1e-12)
+        self.grid_size = grid_size
+
+        cells = defaultdict(list)
+        cx0 = self._col(bounds[:, 0])
+        cx1 = self._col(bounds[:, 2])
+        cy0 = self._row(bounds[:, 1])
+        cy1 = self._row(bounds[:, 3])
+        for edge, (a, b, c, d) in enumerate(zip(cx0, cx1, cy0, cy1)):
+            for i in range(a, b + 1):
+                for j in range(c, d + 1):
+                    cells[(i, j)].append(edge)
+        self.cells = {cell: np.array(edges, dtype=np.int64) for cell, edges in cells.items()}
+
+    @classmethod
+    def from_graph(cls, graph, **kwargs):
+        """
+        Tạo chỉ mục từ đồ thị OSMnx; hai chiều của cùng một con đường chỉ được lấy một lần.
+
+        Hình học không được sao chép: đồ thị tải ở chế độ gọn (loader.load_map(compact=True))
+        chỉ cần geometry_id của cạnh vào kho graph.graph['edge_geometry'].
+        """
+        geometry_ids, endpoints, linestrings, levels = [], [], {}, []
+        seen = set()
+        store = graph.graph.get('edge_geometry')
+        nodes = graph.nodes
+        for u, v, key, data in graph.edges(keys=True, data=True):
+            pair = (min(u, v), max(u, v), key)
+            if pair in seen:
+                continue
+            seen.add(pair)
+            geometry = data.get('geometry')
+            geometry_id = data.get('geometry_id') if store is not None else None
+            if geometry is not None:
+                linestrings[len(levels)] = geometry
+            geometry_ids.append(geometry_id if geometry is None and geometry_id is not None else -1)
+            endpoints.append((nodes[u]['x'], nodes[u]['y'], nodes[v]['x'], nodes[v]['y']))
+            levels.append(road_level(data.get('highway')))
+        return cls(EdgePolylines(store, geometry_ids, endpoints, linestrings), levels, **kwargs)
+
+    def _col(self, x):
+        return np.clip(((np.asarray(x) - self.min_x) // self.cell_w).astype(int), 0, self.grid_size - 1)
+
+    def _row(self, y):
+        return np.clip(((np.asarray(y) - self.min_y) // self.cell_h).astype(int), 0, self.grid_size - 1)
+
+    def polyline(self, edge, level=2):
+        """
+        Polyline của một cạnh ở một mức chi tiết; bản đơn giản hóa được tính lười và lưu lại.
+        """
+        if level == 2:
+            return self.polylines[edge]
+        cache = self._simplified.setdefault(level, {})
+        line = cache.get(edge)
+        if line is None:
+            line = cache[edge] = simplify(self.polylines[edge], SIMPLIFY_TOLERANCE[level])
+        return line
+
+    def query(self, xlim, ylim):
+        """
+        Lấy các cạnh giao với khung nhìn, ở mức chi tiết cao nhất không vượt quá budget.
+
+        Returns:
+        - Tuple (mức chi tiết, danh sách polyline cần vẽ).
+        """
+        cols = range(int(self._col(xlim[0])), int(self._col(xlim[1])) + 1)
+        rows = range(int(self._row(ylim[0])), int(self._row(ylim[1])) + 1)
+        found = [self.cells[(i, j)] for i in cols for j in rows if (i, j) in self.cells]
+        if not found:
+            return 2, []
+        candidates = np.unique(np.concatenate(found))
+        # Lọc chính xác theo bounding box của từng cạnh
+        b = self.bounds[candidates]
+        inside = (b[:, 0] <= xlim[1]) & (b[:, 2] >= xlim[0]) & (b[:, 1] <= ylim[1]) & (b[:, 3] >= ylim[0])
+        candidates = candidates[inside]
+        candidate_levels = self.levels[candidates]
+
+        level = 2
+        while level > 0 and np.count_nonzero(candidate_levels <= level) > self.budget:
+            level -= 1
+        visible = candidates[candidate_levels <= level]
+        return level, [self.polyline(edge, level) for edge in visible.tolist()]
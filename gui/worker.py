@@ -0,0 +1,152 @@
+import queue
+import threading
+import time
+
+from algorithms.trace import TracingGraph
+
+class RouteCancelled(Exception):
+    """
+    Được ném ra bên trong thuật toán khi tác vụ tìm đường bị hủy.
+    """
+
+class CancellableGraph(TracingGraph):
+    """
+    Lớp bọc đồ thị NetworkX cho phép hủy và theo dõi tiến độ của một thuật toán đang chạy.
+
+    Mọi thuật toán trong registry đều duyệt đồ thị qua graph.neighbors() hoặc graph.edges(),
+    nên chỉ cần kiểm tra cờ hủy và đếm số bước (nút mở rộng hoặc cạnh duyệt) ở hai điểm
+    này, không phải sửa mã nguồn của từng thuật toán. Nếu có trace thì dấu vết duyệt
+    được ghi lại qua TracingGraph.
+    """
+
+    def __init__(self, graph, cancel_event, trace=None):
+        super().__init__(graph, trace)
+        self._cancel_event = cancel_event
+        self.expanded = 0
+
+    def neighbors(self, node):
+        if self._cancel_event.is_set():
+            raise RouteCancelled()
+        self.expanded += 1
+        return super().neighbors(node)
+
+    def edges(self, *args, **kwargs):
+        for i, edge in enumerate(self._graph.edges(*args, **kwargs)):
+            if i & 0xFFF == 0 and self._cancel_event.is_set():
+                raise RouteCancelled()
+            self.expanded += 1
+            yield edge
+
+class RouteJob:
+    """
+    Trạng thái của một tác vụ tìm đường chạy nền.
+    """
+
+    def __init__(self, algorithm_name, graph, trace=None):
+        self.algorithm_name = algorithm_name
+        self.cancel_event = threading.Event()
+        self.trace = trace
+        self.graph = CancellableGraph(graph, self.cancel_event, trace)
+        self.started_at = time.perf_counter()
+        self.done = False
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def expanded(self):
+        return self.graph.expanded
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started_at
+
+    def cancel(self):
+        self.cancel_event.set()
+
+class RouteWorker:
+    """
+    Chạy các thuật toán tìm đường trên luồng nền để giao diện Tkinter không bị treo.
+
+    Kết quả được đưa vào hàng đợi; luồng giao diện lấy kết quả qua poll() (gọi định kỳ
+    bằng master.after), nên mọi thao tác với widget vẫn diễn ra trên luồng chính.
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self.results = queue.Queue()
+
+    def submit(self, algorithm_name, func, graph, start, end, weight='length', evaluate=None, trace=None):
+        """
+        Bắt đầu chạy một thuật toán trên luồng nền.
+
+        Parameters:
+        - algorithm_name: Tên thuật toán
+        - func: Hàm thuật toán trong registry
+        - graph: Đồ thị NetworkX
+        - start, end: Nút bắt đầu và kết thúc
+        - weight: Thuộc tính cạnh dùng làm trọng số
+        - evaluate: Hàm tùy chọn evaluate(path) -> chi phí, chạy luôn trên luồng nền
+        - trace: ExplorationTrace tùy chọn để ghi lại quá trình duyệt
+
+        Returns:
+        - Đối tượng RouteJob.
+        """
+        job = RouteJob(algorithm_name, graph, trace)
+        self.jobs[algorithm_name] = job
+        thread = threading.Thread(
+            target=self._run,
+            args=(job, func, start, end, weight, evaluate),
+            name=f"route-{algorithm_name}",
+            daemon=True
+        )
+        thread.start()
+        return job
+
+    def _run(self, job, func, start, end, weight, evaluate):
+        path, cost, error = None, None, None
+        try:
+            path = func(job.graph, start, end, weight=weight)
+            if path and evaluate is not None:
+                cost = evaluate(path)
+        except RouteCancelled:
+            return
+        except Exception as e:
+            error = e
+        job.done = True
+        self.results.put((job, path, cost, error, job.elapsed))
+
+    def is_running(self, algorithm_name):
+        job = self.jobs.get(algorithm_name)
+        return job is not None and not job.done and not job.cancelled
+
+    def running_jobs(self):
+        return [job for job in self.jobs.values() if not job.done and not job.cancelled]
+
+    def poll(self):
+        """
+        Lấy các kết quả đã hoàn thành, bỏ qua kết quả của tác vụ đã bị hủy.
+
+        Returns:
+        - Danh sách tuple (job, đường đi, chi phí, lỗi, thời gian chạy).
+        """
+        finished = []
+        while True:
+            try:
+                item = self.results.get_nowait()
+            except queue.Empty:
+                break
+            job = item[0]
+            if job.cancelled or self.jobs.get(job.algorithm_name) is not job:
+                continue
+            finished.append(item)
+        return finished
+
+    def cancel_all(self):
+        """
+        Hủy mọi tác vụ đang chạy. Thuật toán sẽ dừng ở lần mở rộng nút kế tiếp.
+        """
+        for job in self.jobs.values():
+            job.cancel()
+        self.jobs = {}
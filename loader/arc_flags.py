@@ -0,0 +1,242 @@
+import heapq
+import os
+import threading
+import time
+
+import numpy as np
+
+from loader.compiled import get_compiled
+from loader.preprocess import get_preprocessing
+
+# Mỗi cạnh lưu cờ vùng trong một số nguyên 64 bit
+MAX_REGIONS = 64
+
+# Giữ việc tính cờ trong get_arc_flags() để Arc-Flags Dijkstra và Arc-Flags A* chạy song song chỉ tính một lần
+_BUILD_LOCK = threading.Lock()
+
+def partition_nodes(compiled, num_regions, method='hilbert'):
+    """
+    Chia các nút thành num_regions vùng.
+
+    - 'hilbert': cắt thứ tự nút (đã đánh số theo đường cong Hilbert) thành các đoạn bằng nhau,
+      nên các vùng vừa gọn về không gian vừa cân bằng số nút.
+    - 'grid': lưới đều trên bounding box, gần vuông nhất có thể.
+
+    Returns:
+    - Mảng vùng của từng nút (theo chỉ số của CompiledGraph).
+    """
+    n = compiled.num_nodes
+    if method == 'hilbert':
+        if compiled.order != 'hilbert':
+            raise ValueError("Phân vùng 'hilbert' cần CompiledGraph đánh số theo đường cong Hilbert.")
+        return (np.arange(n, dtype=np.int64) * num_regions // max(n, 1)).astype(np.int16)
+    if method == 'grid':
+        cols = max(1, int(np.sqrt(num_regions)))
+        rows = max(1, num_regions // cols)
+        x = np.nan_to_num(compiled.x, nan=np.nanmin(compiled.x))
+        y = np.nan_to_num(compiled.y, nan=np.nanmin(compiled.y))
+        col = np.minimum(((x - x.min()) / max(np.ptp(x), 1e-12) * cols).astype(np.int64), cols - 1)
+        row = np.minimum(((y - y.min()) / max(np.ptp(y), 1e-12) * rows).astype(np.int64), rows - 1)
+        return (row * cols + col).astype(np.int16)
+    raise ValueError(f"Cách phân vùng không hỗ trợ: {method}. Chọn 'hilbert' hoặc 'grid'.")
+
+class ArcFlags:
+    """
+    Cờ cung (arc flags) trên một CompiledGraph.
+
+    Bit r của flags[k] bật khi cạnh k nằm trên một đường đi ngắn nhất tới một nút thuộc vùng r.
+    Khi tìm đường tới nút thuộc vùng r, chỉ cần duyệt các cạnh có bit r, nên tìm kiếm bỏ qua
+    phần lớn đồ thị nằm "sau lưng" đích mà vẫn cho kết quả tối ưu.
+
+    Attributes:
+    - compiled: CompiledGraph mà cờ được tính trên đó
+    - region: Vùng của từng nút
+    - flags: Mặt nạ bit vùng của từng cạnh (uint64)
+    - num_regions: Số vùng
+    """
+
+    def __init__(self, compiled, region, flags, num_regions):
+        self.compiled = compiled
+        self.region = region
+        self.flags = flags
+        self.num_regions = num_regions
+        self._lists = None
+
+    @property
+    def weight(self):
+        return self.compiled.weight
+
+    def lists(self):
+        """
+        Vùng của nút và cờ của cạnh dưới dạng list Python (tính một lần).
+        """
+        if self._lists is None:
+            self._lists = (self.region.tolist(), self.flags.tolist())
+        return self._lists
+
+    def edge_ratio(self, region):
+        """
+        Tỉ lệ cạnh có cờ của một vùng (càng nhỏ thì tìm kiếm tới vùng đó càng được cắt tỉa nhiều).
+        """
+        if len(self.flags) == 0:
+            return 0.0
+        return float(np.count_nonzero(self.flags & np.uint64(1 << region))) / len(self.flags)
+
+    def save(self, path):
+        """
+        Lưu cờ vào file .npz, kèm cấu trúc và trọng số của đồ thị để kiểm tra khi tải lại.
+        """
+        np.savez_compressed(
+            path,
+            region=self.region,
+            flags=self.flags,
+            num_regions=self.num_regions,
+            weight=str(self.weight),
+            indptr=self.compiled.indptr,
+            indices=self.compiled.indices,
+            graph_weights=self.compiled.weights,
+            node_ids=np.array([str(node) for node in self.compiled.node_ids]),
+        )
+
+    @classmethod
+    def load(cls, path, compiled):
+        """
+        Tải cờ từ file .npz. Trả về None nếu file được tính cho đồ thị khác hoặc giá trị trọng số
+        của cạnh đã thay đổi.
+        """
+        with np.load(path) as data:
+            same_graph = (
+                str(data['weight']) == str(compiled.weight)
+                and np.array_equal(data['indptr'], compiled.indptr)
+                and np.array_equal(data['indices'], compiled.indices)
+                and 'graph_weights' in data.files
+                and np.array_equal(data['graph_weights'], compiled.weights)
+                and data['node_ids'].tolist() == [str(node) for node in compiled.node_ids]
+            )
+            if not same_graph:
+                return None
+            return cls(compiled, data['region'], data['flags'], int(data['num_regions']))
+
+def _reverse_adjacency(compiled):
+    # Cạnh vào của từng nút, kèm chỉ số cạnh trong CSR xuôi để bật cờ đúng cạnh
+    sources = np.repeat(np.arange(compiled.num_nodes, dtype=np.int64), np.diff(compiled.indptr))
+    order = np.argsort(compiled.indices, kind='stable')
+    indptr = np.zeros(compiled.num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(compiled.indices, minlength=compiled.num_nodes), out=indptr[1:])
+    return indptr.tolist(), sources[order].tolist(), order.tolist()
+
+def compute_arc_flags(compiled, num_regions=32, partition='hilbert', verbose=True):
+    """
+    Tính cờ cung cho mọi cạnh.
+
+    Với mỗi vùng r, chạy Dijkstra ngược từ từng nút biên của r (nút trong r có cạnh vào từ
+    ngoài r) và bật bit r trên các cạnh của cây đường đi ngắn nhất. Cạnh có cả hai đầu trong
+    r cũng được bật bit r. Mọi đường đi ngắn nhất vào r đi tới một nút biên rồi ở lại trong r,
+    nên luôn có một đường đi ngắn nhất chỉ gồm các cạnh có cờ.
+
+    Parameters:
+    - compiled: CompiledGraph
+    - num_regions: Số vùng (tối đa 64)
+    - partition: Cách phân vùng, xem partition_nodes()
+    - verbose: In tiến độ
+
+    Returns:
+    - Đối tượng ArcFlags.
+    """
+    if not 1 <= num_regions <= MAX_REGIONS:
+        raise ValueError(f"Số vùng phải trong khoảng 1..{MAX_REGIONS}.")
+    region = partition_nodes(compiled, num_regions, partition)
+    indptr, indices, weights = compiled.lists()
+    rev_indptr, rev_sources, rev_edges = _reverse_adjacency(compiled)
+    region_list = region.tolist()
+    n = compiled.num_nodes
+
+    sources = np.repeat(np.arange(n, dtype=np.int64), np.diff(compiled.indptr))
+    same = region[sources] == region[compiled.indices]
+    flags = np.zeros(compiled.num_edges, dtype=np.uint64)
+    flags[same] = np.left_shift(np.uint64(1), region[sources[same]].astype(np.uint64))
+    flag_list = flags.tolist()
+
+    # Nút biên: có cạnh vào từ một vùng khác
+    boundary = [[] for _ in range(num_regions)]
+    for v in range(n):
+        r = region_list[v]
+        for k in range(rev_indptr[v], rev_indptr[v + 1]):
+            if region_list[rev_sources[k]] != r:
+                boundary[r].append(v)
+                break
+
+    total = sum(len(nodes) for nodes in boundary)
+    started = time.perf_counter()
+    done = 0
+    inf = float('inf')
+    heappop, heappush = heapq.heappop, heapq.heappush
+    for r in range(num_regions):
+        bit = 1 << r
+        for b in boundary[r]:
+            # Dijkstra ngược từ b: parent_edge[u] là cạnh u -> ... trên đường ngắn nhất từ u tới b
+            distances = {b: 0.0}
+            parent_edge = {}
+            queue = [(0.0, b)]
+            while queue:
+                distance, node = heappop(queue)
+                if distance > distances[node]:
+                    continue
+                edge = parent_edge.get(node)
+                if edge is not None:
+                    flag_list[edge] |= bit
+                for k in range(rev_indptr[node], rev_indptr[node + 1]):
+                    u = rev_sources[k]
+                    edge = rev_edges[k]
+                    new_distance = distance + weights[edge]
+                    if new_distance < distances.get(u, inf):
+                        distances[u] = new_distance
+                        parent_edge[u] = edge
+                        heappush(queue, (new_distance, u))
+            done += 1
+            if verbose and done % 200 == 0:
+                print(f"Arc flags: {done}/{total} nút biên ({time.perf_counter() - started:.1f}s)")
+
+    if verbose:
+        print(f"Đã tính arc flags cho {num_regions} vùng, {total} nút biên trong {time.perf_counter() - started:.1f}s.")
+    return ArcFlags(compiled, region, np.array(flag_list, dtype=np.uint64), num_regions)
+
+def attach_arc_flags(graph, path=None, num_regions=32, partition='hilbert', weight='length'):
+    """
+    Gắn cờ cung vào graph.graph['preprocessing']['arc_flags'].
+
+    Nếu path là file đã lưu cho đúng đồ thị và trọng số thì tải lên, ngược lại tính mới
+    rồi lưu vào path (nếu có).
+
+    Returns:
+    - Đối tượng ArcFlags.
+    """
+    compiled = get_compiled(graph, weight)
+    arc_flags = None
+    if path is not None and os.path.exists(path):
+        arc_flags = ArcFlags.load(path, compiled)
+        if arc_flags is None:
+            print(f"File arc flags {path} không khớp với đồ thị, tính lại.")
+        else:
+            print(f"Tải arc flags từ file: {path}")
+    if arc_flags is None:
+        arc_flags = compute_arc_flags(compiled, num_regions=num_regions, partition=partition)
+        if path is not None:
+            arc_flags.save(path)
+            print(f"Lưu arc flags vào file: {path}")
+    get_preprocessing(graph)['arc_flags'] = arc_flags
+    return arc_flags
+
+def get_arc_flags(graph, weight='length'):
+    """
+    Lấy cờ cung đã gắn vào đồ thị; tính mới (không lưu file) nếu chưa có hoặc khác trọng số.
+
+    Việc tính mới được giữ bởi khóa, nên nhiều luồng gọi cùng lúc chỉ tính cờ một lần.
+    """
+    arc_flags = graph.graph.get('preprocessing', {}).get('arc_flags')
+    if arc_flags is None or arc_flags.weight != weight:
+        with _BUILD_LOCK:
+            arc_flags = graph.graph.get('preprocessing', {}).get('arc_flags')
+            if arc_flags is None or arc_flags.weight != weight:
+                arc_flags = attach_arc_flags(graph, weight=weight)
+    return arc_flags
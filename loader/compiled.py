@@ -0,0 +1,353 @@
+import argparse
+import random
+import time
+from collections import deque
+
+import numpy as np
+
+# Các cách đánh số lại nút được hỗ trợ; None giữ nguyên thứ tự của NetworkX
+ORDERINGS = (None, 'hilbert', 'zorder', 'bfs', 'rcm')
+
+class CompiledGraph:
+    """
+    Đồ thị dạng mảng CSR (compressed sparse row) với nút được đánh số nguyên 0..n-1.
+
+    Cạnh ra của nút i là indices[indptr[i]:indptr[i + 1]] với trọng số tương ứng trong
+    weights. Giữa hai nút chỉ giữ cạnh song song có trọng số nhỏ nhất, giống cách các thuật
+    toán trong registry chọn cạnh trên MultiDiGraph. node_ids ánh xạ chỉ số về id OSM gốc
+    và index ánh xạ ngược lại, nên đường đi trả ra ngoài vẫn dùng id OSM.
+
+    Attributes:
+    - indptr, indices, weights: Mảng CSR
+    - node_ids: Danh sách id nút gốc theo chỉ số mới
+    - index: Dict id nút gốc -> chỉ số (tạo ở lần dùng đầu tiên)
+    - x, y: Tọa độ nút theo chỉ số (nan nếu không có)
+    - weight: Thuộc tính cạnh dùng làm trọng số (None nghĩa là mỗi cạnh có trọng số 1)
+    - order: Cách đánh số lại nút đã dùng
+    """
+
+    def __init__(self, indptr, indices, weights, node_ids, x, y, weight='length', order=None):
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.node_ids = node_ids
+        self._index = None
+        self.x = x
+        self.y = y
+        self.weight = weight
+        self.order = order
+        self._lists = None
+        self._reverse = None
+        self._edge_keys = None
+        # Hình học của từng cạnh (xem loader/paths.py), tạo ở lần đầu cần tới
+        self._geometry = None
+
+    @property
+    def index(self):
+        # Tạo khi dùng lần đầu: tiến trình gắn vào đồ thị trong shared memory không cần dict n phần tử này
+        if self._index is None:
+            # node_ids có thể là mảng numpy (đồ thị gắn từ shared memory), dùng id kiểu Python làm khóa
+            ids = self.node_ids.tolist() if isinstance(self.node_ids, np.ndarray) else self.node_ids
+            self._index = {node: i for i, node in enumerate(ids)}
+        return self._index
+
+    @index.setter
+    def index(self, index):
+        self._index = index
+
+    @property
+    def num_nodes(self):
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    def lists(self):
+        """
+        Các mảng CSR dưới dạng list Python (tính một lần), nhanh hơn numpy khi truy cập
+        từng phần tử trong vòng lặp Python.
+
+        Returns:
+        - Tuple (indptr, indices, weights).
+        """
+        if self._lists is None:
+            self._lists = (self.indptr.tolist(), self.indices.tolist(), self.weights.tolist())
+        return self._lists
+
+    def reverse(self):
+        """
+        Đồ thị ngược (mọi cạnh đổi chiều) với cùng cách đánh số nút, dùng cho tìm kiếm lùi.
+        """
+        if self._reverse is None:
+            sources = np.repeat(np.arange(self.num_nodes, dtype=np.int64), np.diff(self.indptr))
+            indptr, indices, weights = _build_csr(self.num_nodes, self.indices.astype(np.int64), sources, self.weights)
+            reverse = CompiledGraph(indptr, indices, weights, self.node_ids, self.x, self.y, self.weight, self.order)
+            reverse.index = self.index
+            reverse._reverse = self
+            self._reverse = reverse
+        return self._reverse
+
+    def edge_index(self, sources, targets):
+        """
+        Tìm chỉ số cạnh của nhiều cặp (nguồn, đích) cùng lúc bằng tìm kiếm nhị phân.
+
+        Trong mỗi hàng CSR các đích đã được sắp xếp tăng dần, nên khóa nguồn * n + đích của
+        mọi cạnh tạo thành một mảng đã sắp xếp.
+
+        Returns:
+        - Mảng chỉ số cạnh, -1 với cặp không có cạnh.
+        """
+        if self._edge_keys is None:
+            sources_all = np.repeat(np.arange(self.num_nodes, dtype=np.int64), np.diff(self.indptr))
+            self._edge_keys = sources_all * self.num_nodes + self.indices
+        keys = np.asarray(sources, dtype=np.int64) * self.num_nodes + np.asarray(targets, dtype=np.int64)
+        if len(self._edge_keys) == 0:
+            return np.full(len(keys), -1, dtype=np.int64)
+        position = np.minimum(np.searchsorted(self._edge_keys, keys), len(self._edge_keys) - 1)
+        return np.where(self._edge_keys[position] == keys, position, -1)
+
+    def to_ids(self, path):
+        """
+        Chuyển đường đi theo chỉ số thành đường đi theo id nút gốc.
+        """
+        node_ids = self.node_ids
+        if isinstance(node_ids, np.ndarray):
+            return node_ids[np.asarray(path, dtype=np.int64)].tolist()
+        return [node_ids[i] for i in path]
+
+    def edge_gap(self):
+        """
+        Khoảng cách trung bình |u - v| giữa chỉ số hai đầu của các cạnh; càng nhỏ thì các nút
+        kề nhau càng nằm gần nhau trong bộ nhớ.
+        """
+        if self.num_edges == 0:
+            return 0.0
+        sources = np.repeat(np.arange(self.num_nodes, dtype=np.int64), np.diff(self.indptr))
+        return float(np.abs(sources - self.indices).mean())
+
+def _build_csr(num_nodes, sources, targets, weights):
+    # Sắp xếp theo (nguồn, đích, trọng số) rồi giữ cạnh nhẹ nhất của mỗi cặp (nguồn, đích)
+    order = np.lexsort((weights, targets, sources))
+    sources, targets, weights = sources[order], targets[order], weights[order]
+    if len(sources):
+        keep = np.ones(len(sources), dtype=bool)
+        keep[1:] = (sources[1:] != sources[:-1]) | (targets[1:] != targets[:-1])
+        sources, targets, weights = sources[keep], targets[keep], weights[keep]
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=num_nodes), out=indptr[1:])
+    return indptr, targets.astype(np.int32), weights.astype(np.float64)
+
+def _quantize(values, bits):
+    # Đưa tọa độ về số nguyên trong [0, 2^bits); nút không có tọa độ xếp cuối
+    values = np.asarray(values, dtype=np.float64)
+    finite = np.isfinite(values)
+    if not finite.any():
+        return np.zeros(len(values), dtype=np.int64)
+    low, high = values[finite].min(), values[finite].max()
+    scale = ((1 << bits) - 1) / (high - low) if high > low else 0.0
+    result = np.full(len(values), (1 << bits) - 1, dtype=np.int64)
+    result[finite] = ((values[finite] - low) * scale).astype(np.int64)
+    return result
+
+def hilbert_keys(xs, ys, bits=16):
+    """
+    Vị trí của mỗi điểm trên đường cong Hilbert phủ bounding box (vector hóa bằng numpy).
+    """
+    x = _quantize(xs, bits)
+    y = _quantize(ys, bits)
+    side = 1 << bits
+    keys = np.zeros(len(x), dtype=np.int64)
+    s = side >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        keys += s * s * ((3 * rx.astype(np.int64)) ^ ry.astype(np.int64))
+        # Xoay góc phần tư để đường cong liền mạch
+        flip = ~ry & rx
+        x = np.where(flip, side - 1 - x, x)
+        y = np.where(flip, side - 1 - y, y)
+        x, y = np.where(~ry, y, x), np.where(~ry, x, y)
+        s >>= 1
+    return keys
+
+def zorder_keys(xs, ys, bits=16):
+    """
+    Khóa Morton (Z-order) của mỗi điểm: xen kẽ các bit của x và y.
+    """
+    x = _quantize(xs, bits)
+    y = _quantize(ys, bits)
+    keys = np.zeros(len(x), dtype=np.int64)
+    for bit in range(bits):
+        keys |= ((x >> bit) & 1) << (2 * bit)
+        keys |= ((y >> bit) & 1) << (2 * bit + 1)
+    return keys
+
+def _undirected_adjacency(num_nodes, sources, targets):
+    adjacency = [[] for _ in range(num_nodes)]
+    for u, v in zip(sources.tolist(), targets.tolist()):
+        if u != v:
+            adjacency[u].append(v)
+            adjacency[v].append(u)
+    return [sorted(set(neighbors)) for neighbors in adjacency]
+
+def bfs_order(adjacency, by_degree=False):
+    """
+    Thứ tự duyệt BFS trên đồ thị vô hướng, lần lượt cho từng thành phần liên thông.
+    Với by_degree=True thì bắt đầu từ nút bậc nhỏ nhất và thăm láng giềng theo bậc tăng dần
+    (thứ tự Cuthill-McKee).
+    """
+    num_nodes = len(adjacency)
+    seen = [False] * num_nodes
+    order = []
+    roots = range(num_nodes)
+    if by_degree:
+        degree = [len(neighbors) for neighbors in adjacency]
+        roots = sorted(roots, key=degree.__getitem__)
+    for root in roots:
+        if seen[root]:
+            continue
+        seen[root] = True
+        queue = deque([root])
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            neighbors = [v for v in adjacency[node] if not seen[v]]
+            if by_degree:
+                neighbors.sort(key=degree.__getitem__)
+            for v in neighbors:
+                seen[v] = True
+                queue.append(v)
+    return np.array(order, dtype=np.int64)
+
+def node_order(order, xs, ys, sources, targets):
+    """
+    Tính hoán vị đánh số lại nút.
+
+    Parameters:
+    - order: 'hilbert', 'zorder' (theo tọa độ), 'bfs', 'rcm' (theo cấu trúc đồ thị) hoặc None
+    - xs, ys: Tọa độ nút theo thứ tự ban đầu
+    - sources, targets: Chỉ số hai đầu của các cạnh theo thứ tự ban đầu
+
+    Returns:
+    - Mảng perm với perm[chỉ số mới] = chỉ số ban đầu.
+    """
+    num_nodes = len(xs)
+    if order is None:
+        return np.arange(num_nodes, dtype=np.int64)
+    if order == 'hilbert':
+        return np.argsort(hilbert_keys(xs, ys), kind='stable')
+    if order == 'zorder':
+        return np.argsort(zorder_keys(xs, ys), kind='stable')
+    if order in ('bfs', 'rcm'):
+        adjacency = _undirected_adjacency(num_nodes, sources, targets)
+        perm = bfs_order(adjacency, by_degree=(order == 'rcm'))
+        return perm[::-1].copy() if order == 'rcm' else perm
+    raise ValueError(f"Cách sắp xếp nút không hỗ trợ: {order}. Chọn một trong {ORDERINGS}.")
+
+def compile_graph(graph, weight='length', order='hilbert'):
+    """
+    Chuyển đồ thị NetworkX thành CompiledGraph với nút được đánh số lại theo order.
+
+    Parameters:
+    - graph: Đồ thị NetworkX (thường là MultiDiGraph của OSMnx)
+    - weight: Thuộc tính cạnh dùng làm trọng số (None để mọi cạnh có trọng số 1)
+    - order: Cách đánh số lại nút để các nút gần nhau nằm gần nhau trong bộ nhớ
+
+    Returns:
+    - Đối tượng CompiledGraph.
+    """
+    nodes = list(graph.nodes)
+    position = {node: i for i, node in enumerate(nodes)}
+    node_data = graph.nodes
+    xs = np.array([node_data[node].get('x', np.nan) for node in nodes], dtype=np.float64)
+    ys = np.array([node_data[node].get('y', np.nan) for node in nodes], dtype=np.float64)
+
+    sources, targets, weights = [], [], []
+    for u, v, data in graph.edges(data=True):
+        if u == v:
+            continue
+        sources.append(position[u])
+        targets.append(position[v])
+        weights.append(data.get(weight, 1) if weight is not None else 1)
+    sources = np.array(sources, dtype=np.int64)
+    targets = np.array(targets, dtype=np.int64)
+    weights = np.array(weights, dtype=np.float64)
+
+    perm = node_order(order, xs, ys, sources, targets)
+    new_index = np.empty(len(nodes), dtype=np.int64)
+    new_index[perm] = np.arange(len(nodes), dtype=np.int64)
+
+    indptr, indices, weights = _build_csr(len(nodes), new_index[sources], new_index[targets], weights)
+    node_ids = [nodes[i] for i in perm.tolist()]
+    return CompiledGraph(indptr, indices, weights, node_ids, xs[perm], ys[perm], weight=weight, order=order)
+
+def get_compiled(graph, weight='length', order='hilbert'):
+    """
+    Lấy CompiledGraph của đồ thị, biên dịch ở lần gọi đầu và lưu trong graph.graph['_compiled'].
+
+    Cache không tự cập nhật khi đồ thị bị sửa; đồ thị tạo bởi loader/preprocess.py không
+    mang theo cache của đồ thị gốc.
+    """
+    cache = graph.graph.setdefault('_compiled', {})
+    compiled = cache.get((weight, order))
+    if compiled is None:
+        compiled = cache[(weight, order)] = compile_graph(graph, weight=weight, order=order)
+    return compiled
+
+def benchmark_orderings(graph, num_queries=100, orders=ORDERINGS, weight='length', seed=0):
+    """
+    So sánh thời gian tìm đường trên CompiledGraph với các cách đánh số nút khác nhau.
+
+    Mọi cách đánh số phải cho cùng chi phí đường đi; hàm báo lỗi nếu có sai khác.
+
+    Returns:
+    - Danh sách dict gồm order, edge_gap, build_s, query_ms (trung bình mỗi truy vấn).
+    """
+    from algorithms.csr_dijkstra import csr_shortest_path
+
+    rnd = random.Random(seed)
+    nodes = list(graph.nodes)
+    queries = [tuple(rnd.sample(nodes, 2)) for _ in range(num_queries)]
+    reference = None
+    results = []
+    for order in orders:
+        started = time.perf_counter()
+        compiled = compile_graph(graph, weight=weight, order=order)
+        build_s = time.perf_counter() - started
+
+        costs = []
+        started = time.perf_counter()
+        for start, end in queries:
+            cost, _ = csr_shortest_path(compiled, compiled.index[start], compiled.index[end])
+            costs.append(cost)
+        query_ms = (time.perf_counter() - started) * 1000 / max(num_queries, 1)
+
+        if reference is None:
+            reference = costs
+        elif any(abs(a - b) > 1e-6 * max(1.0, abs(a)) for a, b in zip(reference, costs) if a != b):
+            raise AssertionError(f"Cách đánh số {order} cho chi phí khác với {orders[0]}.")
+        results.append({
+            'order': order or 'none',
+            'edge_gap': compiled.edge_gap(),
+            'build_s': build_s,
+            'query_ms': query_ms,
+        })
+    return results
+
+def main():
+    from loader.loader import load_map
+
+    parser = argparse.ArgumentParser(description="So sánh các cách đánh số nút của CompiledGraph.")
+    parser.add_argument('graph', help="Đường dẫn file GraphML")
+    parser.add_argument('--queries', type=int, default=100, help="Số truy vấn ngẫu nhiên")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    graph = load_map(None, filepath=args.graph)
+    print(f"{'Order':<10}{'Edge gap':>12}{'Build (s)':>12}{'Query (ms)':>12}")
+    for row in benchmark_orderings(graph, num_queries=args.queries, seed=args.seed):
+        print(f"{row['order']:<10}{row['edge_gap']:>12.1f}{row['build_s']:>12.3f}{row['query_ms']:>12.3f}")
+
+if __name__ == "__main__":
+    main()
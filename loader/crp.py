@@ -0,0 +1,267 @@
+import heapq
+import math
+import threading
+import time
+
+import numpy as np
+
+from loader.compiled import get_compiled
+from loader.preprocess import get_preprocessing
+
+# Giữ việc phân vùng và customization trong get_crp() để nhiều luồng gọi cùng lúc chỉ tạo một lần
+_BUILD_LOCK = threading.Lock()
+
+def level_cell_counts(num_nodes, leaf_size=64, fanout=4):
+    """
+    Số ô ở mỗi mức của phân vùng lồng nhau, từ mức 1 (ô nhỏ nhất) lên mức cao nhất.
+
+    Mỗi ô ở mức l + 1 gồm đúng fanout ô ở mức l, ô mức 1 có khoảng leaf_size nút.
+    """
+    ratio = max(num_nodes / leaf_size, 1.0)
+    levels = max(1, int(math.log(ratio) / math.log(fanout)))
+    top = max(2, math.ceil(num_nodes / (leaf_size * fanout ** (levels - 1))))
+    return [top * fanout ** (levels - level) for level in range(1, levels + 1)]
+
+class CRPPartition:
+    """
+    Phân vùng nhiều mức không phụ thuộc trọng số cho Customizable Route Planning.
+
+    Các nút của CompiledGraph đã được đánh số theo đường cong Hilbert, nên ô ở mỗi mức chỉ là
+    một đoạn liên tiếp các chỉ số: cell[l][v] = v * counts[l] // n. Vì số ô ở mức dưới là bội
+    số của mức trên nên các ô lồng nhau. Nút biên ở mức l là nút có cạnh (vào hoặc ra) nối với
+    ô khác ở mức l; nút biên mức l + 1 cũng là nút biên mức l.
+
+    Parameters:
+    - compiled: CompiledGraph đánh số theo 'hilbert' (chỉ dùng cấu trúc, không dùng trọng số)
+    - leaf_size: Số nút xấp xỉ của một ô mức 1
+    - fanout: Số ô con trong mỗi ô
+    """
+
+    def __init__(self, compiled, leaf_size=64, fanout=4):
+        if compiled.order != 'hilbert':
+            raise ValueError("CRP cần CompiledGraph đánh số theo đường cong Hilbert.")
+        n = compiled.num_nodes
+        self.num_nodes = n
+        self.indptr = compiled.indptr
+        self.indices = compiled.indices
+        self.counts = [None] + level_cell_counts(n, leaf_size, fanout)
+        self.levels = len(self.counts) - 1
+
+        index = np.arange(n, dtype=np.int64)
+        sources = np.repeat(index, np.diff(compiled.indptr))
+        targets = compiled.indices.astype(np.int64)
+        self.cells = [None]
+        self.boundary = [None]
+        self.position = [None]
+        for level in range(1, self.levels + 1):
+            cell = index * self.counts[level] // max(n, 1)
+            cross = cell[sources] != cell[targets]
+            nodes = np.unique(np.concatenate([sources[cross], targets[cross]]))
+            boundary = {}
+            for node, c in zip(nodes.tolist(), cell[nodes].tolist()):
+                boundary.setdefault(c, []).append(node)
+            self.cells.append(cell.tolist())
+            self.boundary.append(boundary)
+            self.position.append({node: i for nodes in boundary.values() for i, node in enumerate(nodes)})
+
+    def matches(self, compiled):
+        """
+        Kiểm tra CompiledGraph (của một trọng số khác) có cùng cấu trúc và cách đánh số không.
+        """
+        return (compiled.order == 'hilbert' and compiled.num_nodes == self.num_nodes
+                and np.array_equal(compiled.indptr, self.indptr) and np.array_equal(compiled.indices, self.indices))
+
+    def query_level(self, node, source, target):
+        """
+        Mức cao nhất mà ô chứa node không chứa nguồn lẫn đích (0 nếu không có mức nào).
+        """
+        for level in range(self.levels, 0, -1):
+            cell = self.cells[level]
+            c = cell[node]
+            if c != cell[source] and c != cell[target]:
+                return level
+        return 0
+
+def sparsify_clique(rows):
+    """
+    Bỏ các cung clique u -> w có chi phí bằng đường vòng u -> x -> w qua một nút biên x khác
+    của cùng ô (mọi chi phí dương). Khoảng cách trên overlay không đổi vì đường vòng vẫn còn,
+    nhưng số cung cần duyệt giảm mạnh (phần lớn đường đi giữa hai nút biên men theo nút biên khác).
+
+    Returns:
+    - Danh sách, với mỗi hàng u, chỉ số các cột w được giữ lại.
+    """
+    distances = np.array(rows, dtype=np.float64).reshape(len(rows), len(rows))
+    size = len(distances)
+    columns = np.arange(size)
+    positive = np.where(distances > 0, distances, np.inf)
+    kept = []
+    for u in range(size):
+        row = distances[u]
+        keep = np.isfinite(row) & (columns != u)
+        via = np.isfinite(positive[u])
+        via[u] = False
+        if via.any():
+            detour = (row[via][:, None] + positive[via]).min(axis=0)
+            keep &= detour > row * (1 + 1e-9)
+        kept.append(np.nonzero(keep)[0].tolist())
+    return kept
+
+class CRPMetric:
+    """
+    Kết quả bước customization cho một trọng số: ma trận khoảng cách (clique) giữa các nút
+    biên của mỗi ô, ở mọi mức, và các cung overlay còn lại sau khi rút gọn clique.
+
+    Attributes:
+    - compiled: CompiledGraph của trọng số
+    - cliques: cliques[l][c][i][j] là khoảng cách ngắn nhất trong ô c (mức l) từ nút biên i tới j
+    - forward, backward: forward[l][c][i] là list (nút biên, chi phí) của các cung ra của nút
+      biên i; backward tương tự cho cung vào (dùng cho tìm kiếm lùi)
+    - seconds: Thời gian customization
+    """
+
+    def __init__(self, compiled):
+        self.compiled = compiled
+        self.cliques = [None]
+        self.forward = [None]
+        self.backward = [None]
+        self.seconds = 0.0
+        # Cache cung overlay theo (chiều, mức): {nút: [(nút kề, chi phí), ...]}
+        self._arcs = {}
+
+    def add_level(self, boundary, level_cliques):
+        forward, backward = {}, {}
+        for c, rows in level_cliques.items():
+            nodes = boundary[c]
+            out_arcs = [[] for _ in nodes]
+            in_arcs = [[] for _ in nodes]
+            for i, kept in enumerate(sparsify_clique(rows)):
+                for j in kept:
+                    out_arcs[i].append((nodes[j], rows[i][j]))
+                    in_arcs[j].append((nodes[i], rows[i][j]))
+            forward[c], backward[c] = out_arcs, in_arcs
+        self.cliques.append(level_cliques)
+        self.forward.append(forward)
+        self.backward.append(backward)
+
+def overlay_arcs(partition, metric, level, node, reverse=False):
+    """
+    Các cung đi ra (hoặc đi vào nếu reverse) của node trên đồ thị overlay ở mức level.
+
+    - Mức 0: các cạnh gốc.
+    - Mức l >= 1 (node là nút biên mức l): cung clique (đã rút gọn) tới các nút biên khác cùng
+      ô, và các cạnh gốc nối sang ô khác ở mức l.
+
+    Returns:
+    - List các tuple (nút kề, chi phí).
+    """
+    cache = metric._arcs.get((reverse, level))
+    if cache is None:
+        cache = metric._arcs[(reverse, level)] = {}
+    arcs = cache.get(node)
+    if arcs is None:
+        arcs = cache[node] = _build_arcs(partition, metric, level, node, reverse)
+    return arcs
+
+def _build_arcs(partition, metric, level, node, reverse):
+    compiled = metric.compiled.reverse() if reverse else metric.compiled
+    indptr, indices, weights = compiled.lists()
+    start, end = indptr[node], indptr[node + 1]
+    if level == 0:
+        return list(zip(indices[start:end], weights[start:end]))
+    cell = partition.cells[level]
+    c = cell[node]
+    shortcuts = metric.backward if reverse else metric.forward
+    arcs = list(shortcuts[level][c][partition.position[level][node]])
+    for k in range(start, end):
+        neighbor = indices[k]
+        if cell[neighbor] != c:
+            arcs.append((neighbor, weights[k]))
+    return arcs
+
+def _cell_distances(partition, metric, level, c, source):
+    # Dijkstra từ source chỉ trong ô c ở mức level, trên overlay mức level - 1
+    cell = partition.cells[level]
+    distances = {source: 0.0}
+    queue = [(0.0, source)]
+    inf = float('inf')
+    while queue:
+        distance, node = heapq.heappop(queue)
+        if distance > distances[node]:
+            continue
+        for neighbor, cost in overlay_arcs(partition, metric, level - 1, node):
+            if cell[neighbor] != c:
+                continue
+            new_distance = distance + cost
+            if new_distance < distances.get(neighbor, inf):
+                distances[neighbor] = new_distance
+                heapq.heappush(queue, (new_distance, neighbor))
+    return distances
+
+def customize(partition, compiled):
+    """
+    Tính clique của mọi ô cho trọng số của compiled, từ mức thấp lên mức cao.
+
+    Mức 1 dùng Dijkstra trên cạnh gốc trong từng ô; mức l > 1 chỉ duyệt overlay mức l - 1
+    (cung clique đã rút gọn của các ô con và cạnh nối giữa chúng), nên chi phí tỉ lệ với số
+    nút biên chứ không với kích thước ô.
+
+    Returns:
+    - Đối tượng CRPMetric.
+    """
+    if not partition.matches(compiled):
+        raise ValueError("CompiledGraph không khớp với phân vùng CRP.")
+    started = time.perf_counter()
+    inf = float('inf')
+    metric = CRPMetric(compiled)
+    for level in range(1, partition.levels + 1):
+        level_cliques = {}
+        for c, boundary in partition.boundary[level].items():
+            rows = []
+            for node in boundary:
+                distances = _cell_distances(partition, metric, level, c, node)
+                rows.append([distances.get(other, inf) for other in boundary])
+            level_cliques[c] = rows
+        metric.add_level(partition.boundary[level], level_cliques)
+    metric.seconds = time.perf_counter() - started
+    return metric
+
+class CRPIndex:
+    """
+    Bộ định tuyến CRP: một phân vùng dùng chung và một CRPMetric cho mỗi trọng số.
+
+    Đổi sang trọng số mới (độ dài, thời gian đi bộ, phạt đoạn qua đường nguy hiểm...) chỉ
+    cần chạy lại customization, không cần phân vùng lại.
+    """
+
+    def __init__(self, partition):
+        self.partition = partition
+        self.metrics = {}
+
+    def metric(self, graph, weight='length'):
+        metric = self.metrics.get(weight)
+        if metric is None:
+            metric = self.metrics[weight] = customize(self.partition, get_compiled(graph, weight))
+            print(f"CRP customization cho trọng số '{weight}': {metric.seconds:.2f}s.")
+        return metric
+
+def get_crp(graph, weight='length', leaf_size=64, fanout=4):
+    """
+    Lấy CRPIndex gắn ở graph.graph['preprocessing']['crp'] (tạo phân vùng nếu chưa có) và
+    CRPMetric của trọng số (customize nếu chưa có).
+
+    Returns:
+    - Tuple (CRPIndex, CRPMetric).
+    """
+    preprocessing = get_preprocessing(graph)
+    index = preprocessing.get('crp')
+    if index is not None and weight in index.metrics:
+        return index, index.metrics[weight]
+    with _BUILD_LOCK:
+        index = preprocessing.get('crp')
+        if index is None:
+            compiled = get_compiled(graph, weight)
+            index = preprocessing['crp'] = CRPIndex(CRPPartition(compiled, leaf_size=leaf_size, fanout=fanout))
+            counts = ", ".join(str(count) for count in index.partition.counts[1:])
+            print(f"Phân vùng CRP: {index.partition.levels} mức ({counts} ô).")
+        return index, index.metric(graph, weight)
@@ -0,0 +1,345 @@
+import heapq
+import os
+import random
+import threading
+import time
+
+import numpy as np
+
+from loader.compiled import get_compiled
+from loader.preprocess import get_preprocessing
+
+# Giữ việc tạo nhãn trong get_hub_labels() để mỗi đồ thị chỉ tạo một lần khi nhiều luồng cùng gọi
+_BUILD_LOCK = threading.Lock()
+
+def importance_order(compiled, samples=16, seed=0):
+    """
+    Thứ tự xét nút khi gán nhãn: nút nằm trên nhiều đường đi ngắn nhất được xét trước.
+
+    Độ quan trọng của một nút là tổng kích thước cây con của nó trong cây đường đi ngắn
+    nhất từ một số nút gốc ngẫu nhiên (xấp xỉ betweenness), cộng bậc để phá hòa.
+
+    Returns:
+    - Danh sách chỉ số nút theo độ quan trọng giảm dần.
+    """
+    indptr, indices, weights = compiled.lists()
+    n = compiled.num_nodes
+    score = [0] * n
+    rnd = random.Random(seed)
+    inf = float('inf')
+    for root in rnd.sample(range(n), min(samples, n)):
+        distances = {root: 0.0}
+        parent = {root: -1}
+        settled = []
+        queue = [(0.0, root)]
+        while queue:
+            distance, node = heapq.heappop(queue)
+            if distance > distances[node]:
+                continue
+            settled.append(node)
+            for k in range(indptr[node], indptr[node + 1]):
+                neighbor = indices[k]
+                new_distance = distance + weights[k]
+                if new_distance < distances.get(neighbor, inf):
+                    distances[neighbor] = new_distance
+                    parent[neighbor] = node
+                    heapq.heappush(queue, (new_distance, neighbor))
+        subtree = dict.fromkeys(settled, 1)
+        for node in reversed(settled):
+            p = parent[node]
+            if p != -1:
+                subtree[p] += subtree[node]
+        for node, size in subtree.items():
+            score[node] += size
+    degree = np.diff(compiled.indptr).tolist()
+    return sorted(range(n), key=lambda node: (-score[node], -degree[node], node))
+
+def _merge(hubs_a, dists_a, hubs_b, dists_b):
+    # Giao hai nhãn đã sắp xếp theo thứ hạng hub, trả về chi phí nhỏ nhất qua hub chung
+    best = float('inf')
+    i = j = 0
+    len_a, len_b = len(hubs_a), len(hubs_b)
+    while i < len_a and j < len_b:
+        a, b = hubs_a[i], hubs_b[j]
+        if a == b:
+            total = dists_a[i] + dists_b[j]
+            if total < best:
+                best = total
+            i += 1
+            j += 1
+        elif a < b:
+            i += 1
+        else:
+            j += 1
+    return best
+
+class HubLabels:
+    """
+    Chỉ mục hub labeling cho đồ thị có hướng.
+
+    Mỗi nút v có nhãn ra L_out(v) và nhãn vào L_in(v): danh sách (hub, khoảng cách) sắp xếp
+    theo thứ hạng hub. Khoảng cách từ s tới t là min(L_out(s)[h] + L_in(t)[h]) trên các hub
+    chung, tính bằng một lần trộn hai danh sách đã sắp xếp, không cần duyệt đồ thị.
+
+    Nhãn được lưu dạng CSR: out_indptr/out_hubs/out_dists (và in_*), hub là thứ hạng của nút.
+
+    Attributes:
+    - compiled: CompiledGraph mà nhãn được tính trên đó
+    - rank_to_node: Chỉ số nút theo thứ hạng hub
+    """
+
+    def __init__(self, compiled, rank_to_node, out_indptr, out_hubs, out_dists, in_indptr, in_hubs, in_dists):
+        self.compiled = compiled
+        self.rank_to_node = rank_to_node
+        self.out_indptr, self.out_hubs, self.out_dists = out_indptr, out_hubs, out_dists
+        self.in_indptr, self.in_hubs, self.in_dists = in_indptr, in_hubs, in_dists
+        self._out = self._split(out_indptr, out_hubs, out_dists)
+        self._in = self._split(in_indptr, in_hubs, in_dists)
+
+    @staticmethod
+    def _split(indptr, hubs, dists):
+        # Tách mảng CSR thành list theo nút để truy vấn nhanh trong Python
+        bounds = indptr.tolist()
+        hubs, dists = hubs.tolist(), dists.tolist()
+        return [(hubs[a:b], dists[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+
+    @property
+    def weight(self):
+        return self.compiled.weight
+
+    def average_label_size(self):
+        n = max(self.compiled.num_nodes, 1)
+        return (len(self.out_hubs) + len(self.in_hubs)) / (2 * n)
+
+    def distance(self, source, target):
+        """
+        Khoảng cách ngắn nhất giữa hai chỉ số nút (inf nếu không có đường).
+        """
+        if source == target:
+            return 0.0
+        out_hubs, out_dists = self._out[source]
+        in_hubs, in_dists = self._in[target]
+        return _merge(out_hubs, out_dists, in_hubs, in_dists)
+
+    def distance_matrix(self, sources, targets):
+        """
+        Ma trận khoảng cách giữa hai tập chỉ số nút.
+
+        Returns:
+        - Mảng numpy kích thước (len(sources), len(targets)).
+        """
+        matrix = np.empty((len(sources), len(targets)), dtype=np.float64)
+        for i, source in enumerate(sources):
+            out_hubs, out_dists = self._out[source]
+            for j, target in enumerate(targets):
+                if source == target:
+                    matrix[i, j] = 0.0
+                else:
+                    in_hubs, in_dists = self._in[target]
+                    matrix[i, j] = _merge(out_hubs, out_dists, in_hubs, in_dists)
+        return matrix
+
+    def path(self, source, target):
+        """
+        Khôi phục đường đi: từ nút hiện tại đi sang láng giềng w thỏa
+        w(u, w) + d(w, t) = d(u, t), dùng chính nhãn làm bộ trả lời khoảng cách.
+
+        Mỗi bước phải làm d(·, t) giảm thật sự. Khi mọi láng giềng như vậy chỉ nối qua cạnh
+        trọng số 0 (đoạn OSM trùng lặp hoặc dài 0), BFS trên vùng các nút cùng d(·, t) tìm
+        một nút ra khỏi vùng đó, nên vòng cạnh trọng số 0 không làm vòng lặp chạy mãi.
+
+        Returns:
+        - Danh sách chỉ số nút, rỗng nếu không có đường.
+        """
+        remaining = self.distance(source, target)
+        if remaining == float('inf'):
+            return []
+        indptr, indices, weights = self.compiled.lists()
+        path = [source]
+        node = source
+        while node != target:
+            tolerance = remaining * 1e-9 + 1e-9
+            # BFS qua các cạnh nằm trên đường ngắn nhất mà không làm giảm d(·, t), dừng ở cạnh đầu
+            # tiên làm giảm (hoặc tới target)
+            parents = {node: None}
+            frontier = [node]
+            step = None
+            while frontier and step is None:
+                next_frontier = []
+                for u in frontier:
+                    for k in range(indptr[u], indptr[u + 1]):
+                        neighbor = indices[k]
+                        rest = self.distance(neighbor, target)
+                        if weights[k] + rest > remaining + tolerance:
+                            continue
+                        if neighbor == target or rest < remaining - tolerance:
+                            step = (u, neighbor, rest)
+                            break
+                        if neighbor not in parents:
+                            parents[neighbor] = u
+                            next_frontier.append(neighbor)
+                    if step is not None:
+                        break
+                frontier = next_frontier
+            if step is None:
+                raise RuntimeError("Nhãn không nhất quán với đồ thị, không thể khôi phục đường đi.")
+            u, neighbor, rest = step
+            plateau = []
+            while u != node:
+                plateau.append(u)
+                u = parents[u]
+            path.extend(reversed(plateau))
+            path.append(neighbor)
+            node, remaining = neighbor, rest
+        return path
+
+    def save(self, path):
+        """
+        Lưu nhãn vào file .npz, kèm cấu trúc đồ thị để kiểm tra khi tải lại.
+        """
+        np.savez_compressed(
+            path,
+            rank_to_node=np.asarray(self.rank_to_node, dtype=np.int32),
+            out_indptr=self.out_indptr, out_hubs=self.out_hubs, out_dists=self.out_dists,
+            in_indptr=self.in_indptr, in_hubs=self.in_hubs, in_dists=self.in_dists,
+            weight=str(self.weight),
+            indptr=self.compiled.indptr,
+            indices=self.compiled.indices,
+            graph_weights=self.compiled.weights,
+            node_ids=np.array([str(node) for node in self.compiled.node_ids]),
+        )
+
+    @classmethod
+    def load(cls, path, compiled):
+        """
+        Tải nhãn từ file .npz. Trả về None nếu file được tính cho đồ thị hoặc trọng số khác.
+        """
+        with np.load(path) as data:
+            same_graph = (
+                str(data['weight']) == str(compiled.weight)
+                and np.array_equal(data['indptr'], compiled.indptr)
+                and np.array_equal(data['indices'], compiled.indices)
+                and np.array_equal(data['graph_weights'], compiled.weights)
+                and data['node_ids'].tolist() == [str(node) for node in compiled.node_ids]
+            )
+            if not same_graph:
+                return None
+            return cls(
+                compiled, data['rank_to_node'].tolist(),
+                data['out_indptr'], data['out_hubs'], data['out_dists'],
+                data['in_indptr'], data['in_hubs'], data['in_dists'],
+            )
+
+def _pruned_search(indptr, indices, weights, root, rank, own_label, labels):
+    """
+    Dijkstra cắt tỉa từ root: dừng mở rộng tại v nếu nhãn hiện có đã cho khoảng cách
+    không lớn hơn, ngược lại thêm (rank, khoảng cách) vào nhãn của v.
+    """
+    root_hubs, root_dists = own_label
+    root_map = dict(zip(root_hubs, root_dists))
+    distances = {root: 0.0}
+    queue = [(0.0, root)]
+    inf = float('inf')
+    while queue:
+        distance, node = heapq.heappop(queue)
+        if distance > distances[node]:
+            continue
+        hubs, dists = labels[node]
+        # Khoảng cách giữa root và node qua các hub đã xử lý
+        known = inf
+        for hub, d in zip(hubs, dists):
+            other = root_map.get(hub)
+            if other is not None and other + d < known:
+                known = other + d
+        if known <= distance:
+            continue
+        hubs.append(rank)
+        dists.append(distance)
+        for k in range(indptr[node], indptr[node + 1]):
+            neighbor = indices[k]
+            new_distance = distance + weights[k]
+            if new_distance < distances.get(neighbor, inf):
+                distances[neighbor] = new_distance
+                heapq.heappush(queue, (new_distance, neighbor))
+
+def build_hub_labels(compiled, order=None, verbose=True):
+    """
+    Tạo nhãn bằng pruned landmark labeling (Akiba và cộng sự, 2013) cho đồ thị có hướng.
+
+    Lần lượt với từng nút r theo thứ tự quan trọng: Dijkstra xuôi cắt tỉa từ r thêm r vào
+    L_in của các nút tới được, Dijkstra ngược cắt tỉa thêm r vào L_out. Nhãn được thêm theo
+    thứ hạng tăng dần nên luôn sắp xếp sẵn.
+
+    Returns:
+    - Đối tượng HubLabels.
+    """
+    if order is None:
+        order = importance_order(compiled)
+    n = compiled.num_nodes
+    forward = compiled.lists()
+    backward = compiled.reverse().lists()
+    labels_out = [([], []) for _ in range(n)]
+    labels_in = [([], []) for _ in range(n)]
+    started = time.perf_counter()
+    for rank, root in enumerate(order):
+        # L_in(v) nhận hub r nếu khoảng cách r -> v chưa được nhãn hiện có trả lời đúng
+        _pruned_search(*forward, root, rank, labels_out[root], labels_in)
+        # L_out(v) nhận hub r theo chiều ngược lại, so với L_in(r)
+        _pruned_search(*backward, root, rank, labels_in[root], labels_out)
+        if verbose and (rank + 1) % 1000 == 0:
+            print(f"Hub labels: {rank + 1}/{n} nút ({time.perf_counter() - started:.1f}s)")
+
+    def pack(labels):
+        sizes = np.array([len(hubs) for hubs, _ in labels], dtype=np.int64)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(sizes, out=indptr[1:])
+        hubs = np.fromiter((h for hubs, _ in labels for h in hubs), dtype=np.int32, count=int(indptr[-1]))
+        dists = np.fromiter((d for _, dists in labels for d in dists), dtype=np.float64, count=int(indptr[-1]))
+        return indptr, hubs, dists
+
+    labels = HubLabels(compiled, list(order), *pack(labels_out), *pack(labels_in))
+    if verbose:
+        print(f"Đã tạo hub labels cho {n} nút trong {time.perf_counter() - started:.1f}s "
+              f"(trung bình {labels.average_label_size():.1f} hub mỗi nhãn).")
+    return labels
+
+def attach_hub_labels(graph, path=None, weight='length'):
+    """
+    Gắn hub labels vào graph.graph['preprocessing']['hub_labels'].
+
+    Nếu path là file đã lưu cho đúng đồ thị và trọng số thì tải lên, ngược lại tính mới
+    rồi lưu vào path (nếu có).
+
+    Returns:
+    - Đối tượng HubLabels.
+    """
+    compiled = get_compiled(graph, weight)
+    labels = None
+    if path is not None and os.path.exists(path):
+        labels = HubLabels.load(path, compiled)
+        if labels is None:
+            print(f"File hub labels {path} không khớp với đồ thị, tính lại.")
+        else:
+            print(f"Tải hub labels từ file: {path}")
+    if labels is None:
+        labels = build_hub_labels(compiled)
+        if path is not None:
+            labels.save(path)
+            print(f"Lưu hub labels vào file: {path}")
+    get_preprocessing(graph)['hub_labels'] = labels
+    return labels
+
+def get_hub_labels(graph, weight='length'):
+    """
+    Lấy hub labels đã gắn vào đồ thị; tính mới (không lưu file) nếu chưa có hoặc khác trọng số.
+
+    Việc tính mới được giữ bởi khóa, nên nhiều luồng gọi cùng lúc (giao diện chạy nhiều thuật
+    toán song song) chỉ tạo nhãn một lần.
+    """
+    labels = graph.graph.get('preprocessing', {}).get('hub_labels')
+    if labels is None or labels.weight != weight:
+        with _BUILD_LOCK:
+            labels = graph.graph.get('preprocessing', {}).get('hub_labels')
+            if labels is None or labels.weight != weight:
+                labels = attach_hub_labels(graph, weight=weight)
+    return labels
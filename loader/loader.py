@@ -1,13 +1,192 @@
 import os
+import re
+import sys
+from array import array
+from xml.etree.ElementTree import iterparse
+
+import networkx as nx
+import numpy as np
 import osmnx as ox
 
-def load_map(place_name, filepath='graph.graphml'):
+from loader.osm_import import import_osm
+
+# Đuôi file OSM cục bộ được nhập bằng loader/osm_import.py
+OSM_EXTENSIONS = ('.osm', '.osm.bz2', '.osm.gz', '.pbf')
+
+# Thuộc tính cạnh giữ lại ở chế độ gọn: trọng số và loại đường (để giao diện chọn mức chi tiết)
+COMPACT_EDGE_ATTRIBUTES = ('length', 'highway')
+
+_NUMBER = re.compile(r'-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?')
+
+class EdgeGeometry:
+    """
+    Hình học của các cạnh ở chế độ gọn, lưu trong một mảng tọa độ float32 chung.
+
+    Cạnh có hình học mang thuộc tính 'geometry_id' = i, tọa độ của nó là
+    coords[offsets[i]:offsets[i + 1]]. Đối tượng shapely chỉ được tạo khi cần (ví dụ lúc
+    vẽ), không được gắn sẵn vào từng cạnh như ox.load_graphml.
+    """
+
+    def __init__(self, offsets, coords):
+        self.offsets = offsets
+        self.coords = coords
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.coords.nbytes
+
+    def points(self, i):
+        """
+        Danh sách tọa độ (x, y) của hình học thứ i.
+        """
+        return [tuple(point) for point in self.coords[self.offsets[i]:self.offsets[i + 1]].tolist()]
+
+    def linestring(self, i):
+        """
+        LineString shapely của hình học thứ i.
+        """
+        from shapely.geometry import LineString
+        return LineString(self.points(i))
+
+    def extended(self, polylines):
+        """
+        EdgeGeometry mới gồm các hình học hiện có và polylines (mảng (k, 2)) nối vào cuối;
+        geometry_id cũ giữ nguyên, polylines[j] có geometry_id len(self) + j.
+        """
+        if not polylines:
+            return self
+        sizes = np.fromiter((len(line) for line in polylines), dtype=np.int64, count=len(polylines))
+        offsets = np.concatenate((self.offsets, self.offsets[-1] + np.cumsum(sizes)))
+        coords = np.concatenate([self.coords] + [np.asarray(line, dtype=np.float32) for line in polylines])
+        return EdgeGeometry(offsets, coords)
+
+    @classmethod
+    def from_buffers(cls, offsets, coords):
+        return cls(np.array(offsets, dtype=np.int64), np.array(coords, dtype=np.float32).reshape(-1, 2))
+
+def _parse_value(name, text):
+    # Giá trị số chuyển thành float, chuỗi lặp lại nhiều (loại đường...) được intern để dùng chung
+    if name in ('length', 'x', 'y', 'travel_time', 'speed_kph', 'grade', 'elevation'):
+        return float(text)
+    if text.startswith('['):
+        return tuple(sys.intern(item.strip(" '\"")) for item in text.strip('[]').split(','))
+    return sys.intern(text)
+
+def load_compact_graphml(filepath, edge_attributes=COMPACT_EDGE_ATTRIBUTES, geometry=True):
+    """
+    Đọc GraphML của OSMnx nhưng chỉ giữ thuộc tính cần cho định tuyến.
+
+    File được đọc tuần tự bằng iterparse; mỗi cạnh chỉ giữ các thuộc tính trong
+    edge_attributes (số thành float, chuỗi được intern), nút chỉ giữ x và y. Hình học cạnh
+    (nếu geometry=True) được gom vào graph.graph['edge_geometry'] (EdgeGeometry), cạnh chỉ
+    giữ chỉ số 'geometry_id' thay vì một LineString.
+
+    Parameters:
+    - filepath: File GraphML
+    - edge_attributes: Các thuộc tính cạnh cần giữ
+    - geometry: Có giữ hình học của cạnh hay không
+
+    Returns:
+    - Đồ thị MultiDiGraph dùng được như đồ thị của ox.load_graphml với các thuật toán.
+    """
+    keys = {}
+    wanted_edge = set(edge_attributes)
+    graph = nx.MultiDiGraph()
+    offsets, coords = array('q', [0]), array('d')
+
+    with open(filepath, 'rb') as f:
+        container = None
+        for event, element in iterparse(f, events=('start', 'end')):
+            tag = element.tag.rpartition('}')[2]
+            if event == 'start':
+                # Nút và cạnh là con của <graph>: xóa chúng khỏi cây sau khi đọc để bộ nhớ không tăng theo file
+                if tag == 'graph':
+                    container = element
+                continue
+            if tag == 'key':
+                keys[element.get('id')] = (element.get('for'), element.get('attr.name'))
+            elif tag == 'node':
+                data = {}
+                for item in element:
+                    name = keys[item.get('key')][1]
+                    if name in ('x', 'y'):
+                        data[name] = float(item.text)
+                graph.add_node(int(element.get('id')), **data)
+                container.clear()
+            elif tag == 'edge':
+                u, v = int(element.get('source')), int(element.get('target'))
+                data, points = {}, None
+                for item in element:
+                    name = keys[item.get('key')][1]
+                    if name in wanted_edge and item.text is not None:
+                        data[name] = _parse_value(name, item.text)
+                    elif name == 'geometry' and geometry and item.text:
+                        points = _NUMBER.findall(item.text)
+                if points:
+                    data['geometry_id'] = len(offsets) - 1
+                    coords.extend(map(float, points))
+                    offsets.append(len(coords) // 2)
+                graph.add_edge(u, v, key=int(element.get('id', 0)), **data)
+                container.clear()
+            elif tag == 'data' and keys.get(element.get('key'), (None,))[0] == 'graph':
+                graph.graph[keys[element.get('key')][1]] = element.text
+
+    if geometry:
+        graph.graph['edge_geometry'] = EdgeGeometry.from_buffers(offsets, coords)
+    return graph
+
+def compact_graph(graph, edge_attributes=COMPACT_EDGE_ATTRIBUTES):
+    """
+    Bỏ thuộc tính không dùng tới khỏi một đồ thị đã có trong bộ nhớ (tải từ OpenStreetMap
+    hoặc nhập từ file OSM), giữ lại hình học trong graph.graph['edge_geometry'].
+    """
+    wanted = set(edge_attributes)
+    offsets, coords = array('q', [0]), array('d')
+    for _, _, data in graph.edges(data=True):
+        line = data.pop('geometry', None)
+        for name in [name for name in data if name not in wanted]:
+            del data[name]
+        if line is not None:
+            data['geometry_id'] = len(offsets) - 1
+            for x, y in line.coords:
+                coords.extend((x, y))
+            offsets.append(len(coords) // 2)
+    for _, data in graph.nodes(data=True):
+        for name in [name for name in data if name not in ('x', 'y')]:
+            del data[name]
+    graph.graph['edge_geometry'] = EdgeGeometry.from_buffers(offsets, coords)
+    return graph
+
+def load_map(place_name, filepath='graph.graphml', network_type='walk', osm_file=None, compact=False,
+             edge_attributes=COMPACT_EDGE_ATTRIBUTES):
+    """
+    Tải đồ thị mạng lưới đường.
+
+    - filepath đã tồn tại: đọc GraphML (hoặc nhập trực tiếp nếu là file OSM cục bộ).
+    - Có osm_file: nhập từ file OSM cục bộ (không cần mạng) rồi lưu GraphML vào filepath.
+    - Còn lại: tải từ OpenStreetMap theo place_name rồi lưu GraphML vào filepath.
+
+    Với compact=True chỉ giữ edge_attributes trên cạnh, x/y trên nút và hình học cạnh dạng
+    mảng (xem load_compact_graphml), giảm mạnh bộ nhớ với khu vực lớn.
+    """
     if os.path.exists(filepath):
+        if filepath.endswith(OSM_EXTENSIONS):
+            G = import_osm(filepath, network_type=network_type).to_networkx()
+            return compact_graph(G, edge_attributes) if compact else G
         print(f"Tải đồ thị từ file: {filepath}")
+        if compact:
+            return load_compact_graphml(filepath, edge_attributes)
         G = ox.load_graphml(filepath)
+    elif osm_file is not None:
+        G = import_osm(osm_file, network_type=network_type).to_networkx()
+        print(f"Lưu đồ thị vào file: {filepath}")
+        ox.save_graphml(G, filepath)
     else:
         print(f"Tải bản đồ từ OpenStreetMap cho: {place_name}")
-        G = ox.graph_from_place(place_name, network_type='walk')
+        G = ox.graph_from_place(place_name, network_type=network_type)
         print(f"Lưu đồ thị vào file: {filepath}")
         ox.save_graphml(G, filepath)
-    return G
\ No newline at end of file
+    return compact_graph(G, edge_attributes) if compact else G
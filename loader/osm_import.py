@@ -0,0 +1,324 @@
+import argparse
+import bz2
+import gzip
+import time
+from array import array
+from xml.etree.ElementTree import iterparse
+
+import networkx as nx
+import numpy as np
+
+from loader.compiled import CompiledGraph, _build_csr, node_order
+from loader.spatial_index import EARTH_RADIUS_M
+
+try:
+    import osmium
+except ImportError:  # pyosmium chỉ cần khi đọc file .pbf
+    osmium = None
+
+# Các giá trị highway bị loại theo từng loại mạng lưới, tương tự bộ lọc network_type của OSMnx
+EXCLUDED_HIGHWAYS = {
+    'walk': {'motorway', 'motorway_link', 'trunk', 'trunk_link', 'bus_guideway', 'escape', 'raceway',
+             'construction', 'proposed', 'abandoned', 'platform'},
+    'drive': {'footway', 'pedestrian', 'path', 'steps', 'cycleway', 'bridleway', 'track', 'corridor',
+              'elevator', 'escalator', 'bus_guideway', 'escape', 'raceway', 'construction', 'proposed',
+              'abandoned', 'platform', 'service', 'services', 'busway'},
+}
+NETWORK_TYPES = tuple(EXCLUDED_HIGHWAYS)
+
+# Thẻ cấm loại phương tiện tương ứng của mạng lưới
+_ACCESS_TAGS = {'walk': ('foot', 'access'), 'drive': ('motor_vehicle', 'motorcar', 'access')}
+_NO_ACCESS = {'no', 'private'}
+
+def way_direction(tags, network_type):
+    """
+    Chiều đi được của một way theo mạng lưới: 0 nếu bị loại, 1 nếu đi xuôi, -1 nếu chỉ đi
+    ngược, 2 nếu đi hai chiều. Mạng đi bộ bỏ qua oneway giống OSMnx.
+    """
+    highway = tags.get('highway')
+    if highway is None or highway in EXCLUDED_HIGHWAYS[network_type] or tags.get('area') == 'yes':
+        return 0
+    *specific, general = _ACCESS_TAGS[network_type]
+    if any(tags.get(key) in _NO_ACCESS for key in specific):
+        return 0
+    # access=no bị bỏ qua nếu có thẻ cụ thể cho phép (foot=yes, motorcar=designated...)
+    if tags.get(general) in _NO_ACCESS and not any(key in tags for key in specific):
+        return 0
+    if network_type == 'walk':
+        return 2
+    oneway = tags.get('oneway')
+    if oneway == '-1':
+        return -1
+    if oneway in ('yes', 'true', '1') or tags.get('junction') in ('roundabout', 'circular'):
+        return 1
+    return 2
+
+def _open(path):
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+def _scan_xml(path, on_node=None, on_way=None):
+    # iterparse và xóa từng phần tử sau khi xử lý, nên bộ nhớ không phụ thuộc kích thước file
+    with _open(path) as f:
+        context = iterparse(f, events=('start', 'end'))
+        _, root = next(context)
+        for event, element in context:
+            if event != 'end':
+                continue
+            tag = element.tag
+            if tag == 'node':
+                if on_node is not None:
+                    on_node(int(element.get('id')), float(element.get('lon')), float(element.get('lat')))
+            elif tag == 'way':
+                if on_way is not None:
+                    refs = [int(nd.get('ref')) for nd in element.iter('nd')]
+                    tags = {item.get('k'): item.get('v') for item in element.iter('tag')}
+                    on_way(int(element.get('id')), refs, tags)
+            elif tag != 'relation':
+                continue
+            root.clear()
+
+def _scan_pbf(path, on_node=None, on_way=None):
+    if osmium is None:
+        raise ImportError("Đọc file .pbf cần pyosmium (pip install osmium).")
+
+    # pyosmium chỉ giải mã loại đối tượng mà handler có phương thức tương ứng
+    methods = {}
+    if on_node is not None:
+        methods['node'] = lambda self, node: on_node(node.id, node.location.lon, node.location.lat)
+    if on_way is not None:
+        methods['way'] = lambda self, way: on_way(way.id, [nd.ref for nd in way.nodes],
+                                                  {tag.k: tag.v for tag in way.tags})
+    handler = type('Handler', (osmium.SimpleHandler,), methods)()
+    handler.apply_file(path, locations=False)
+
+def scan_osm(path, on_node=None, on_way=None):
+    """
+    Duyệt tuần tự một file OSM (.osm, .osm.bz2, .osm.gz hoặc .pbf), gọi on_node(id, lon, lat)
+    cho mỗi nút và on_way(id, refs, tags) cho mỗi way mà không giữ cả file trong bộ nhớ.
+    """
+    if path.endswith('.pbf'):
+        _scan_pbf(path, on_node, on_way)
+    else:
+        _scan_xml(path, on_node, on_way)
+
+class OSMArrays:
+    """
+    Mạng lưới đường đọc từ file OSM dưới dạng mảng.
+
+    Attributes:
+    - node_ids: Mảng id OSM của các nút giữ lại
+    - x, y: Kinh độ, vĩ độ theo chỉ số nút
+    - sources, targets: Chỉ số nút hai đầu của từng cạnh có hướng
+    - lengths: Độ dài cạnh (mét, theo công thức haversine)
+    - way_ids: Id way chứa cạnh
+    - highways: Giá trị highway của từng cạnh (chỉ số vào highway_values)
+    - highway_values: Danh sách các giá trị highway khác nhau
+    - names: Dict {id way: tên đường} cho các way có tên
+    """
+
+    def __init__(self, node_ids, x, y, sources, targets, lengths, way_ids, highways, highway_values, names):
+        self.node_ids = node_ids
+        self.x = x
+        self.y = y
+        self.sources = sources
+        self.targets = targets
+        self.lengths = lengths
+        self.way_ids = way_ids
+        self.highways = highways
+        self.highway_values = highway_values
+        self.names = names
+
+    @property
+    def num_nodes(self):
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self):
+        return len(self.sources)
+
+    def to_networkx(self):
+        """
+        Tạo MultiDiGraph theo quy ước của OSMnx (nút có x, y; cạnh có length, osmid, highway,
+        oneway), dùng được với load_map, các thuật toán và giao diện.
+        """
+        graph = nx.MultiDiGraph(crs='epsg:4326')
+        node_ids = self.node_ids.tolist()
+        graph.add_nodes_from(
+            (node, {'x': x, 'y': y}) for node, x, y in zip(node_ids, self.x.tolist(), self.y.tolist())
+        )
+        reverse = set(zip(self.targets.tolist(), self.sources.tolist(), self.way_ids.tolist()))
+        for u, v, length, way, highway in zip(self.sources.tolist(), self.targets.tolist(), self.lengths.tolist(),
+                                              self.way_ids.tolist(), self.highways.tolist()):
+            data = {'osmid': way, 'highway': self.highway_values[highway], 'length': length,
+                    'oneway': (v, u, way) not in reverse}
+            if way in self.names:
+                data['name'] = self.names[way]
+            graph.add_edge(node_ids[u], node_ids[v], **data)
+        return graph
+
+    def compile(self, order='hilbert'):
+        """
+        Tạo CompiledGraph (trọng số 'length') thẳng từ mảng, không qua NetworkX.
+        """
+        perm = node_order(order, self.x, self.y, self.sources, self.targets)
+        new_index = np.empty(self.num_nodes, dtype=np.int64)
+        new_index[perm] = np.arange(self.num_nodes, dtype=np.int64)
+        proper = self.sources != self.targets
+        indptr, indices, weights = _build_csr(self.num_nodes, new_index[self.sources[proper]],
+                                              new_index[self.targets[proper]], self.lengths[proper])
+        node_ids = self.node_ids[perm].tolist()
+        return CompiledGraph(indptr, indices, weights, node_ids, self.x[perm], self.y[perm], weight='length', order=order)
+
+def _haversine(lon1, lat1, lon2, lat2):
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+def import_osm(path, network_type='walk', simplify=True, verbose=True):
+    """
+    Đọc mạng lưới đường từ file OSM cục bộ bằng hai lượt đọc tuần tự.
+
+    - Lượt 1 chỉ đọc way: lọc theo network_type và lưu danh sách nút của các way giữ lại
+      trong mảng số nguyên gọn.
+    - Lượt 2 chỉ đọc nút: giữ tọa độ của các nút được way dùng tới.
+
+    Bộ nhớ tỉ lệ với số nút/way của mạng lưới được giữ lại chứ không với kích thước file.
+
+    Parameters:
+    - path: File .osm (có thể nén .bz2/.gz) hoặc .osm.pbf (cần pyosmium)
+    - network_type: 'walk' hoặc 'drive'
+    - simplify: Chỉ giữ nút giao và đầu mút của way; các nút chỉ nằm giữa một way được gộp
+      vào cạnh (độ dài vẫn được cộng đủ theo từng đoạn)
+    - verbose: In tiến độ
+
+    Returns:
+    - Đối tượng OSMArrays.
+    """
+    if network_type not in EXCLUDED_HIGHWAYS:
+        raise ValueError(f"Loại mạng lưới không hỗ trợ: {network_type}. Chọn một trong {NETWORK_TYPES}.")
+    started = time.perf_counter()
+
+    refs = array('q')
+    offsets = array('q', [0])
+    way_ids = array('q')
+    directions = array('b')
+    highway_codes = array('h')
+    highway_values, highway_index = [], {}
+    names = {}
+
+    def on_way(way_id, way_refs, tags):
+        direction = way_direction(tags, network_type)
+        if direction == 0 or len(way_refs) < 2:
+            return
+        refs.extend(way_refs)
+        offsets.append(len(refs))
+        way_ids.append(way_id)
+        directions.append(direction)
+        highway = tags['highway']
+        if highway not in highway_index:
+            highway_index[highway] = len(highway_values)
+            highway_values.append(highway)
+        highway_codes.append(highway_index[highway])
+        if 'name' in tags:
+            names[way_id] = tags['name']
+
+    scan_osm(path, on_way=on_way)
+    refs = np.frombuffer(refs, dtype=np.int64)
+    offsets = np.frombuffer(offsets, dtype=np.int64)
+    if verbose:
+        print(f"Đọc {len(way_ids)} way ({network_type}) trong {time.perf_counter() - started:.1f}s.")
+
+    used = np.unique(refs)
+    lon = np.full(len(used), np.nan)
+    lat = np.full(len(used), np.nan)
+
+    buffer_ids, buffer_lon, buffer_lat = array('q'), array('d'), array('d')
+
+    def flush():
+        # Tra cứu theo lô bằng numpy thay vì từng nút
+        ids = np.array(buffer_ids, dtype=np.int64)
+        i = np.minimum(np.searchsorted(used, ids), max(len(used) - 1, 0))
+        found = used[i] == ids if len(used) else np.zeros(len(ids), dtype=bool)
+        lon[i[found]] = np.array(buffer_lon)[found]
+        lat[i[found]] = np.array(buffer_lat)[found]
+        del buffer_ids[:], buffer_lon[:], buffer_lat[:]
+
+    def on_node(node_id, node_lon, node_lat):
+        buffer_ids.append(node_id)
+        buffer_lon.append(node_lon)
+        buffer_lat.append(node_lat)
+        if len(buffer_ids) >= 65536:
+            flush()
+
+    scan_osm(path, on_node=on_node)
+    flush()
+    if verbose:
+        print(f"Đọc tọa độ {len(used)} nút trong {time.perf_counter() - started:.1f}s.")
+
+    position = np.searchsorted(used, refs)
+    missing = np.isnan(lon[position])
+    if missing.any():
+        print(f"Bỏ {int(missing.sum())} tham chiếu tới nút không có trong file (way bị cắt ở biên vùng).")
+
+    # Cạnh giữa hai nút liên tiếp của cùng way; bỏ đoạn có đầu mút thiếu tọa độ
+    way_of = np.repeat(np.arange(len(way_ids)), np.diff(offsets))
+    consecutive = np.ones(len(refs), dtype=bool)
+    consecutive[offsets[1:] - 1] = False
+    a = np.flatnonzero(consecutive & ~missing & ~np.roll(missing, -1))
+    u, v, way = position[a], position[a + 1], way_of[a]
+    segment = _haversine(lon[u], lat[u], lon[v], lat[v])
+
+    if simplify:
+        # Nút giữ lại: đầu mút của way và nút xuất hiện nhiều lần (giao nhau giữa các way)
+        counts = np.bincount(position, minlength=len(used))
+        keep = counts > 1
+        keep[position[offsets[:-1]]] = True
+        keep[position[offsets[1:] - 1]] = True
+        # Gộp các đoạn liên tiếp cùng way cho tới khi gặp nút được giữ hoặc đoạn bị bỏ
+        starts = np.r_[True, (way[1:] != way[:-1]) | (a[1:] != a[:-1] + 1) | keep[u[1:]]]
+        group = np.cumsum(starts) - 1
+        first = np.flatnonzero(starts)
+        last = np.r_[first[1:], len(a)] - 1
+        u, v, way = u[first], v[last], way[first]
+        segment = np.bincount(group, weights=segment)
+    nodes = np.unique(np.concatenate([u, v]))
+
+    remap = np.full(len(used), -1, dtype=np.int64)
+    remap[nodes] = np.arange(len(nodes))
+    direction = np.frombuffer(directions, dtype=np.int8)[way]
+    forward = direction != -1
+    backward = direction != 1
+    sources = np.concatenate([remap[u][forward], remap[v][backward]])
+    targets = np.concatenate([remap[v][forward], remap[u][backward]])
+    lengths = np.concatenate([segment[forward], segment[backward]]).astype(np.float64)
+    edge_ways = np.concatenate([way[forward], way[backward]])
+    way_ids = np.frombuffer(way_ids, dtype=np.int64)
+    highway_codes = np.frombuffer(highway_codes, dtype=np.int16)
+
+    result = OSMArrays(used[nodes], lon[nodes], lat[nodes], sources, targets, lengths, way_ids[edge_ways],
+                       highway_codes[edge_ways], highway_values, names)
+    if verbose:
+        print(f"Nhập {result.num_nodes} nút, {result.num_edges} cạnh từ {path} trong "
+              f"{time.perf_counter() - started:.1f}s.")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Nhập mạng lưới đường từ file OSM cục bộ và lưu thành GraphML.")
+    parser.add_argument('osm', help="File .osm, .osm.bz2, .osm.gz hoặc .osm.pbf")
+    parser.add_argument('graphml', help="File GraphML đầu ra")
+    parser.add_argument('--network', choices=NETWORK_TYPES, default='walk', help="Loại mạng lưới")
+    parser.add_argument('--no-simplify', action='store_true', help="Giữ mọi nút của way")
+    args = parser.parse_args()
+
+    import osmnx as ox
+
+    arrays = import_osm(args.osm, network_type=args.network, simplify=not args.no_simplify)
+    ox.save_graphml(arrays.to_networkx(), args.graphml)
+    print(f"Lưu đồ thị vào file: {args.graphml}")
+
+if __name__ == '__main__':
+    main()
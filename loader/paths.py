@@ -0,0 +1,154 @@
+import numpy as np
+
+from loader.compiled import get_compiled
+
+def edge_geometry(graph, compiled):
+    """
+    Hình học của mọi cạnh của CompiledGraph dưới dạng CSR tọa độ (tạo một lần và lưu trong
+    compiled): polyline của cạnh k là coords[offsets[k]:offsets[k + 1]], gồm cả hai đầu mút.
+
+    Cạnh lấy thuộc tính 'geometry' (LineString) hoặc 'geometry_id' vào graph.graph['edge_geometry']
+    (đồ thị ở chế độ gọn); cạnh không có hình học chỉ gồm hai đầu mút. Giữa các cạnh song song
+    lấy hình học của cạnh nhẹ nhất, là cạnh mà CompiledGraph giữ lại.
+
+    Returns:
+    - Tuple (offsets, coords): mảng int64 độ dài num_edges + 1 và mảng float64 (số điểm, 2).
+    """
+    if compiled._geometry is not None:
+        return compiled._geometry
+    index = compiled.index
+    store = graph.graph.get('edge_geometry')
+    sources, targets, weights, lines = [], [], [], []
+    for u, v, data in graph.edges(data=True):
+        if u == v:
+            continue
+        line = data.get('geometry')
+        if line is not None:
+            line = np.asarray(line.coords, dtype=np.float64)
+        elif store is not None and 'geometry_id' in data:
+            i = data['geometry_id']
+            line = store.coords[store.offsets[i]:store.offsets[i + 1]]
+        else:
+            continue
+        sources.append(index[u])
+        targets.append(index[v])
+        weights.append(data.get(compiled.weight, 1) if compiled.weight is not None else 1)
+        lines.append(line)
+
+    chosen = {}
+    if sources:
+        edges = compiled.edge_index(sources, targets)
+        for k, weight, line in zip(edges.tolist(), weights, lines):
+            if k >= 0 and k not in chosen and weight == compiled.weights[k] and len(line) >= 2:
+                chosen[k] = line
+
+    sizes = np.full(compiled.num_edges, 2, dtype=np.int64)
+    for k, line in chosen.items():
+        sizes[k] = len(line)
+    offsets = np.zeros(compiled.num_edges + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    coords = np.empty((int(offsets[-1]), 2), dtype=np.float64)
+    edge_sources = np.repeat(np.arange(compiled.num_nodes, dtype=np.int64), np.diff(compiled.indptr))
+    coords[offsets[:-1], 0] = compiled.x[edge_sources]
+    coords[offsets[:-1], 1] = compiled.y[edge_sources]
+    coords[offsets[1:] - 1, 0] = compiled.x[compiled.indices]
+    coords[offsets[1:] - 1, 1] = compiled.y[compiled.indices]
+    for k, line in chosen.items():
+        coords[offsets[k]:offsets[k + 1]] = line
+    compiled._geometry = (offsets, coords)
+    return compiled._geometry
+
+def evaluate_paths(graph, paths, weight='length', geometry=False):
+    """
+    Tính chi phí, tính hợp lệ và (tùy chọn) hình học của nhiều đường đi cùng lúc từ mảng cạnh
+    của CompiledGraph.
+
+    Mọi cặp nút liên tiếp của tất cả đường đi được tra trong một lần tìm kiếm nhị phân, rồi
+    cộng trọng số theo từng đường bằng np.add.reduceat. Giữa hai nút có cạnh song song thì
+    lấy cạnh có trọng số nhỏ nhất, giống các thuật toán trong registry. Hình học được ghép từ
+    polyline của các cạnh đó (xem edge_geometry()) bằng các phép toán mảng, không lặp theo cạnh.
+
+    Parameters:
+    - graph: Đồ thị dưới dạng đối tượng NetworkX
+    - paths: Danh sách đường đi (danh sách nút)
+    - weight: Thuộc tính của cạnh dùng làm trọng số (mặc định là 'length')
+    - geometry: Trả thêm tọa độ của các đường đi
+
+    Returns:
+    - Tuple (chi phí, hợp lệ): hai mảng numpy theo thứ tự của paths. Đường rỗng, chứa nút
+      không có trong đồ thị hoặc có cặp nút liên tiếp không nối bằng cạnh nào là không hợp lệ
+      và có chi phí inf.
+    - Với geometry=True: tuple (chi phí, hợp lệ, offsets, coords), tọa độ (x, y) của đường
+      thứ i là coords[offsets[i]:offsets[i + 1]] (rỗng với đường không hợp lệ).
+    """
+    compiled = get_compiled(graph, weight)
+    index = compiled.index
+    costs = np.full(len(paths), np.inf)
+    valid = np.zeros(len(paths), dtype=bool)
+    firsts = np.full(len(paths), -1, dtype=np.int64)
+
+    sources, targets, owners = [], [], []
+    for i, path in enumerate(paths):
+        if not path:
+            continue
+        nodes = [index.get(node, -1) for node in path]
+        if -1 in nodes:
+            continue
+        sources.extend(nodes[:-1])
+        targets.extend(nodes[1:])
+        owners.extend([i] * (len(nodes) - 1))
+        firsts[i] = nodes[0]
+        # Đường một nút hợp lệ với chi phí 0; các đường khác được xác định bên dưới
+        costs[i] = 0.0
+        valid[i] = True
+
+    owners = np.array(owners, dtype=np.int64)
+    edges = np.empty(0, dtype=np.int64)
+    if sources:
+        edges = compiled.edge_index(sources, targets)
+        missing = edges < 0
+        valid[owners[missing]] = False
+        costs[~valid] = np.inf
+        edge_costs = np.where(missing, 0.0, compiled.weights[np.maximum(edges, 0)])
+        starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+        sums = np.add.reduceat(edge_costs, starts)
+        owner_ids = owners[starts]
+        costs[owner_ids] = np.where(valid[owner_ids], sums, np.inf)
+    if not geometry:
+        return costs, valid
+
+    # Mỗi đường gồm điểm đầu và các điểm của từng cạnh trừ điểm đầu của cạnh (trùng với cạnh trước)
+    edge_offsets, edge_coords = edge_geometry(graph, compiled)
+    keep = valid[owners]
+    edges, owners = edges[keep], owners[keep]
+    counts = edge_offsets[edges + 1] - edge_offsets[edges] - 1
+    sizes = np.where(valid, 1, 0) + np.bincount(owners, weights=counts, minlength=len(paths)).astype(np.int64)
+    offsets = np.zeros(len(paths) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    coords = np.empty((int(offsets[-1]), 2), dtype=np.float64)
+    heads = offsets[:-1][valid]
+    coords[heads, 0] = compiled.x[firsts[valid]]
+    coords[heads, 1] = compiled.y[firsts[valid]]
+    ends = np.cumsum(counts)
+    positions = np.repeat(edge_offsets[edges] + 1 - ends + counts, counts) + np.arange(int(counts.sum()), dtype=np.int64)
+    body = np.ones(len(coords), dtype=bool)
+    body[heads] = False
+    coords[body] = edge_coords[positions]
+    return costs, valid, offsets, coords
+
+def path_cost(graph, path, weight='length'):
+    """
+    Chi phí của một đường đi, inf nếu đường rỗng hoặc không hợp lệ. Xem evaluate_paths().
+    """
+    costs, _ = evaluate_paths(graph, [path], weight)
+    return float(costs[0])
+
+def path_coordinates(graph, path, weight='length'):
+    """
+    Tọa độ của đường đi theo hình học các cạnh, xem evaluate_paths().
+
+    Returns:
+    - Tuple (xs, ys) dạng mảng numpy, rỗng nếu đường không hợp lệ.
+    """
+    _, _, _, coords = evaluate_paths(graph, [path], weight, geometry=True)
+    return coords[:, 0], coords[:, 1]
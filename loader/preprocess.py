@@ -0,0 +1,320 @@
+import importlib
+
+import networkx as nx
+
+def get_preprocessing(graph):
+    """
+    Dict chứa dữ liệu tiền xử lý đã gắn vào đồ thị (graph.graph['preprocessing']).
+    """
+    return graph.graph.setdefault('preprocessing', {})
+
+class ComponentIndex:
+    """
+    Thành phần liên thông mạnh (SCC) của đồ thị có hướng, dùng để trả lời "có đường đi
+    từ u tới v không?" mà không cần chạy thuật toán tìm đường.
+
+    - Cùng SCC: chắc chắn có đường (O(1)).
+    - Khác thành phần liên thông yếu, hoặc SCC của v đứng trước SCC của u theo thứ tự tô-pô
+      của đồ thị ngưng tụ: chắc chắn không có đường (O(1)).
+    - Các trường hợp còn lại: duyệt trên đồ thị ngưng tụ (nhỏ hơn nhiều so với đồ thị gốc),
+      chỉ đi qua các SCC có thứ tự tô-pô không vượt quá SCC của v.
+    """
+
+    def __init__(self, graph):
+        sccs = list(nx.strongly_connected_components(graph))
+        self.condensation = nx.condensation(graph, scc=sccs)
+        self.component = self.condensation.graph['mapping']
+        self.sizes = [len(nodes) for nodes in sccs]
+        self.order = {c: i for i, c in enumerate(nx.topological_sort(self.condensation))}
+        self.weak = {}
+        for i, members in enumerate(nx.weakly_connected_components(self.condensation)):
+            for c in members:
+                self.weak[c] = i
+
+    def __len__(self):
+        return len(self.sizes)
+
+    @property
+    def largest(self):
+        """
+        Chỉ số của SCC lớn nhất.
+        """
+        return max(range(len(self.sizes)), key=self.sizes.__getitem__)
+
+    def nodes_of(self, component):
+        return self.condensation.nodes[component]['members']
+
+    def same_component(self, u, v):
+        return self.component[u] == self.component[v]
+
+    def reachable(self, u, v):
+        """
+        Kiểm tra có đường đi có hướng từ u tới v hay không (kết quả chính xác).
+        """
+        cu, cv = self.component[u], self.component[v]
+        if cu == cv:
+            return True
+        if self.weak[cu] != self.weak[cv] or self.order[cu] > self.order[cv]:
+            return False
+        limit = self.order[cv]
+        stack, seen = [cu], {cu}
+        while stack:
+            c = stack.pop()
+            for nxt in self.condensation.successors(c):
+                if nxt == cv:
+                    return True
+                if nxt not in seen and self.order[nxt] < limit:
+                    seen.add(nxt)
+                    stack.append(nxt)
+        return False
+
+def compute_components(graph):
+    """
+    Tính SCC và gắn vào graph.graph['preprocessing']['components'].
+
+    Returns:
+    - Đối tượng ComponentIndex.
+    """
+    components = ComponentIndex(graph)
+    get_preprocessing(graph)['components'] = components
+    return components
+
+def reachable(graph, u, v):
+    """
+    Kiểm tra nhanh có đường đi từ u tới v không. Nếu đồ thị chưa được tính SCC thì luôn
+    trả về True (để thuật toán tìm đường tự quyết định).
+    """
+    components = graph.graph.get('preprocessing', {}).get('components')
+    if components is None:
+        return True
+    return components.reachable(u, v)
+
+# Hàm tạo dữ liệu tiền xử lý theo khóa AlgorithmSpec.preprocessing: (module, hàm get_*(graph, weight)).
+# Module chỉ được import khi cần vì chúng import ngược lại module này.
+PREPARERS = {
+    'arc_flags': ('loader.arc_flags', 'get_arc_flags'),
+    'crp': ('loader.crp', 'get_crp'),
+    'hub_labels': ('loader.hub_labels', 'get_hub_labels'),
+}
+
+def is_prepared(graph, key, weight='length'):
+    """
+    Kiểm tra dữ liệu tiền xử lý key (khóa AlgorithmSpec.preprocessing) của trọng số weight đã
+    được gắn vào đồ thị chưa, tức truy vấn kế tiếp không phải tạo nó. key None luôn trả về True.
+    """
+    if key is None:
+        return True
+    data = graph.graph.get('preprocessing', {}).get(key)
+    if data is None:
+        return False
+    if key == 'crp':
+        # CRPIndex giữ một metric cho mỗi trọng số đã customize
+        return weight in data.metrics
+    return data.weight == weight
+
+def prepare(graph, key, weight='length'):
+    """
+    Tạo trước dữ liệu tiền xử lý mà một thuật toán cần (arc flags, CRP, hub labels...), để chi
+    phí tạo một lần này không rơi vào truy vấn đầu tiên. Không làm gì nếu key là None hoặc dữ
+    liệu đã có.
+
+    Parameters:
+    - graph: Đồ thị NetworkX
+    - key: Khóa AlgorithmSpec.preprocessing của thuật toán
+    - weight: Thuộc tính của cạnh dùng làm trọng số
+
+    Returns:
+    - Dữ liệu tiền xử lý (như hàm get_* tương ứng trả về), None nếu key là None.
+    """
+    if key is None:
+        return None
+    if key not in PREPARERS:
+        raise ValueError(f"Không có bước tiền xử lý '{key}', chọn một trong {sorted(PREPARERS)}.")
+    module, name = PREPARERS[key]
+    return getattr(importlib.import_module(module), name)(graph, weight)
+
+def _derived_graph(graph, new_graph):
+    # Thuộc tính đồ thị được sao chép, nhưng dữ liệu tiền xử lý và cache phải tính lại
+    new_graph.graph = {
+        key: value for key, value in graph.graph.items()
+        if key != 'preprocessing' and not key.startswith('_')
+    }
+    return new_graph
+
+def restrict_to_largest_component(graph, components=None):
+    """
+    Tạo đồ thị mới chỉ gồm SCC lớn nhất; mọi cặp nút trong đồ thị mới đều có đường đi.
+    """
+    if components is None:
+        components = ComponentIndex(graph)
+    nodes = components.nodes_of(components.largest)
+    return _derived_graph(graph, graph.subgraph(nodes).copy())
+
+def _min_edge(graph, u, v, weight):
+    return min(graph[u][v].values(), key=lambda data: data.get(weight, 1))
+
+def _is_chain_node(graph, node):
+    """
+    Nút bậc 2 có thể gộp: đúng hai láng giềng a, b (không tính khuyên), và luồng đi qua nút
+    nhất quán theo từng chiều (a→node tồn tại khi và chỉ khi node→b tồn tại, và ngược lại).
+    """
+    preds = set(graph.predecessors(node))
+    succs = set(graph.successors(node))
+    if node in preds or node in succs:
+        return False
+    neighbors = preds | succs
+    if len(neighbors) != 2:
+        return False
+    a, b = neighbors
+    forward = a in preds
+    backward = b in preds
+    return forward == (b in succs) and backward == (a in succs) and (forward or backward)
+
+def _walk(graph, chain_nodes, previous, node):
+    """
+    Đi dọc chuỗi từ node (là nút bậc 2) theo hướng rời xa previous cho tới nút không gộp được.
+    """
+    path = []
+    while node in chain_nodes:
+        path.append(node)
+        a, b = set(graph.predecessors(node)) | set(graph.successors(node))
+        previous, node = node, (b if a == previous else a)
+        if node == path[0]:
+            # Chuỗi khép kín, không có nút đầu mút
+            return path, None
+    return path, node
+
+def contract_chains(graph, weight='length'):
+    """
+    Gộp các chuỗi nút bậc 2 thành một cạnh duy nhất.
+
+    Mỗi cạnh mới giữ tổng trọng số và tổng 'length' của chuỗi, hình học nối liền của các cạnh
+    thành phần (thuộc tính 'geometry', hoặc 'geometry_id' vào graph.graph['edge_geometry'] với
+    đồ thị ở chế độ gọn) và danh sách nút trung gian (thuộc tính 'via') để
+    khôi phục đường đi đầy đủ bằng unpack_path(). Cạnh song song được chọn theo trọng số nhỏ
+    nhất, nên chi phí đường đi ngắn nhất giữa các nút còn lại không đổi.
+
+    Returns:
+    - Đồ thị mới đã gộp chuỗi.
+    """
+    chain_nodes = {node for node in graph.nodes if _is_chain_node(graph, node)}
+    contracted = _derived_graph(graph, graph.copy())
+    if not chain_nodes:
+        return contracted
+    # Đồ thị ở chế độ gọn: hình học của cạnh gộp được nối vào bản sao của kho hình học chung
+    store = graph.graph.get('edge_geometry')
+    merged_geometry = [] if store is not None else None
+
+    visited = set()
+    for start in chain_nodes:
+        if start in visited:
+            continue
+        a, b = set(graph.predecessors(start)) | set(graph.successors(start))
+        left, left_end = _walk(graph, chain_nodes, start, a) if a in chain_nodes else ([], a)
+        if left_end is None:
+            # Vòng kín toàn nút bậc 2: giữ nguyên
+            visited.update(left)
+            continue
+        right, right_end = _walk(graph, chain_nodes, start, b) if b in chain_nodes else ([], b)
+        interior = left[::-1] + [start] + right
+        visited.update(interior)
+        sequence = [left_end] + interior + [right_end]
+        contracted.remove_nodes_from(interior)
+        if left_end == right_end:
+            continue
+        for nodes in (sequence, sequence[::-1]):
+            if not graph.has_edge(nodes[0], nodes[1]):
+                continue
+            contracted.add_edge(nodes[0], nodes[-1], **_merge_edges(graph, nodes, weight, merged_geometry))
+    if merged_geometry:
+        contracted.graph['edge_geometry'] = store.extended(merged_geometry)
+    return contracted
+
+def _merge_edges(graph, nodes, weight, merged_geometry=None):
+    # merged_geometry là danh sách hình học mới của kho chung (đồ thị gọn), None với đồ thị thường
+    edges = [_min_edge(graph, u, v, weight) for u, v in zip(nodes[:-1], nodes[1:])]
+    merged = dict(edges[0])
+    merged.pop('geometry_id', None)
+    merged['length'] = sum(data.get('length', 0) for data in edges)
+    if weight != 'length':
+        merged[weight] = sum(data.get(weight, 1) for data in edges)
+    merged['via'] = list(nodes[1:-1])
+    osmids = []
+    for data in edges:
+        osmid = data.get('osmid')
+        for value in (osmid if isinstance(osmid, list) else [osmid]):
+            if value is not None and value not in osmids:
+                osmids.append(value)
+    merged['osmid'] = osmids[0] if len(osmids) == 1 else osmids
+
+    store = graph.graph.get('edge_geometry')
+    coords = []
+    for (u, v), data in zip(zip(nodes[:-1], nodes[1:]), edges):
+        geometry = data.get('geometry')
+        if geometry is not None:
+            part = list(geometry.coords)
+        elif store is not None and 'geometry_id' in data:
+            part = store.points(data['geometry_id'])
+        else:
+            part = [(graph.nodes[u]['x'], graph.nodes[u]['y']), (graph.nodes[v]['x'], graph.nodes[v]['y'])]
+        coords.extend(part if not coords else part[1:])
+    if merged_geometry is not None:
+        # Không tạo LineString cho từng cạnh: hình học gộp nằm trong kho chung như các cạnh khác
+        merged.pop('geometry', None)
+        merged['geometry_id'] = len(store) + len(merged_geometry)
+        merged_geometry.append(coords)
+        return merged
+    try:
+        from shapely.geometry import LineString
+        merged['geometry'] = LineString(coords)
+    except ImportError:
+        merged.pop('geometry', None)
+    return merged
+
+def unpack_path(graph, path, weight='length'):
+    """
+    Khôi phục đường đi đầy đủ (gồm các nút trung gian đã bị gộp) từ đường đi trên đồ thị đã gộp.
+    """
+    if len(path) < 2 or 'contraction' not in graph.graph.get('preprocessing', {}):
+        return path
+    full = [path[0]]
+    for u, v in zip(path[:-1], path[1:]):
+        full.extend(_min_edge(graph, u, v, weight).get('via', ()))
+        full.append(v)
+    return full
+
+def preprocess_graph(graph, largest_component=False, contract=False, weight='length'):
+    """
+    Tiền xử lý đồ thị sau load_map.
+
+    Parameters:
+    - graph: Đồ thị OSMnx (MultiDiGraph)
+    - largest_component: Chỉ giữ SCC lớn nhất
+    - contract: Gộp các chuỗi nút bậc 2 (đường đi trả về cần unpack_path để có đủ nút)
+    - weight: Trọng số dùng khi chọn cạnh song song lúc gộp chuỗi
+
+    Returns:
+    - Đồ thị đã xử lý, với graph.graph['preprocessing'] chứa 'components' (ComponentIndex)
+      và 'contraction' nếu có gộp chuỗi.
+    """
+    original_nodes = graph.number_of_nodes()
+    components = ComponentIndex(graph)
+    if largest_component and len(components) > 1:
+        graph = restrict_to_largest_component(graph, components)
+        print(f"Giữ SCC lớn nhất: {graph.number_of_nodes()}/{original_nodes} nút "
+              f"(bỏ {len(components) - 1} thành phần nhỏ).")
+        components = None
+    if contract:
+        before = graph.number_of_nodes()
+        graph = contract_chains(graph, weight=weight)
+        get_preprocessing(graph)['contraction'] = {
+            'weight': weight,
+            'removed_nodes': before - graph.number_of_nodes(),
+        }
+        print(f"Gộp chuỗi bậc 2: {before} -> {graph.number_of_nodes()} nút.")
+        components = None
+    if components is None:
+        compute_components(graph)
+    else:
+        get_preprocessing(graph)['components'] = components
+    return graph
@@ -0,0 +1,165 @@
+import inspect
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from loader.compiled import CompiledGraph
+from loader.preprocess import unpack_path
+
+# Python >= 3.13 cho phép tiến trình gắn vào không đăng ký khối nhớ với resource tracker
+_TRACK_PARAMETER = 'track' in inspect.signature(shared_memory.SharedMemory).parameters
+
+class SharedGraphHandle:
+    """
+    Mô tả nhỏ gọn (picklable) của một đồ thị đã công bố vào shared memory: tên, shape và
+    dtype của từng khối nhớ cùng vài thuộc tính của CompiledGraph. Đây là thứ được truyền
+    cho initializer của process pool thay vì chính đồ thị.
+    """
+
+    def __init__(self, blocks, weight, order):
+        self.blocks = blocks
+        self.weight = weight
+        self.order = order
+
+    def __repr__(self):
+        names = ", ".join(self.blocks)
+        return f"SharedGraphHandle(weight={self.weight!r}, order={self.order!r}, arrays=[{names}])"
+
+class SharedGraph:
+    """
+    Công bố các mảng của một CompiledGraph (và các mảng phụ tùy chọn) vào
+    multiprocessing.shared_memory, mỗi mảng một khối.
+
+    Tiến trình tạo ra SharedGraph sở hữu các khối nhớ: gọi close() (hoặc dùng with) sau khi
+    các tiến trình con đã dừng để giải phóng chúng. Tiến trình con dùng attach_shared_graph()
+    với handle để có CompiledGraph trỏ thẳng vào các khối đó, không sao chép.
+
+    Parameters:
+    - compiled: CompiledGraph cần chia sẻ; id nút phải là số nguyên (id OSM)
+    - extra: Dict {tên: mảng numpy} các mảng phụ cần chia sẻ cùng đồ thị
+    """
+
+    def __init__(self, compiled, extra=None):
+        try:
+            node_ids = np.asarray(compiled.node_ids, dtype=np.int64)
+        except (TypeError, ValueError):
+            raise ValueError("Chỉ chia sẻ được đồ thị có id nút là số nguyên.")
+        # id nút đã sắp xếp và chỉ số tương ứng: tiến trình con tra id bằng np.searchsorted thay vì dict
+        id_order = np.argsort(node_ids, kind='stable')
+        arrays = {
+            'indptr': compiled.indptr,
+            'indices': compiled.indices,
+            'weights': compiled.weights,
+            'x': compiled.x,
+            'y': compiled.y,
+            'node_ids': node_ids,
+            'sorted_ids': node_ids[id_order],
+            'sorted_index': id_order.astype(np.int64),
+        }
+        arrays.update(extra or {})
+
+        self._segments = []
+        blocks = {}
+        try:
+            for name, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                # Khối nhớ rỗng không hợp lệ, luôn cấp ít nhất một byte
+                segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                self._segments.append(segment)
+                np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[...] = array
+                blocks[name] = (segment.name, array.shape, array.dtype.str)
+        except BaseException:
+            self.close()
+            raise
+        self.handle = SharedGraphHandle(blocks, compiled.weight, compiled.order)
+
+    @property
+    def nbytes(self):
+        return sum(segment.size for segment in self._segments)
+
+    def close(self):
+        """
+        Đóng và xóa mọi khối nhớ. Các tiến trình đang gắn vào vẫn đọc được tới khi chúng đóng.
+        """
+        for segment in self._segments:
+            segment.close()
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+        self._segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def via_table(graph, compiled, weight='length'):
+    """
+    Các nút trung gian bị gộp trên từng cạnh của compiled (xem loader/preprocess.py), dạng
+    CSR theo chỉ số cạnh để chia sẻ cùng đồ thị: nút trung gian của cạnh k là
+    via_nodes[via_indptr[k]:via_indptr[k + 1]].
+
+    Returns:
+    - Tuple (via_indptr, via_nodes) dạng mảng numpy; rỗng nếu đồ thị không được gộp chuỗi.
+    """
+    via_indptr = np.zeros(compiled.num_edges + 1, dtype=np.int64)
+    if 'contraction' not in graph.graph.get('preprocessing', {}):
+        return via_indptr, np.zeros(0, dtype=np.int64)
+    indptr, indices, _ = compiled.lists()
+    node_ids = compiled.node_ids
+    via_nodes = []
+    for u in range(compiled.num_nodes):
+        for k in range(indptr[u], indptr[u + 1]):
+            via_nodes.extend(unpack_path(graph, [node_ids[u], node_ids[indices[k]]], weight)[1:-1])
+            via_indptr[k + 1] = len(via_nodes)
+    return via_indptr, np.asarray(via_nodes, dtype=np.int64)
+
+def _attach_segment(name):
+    if _TRACK_PARAMETER:
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+def attach_shared_graph(handle):
+    """
+    Gắn vào đồ thị đã được công bố bởi SharedGraph.
+
+    Các mảng CSR, tọa độ và bảng tra id là view chỉ đọc trên shared memory. Tiến trình con
+    nên tra id bằng lookup_nodes() và tìm kiếm trực tiếp trên mảng (ví dụ
+    csr_dijkstra.array_one_to_many): CompiledGraph.index và CompiledGraph.lists() tạo bản
+    sao riêng của cả đồ thị trong tiến trình gọi chúng.
+
+    Returns:
+    - Tuple (CompiledGraph, dict {tên: mảng} của các mảng phụ, gồm cả 'sorted_ids' và 'sorted_index').
+    """
+    segments = []
+    arrays = {}
+    for name, (segment_name, shape, dtype) in handle.blocks.items():
+        segment = _attach_segment(segment_name)
+        segments.append(segment)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+
+    compiled = CompiledGraph(
+        arrays.pop('indptr'), arrays.pop('indices'), arrays.pop('weights'), arrays.pop('node_ids'),
+        arrays.pop('x'), arrays.pop('y'), weight=handle.weight, order=handle.order
+    )
+    # Giữ tham chiếu tới các khối nhớ để view không bị giải phóng
+    compiled._shared_segments = segments
+    return compiled, arrays
+
+def lookup_nodes(sorted_ids, sorted_index, node_ids):
+    """
+    Chỉ số trong CompiledGraph của các id nút, tìm nhị phân trên bảng tra đã công bố cùng đồ thị.
+
+    Returns:
+    - Mảng chỉ số int64. Ném KeyError nếu có id không thuộc đồ thị.
+    """
+    node_ids = np.asarray(node_ids, dtype=np.int64)
+    position = np.minimum(np.searchsorted(sorted_ids, node_ids), max(len(sorted_ids) - 1, 0))
+    missing = sorted_ids[position] != node_ids if len(sorted_ids) else np.ones(len(node_ids), dtype=np.bool_)
+    if missing.any():
+        raise KeyError(int(node_ids[np.flatnonzero(missing)[0]]))
+    return sorted_index[position]
@@ -0,0 +1,101 @@
+import math
+from collections import defaultdict
+
+EARTH_RADIUS_M = 6371008.8
+
+class NodeIndex:
+    """
+    Chỉ mục lưới đều để tìm nút gần nhất với một tọa độ (lat, lon).
+
+    Thay cho ox.nearest_nodes (dựng lại BallTree ở mỗi lần gọi và cần scikit-learn
+    với đồ thị chưa chiếu), chỉ mục được dựng một lần rồi dùng lại cho mọi truy vấn.
+    Khoảng cách dùng phép chiếu equirectangular quanh vĩ độ trung tâm, đủ chính xác
+    ở quy mô phường/quận/thành phố.
+    """
+
+    def __init__(self, node_ids, xs, ys, cell_size=None):
+        self.node_ids = list(node_ids)
+        self.xs = list(xs)
+        self.ys = list(ys)
+        if not self.node_ids:
+            raise ValueError("Không thể tạo chỉ mục cho đồ thị rỗng.")
+
+        min_x, max_x = min(self.xs), max(self.xs)
+        min_y, max_y = min(self.ys), max(self.ys)
+        self.origin = (min_x, min_y)
+        self.cos_lat = math.cos(math.radians((min_y + max_y) / 2))
+
+        if cell_size is None:
+            # Trung bình khoảng vài nút mỗi ô
+            area = max((max_x - min_x) * (max_y - min_y), 1e-12)
+            cell_size = max(math.sqrt(area / len(self.node_ids)) * 2, 1e-6)
+        self.cell_size = cell_size
+
+        self.cells = defaultdict(list)
+        for i, (x, y) in enumerate(zip(self.xs, self.ys)):
+            self.cells[self._cell(x, y)].append(i)
+        self.coords = {node: (x, y) for node, x, y in zip(self.node_ids, self.xs, self.ys)}
+
+    @classmethod
+    def from_graph(cls, graph, cell_size=None):
+        """
+        Tạo chỉ mục từ đồ thị NetworkX có thuộc tính 'x' (kinh độ) và 'y' (vĩ độ) trên nút.
+        """
+        node_ids, xs, ys = [], [], []
+        for node, data in graph.nodes(data=True):
+            node_ids.append(node)
+            xs.append(data['x'])
+            ys.append(data['y'])
+        return cls(node_ids, xs, ys, cell_size=cell_size)
+
+    def _cell(self, x, y):
+        return (int((x - self.origin[0]) // self.cell_size), int((y - self.origin[1]) // self.cell_size))
+
+    def distance(self, lat1, lon1, lat2, lon2):
+        """
+        Khoảng cách xấp xỉ (mét) giữa hai điểm theo phép chiếu equirectangular.
+        """
+        dx = math.radians(lon2 - lon1) * self.cos_lat
+        dy = math.radians(lat2 - lat1)
+        return EARTH_RADIUS_M * math.hypot(dx, dy)
+
+    def nearest(self, lat, lon):
+        """
+        Tìm nút gần nhất với tọa độ (lat, lon).
+
+        Returns:
+        - Tuple (id nút, khoảng cách tính bằng mét).
+        """
+        cx, cy = self._cell(lon, lat)
+        best_node, best_dist = None, float('inf')
+        ring = 0
+        max_ring = max(len(self.cells), 1) + abs(cx) + abs(cy)
+        while ring <= max_ring:
+            for i in self._ring_members(cx, cy, ring):
+                d = self.distance(lat, lon, self.ys[i], self.xs[i])
+                if d < best_dist:
+                    best_node, best_dist = self.node_ids[i], d
+            # Mọi ô ở vòng tiếp theo cách điểm truy vấn ít nhất ring * cell_size
+            ring_gap = ring * self.cell_size
+            gap_m = EARTH_RADIUS_M * math.radians(ring_gap) * min(self.cos_lat, 1.0)
+            if best_node is not None and gap_m > best_dist:
+                break
+            ring += 1
+        return best_node, best_dist
+
+    def nearest_node(self, lat, lon):
+        """
+        Tìm id của nút gần nhất với tọa độ (lat, lon).
+        """
+        return self.nearest(lat, lon)[0]
+
+    def _ring_members(self, cx, cy, ring):
+        if ring == 0:
+            yield from self.cells.get((cx, cy), ())
+            return
+        for dx in range(-ring, ring + 1):
+            for dy in (-ring, ring):
+                yield from self.cells.get((cx + dx, cy + dy), ())
+        for dy in range(-ring + 1, ring):
+            for dx in (-ring, ring):
+                yield from self.cells.get((cx + dx, cy + dy), ())
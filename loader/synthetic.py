@@ -0,0 +1,209 @@
+import argparse
+import math
+
+import numpy as np
+import osmnx as ox
+
+from loader.compiled import hilbert_keys
+from loader.osm_import import OSMArrays, _haversine
+from loader.spatial_index import EARTH_RADIUS_M
+
+# Các loại đường được sinh, từ lớn tới nhỏ (chỉ số vào danh sách là giá trị trong OSMArrays.highways)
+HIGHWAY_VALUES = ['primary', 'secondary', 'tertiary', 'residential', 'service', 'footway']
+
+# Id nút tổng hợp bắt đầu từ giá trị này để không trùng với id OSM của các đồ thị thật nhỏ
+NODE_ID_OFFSET = 10 ** 12
+
+def _to_degrees(xs_m, ys_m, center):
+    # Mét trong mặt phẳng cục bộ -> (kinh độ, vĩ độ) quanh center = (lat, lon)
+    lat0, lon0 = center
+    meters_y = EARTH_RADIUS_M * math.pi / 180
+    meters_x = meters_y * math.cos(math.radians(lat0))
+    return lon0 + xs_m / meters_x, lat0 + ys_m / meters_y
+
+def _build(xs, ys, a, b, classes, oneway, rng):
+    # Tạo OSMArrays từ danh sách đường vô hướng (a, b): chiều a -> b luôn có, chiều b -> a trừ đường một chiều.
+    # Độ dài lấy từ haversine nhân hệ số uốn >= 1 để heuristic Euclid vẫn là cận dưới
+    curvature = rng.uniform(1.0, 1.2, size=len(a))
+    lengths = np.round(_haversine(xs[a], ys[a], xs[b], ys[b]) * curvature, 3)
+    ways = np.arange(1, len(a) + 1, dtype=np.int64)
+    two_way = ~oneway
+    return OSMArrays(
+        node_ids=NODE_ID_OFFSET + np.arange(len(xs), dtype=np.int64),
+        x=xs,
+        y=ys,
+        sources=np.concatenate([a, b[two_way]]),
+        targets=np.concatenate([b, a[two_way]]),
+        lengths=np.concatenate([lengths, lengths[two_way]]),
+        way_ids=np.concatenate([ways, ways[two_way]]),
+        highways=np.concatenate([classes, classes[two_way]]).astype(np.int8),
+        highway_values=list(HIGHWAY_VALUES),
+        names={}
+    )
+
+def _connect(num_nodes, a, b, pairs, distances):
+    # Nối các thành phần liên thông: duyệt các cặp ứng viên theo khoảng cách tăng dần và thêm
+    # cặp nối hai thành phần khác nhau (như Kruskal). Cặp kề nhau trên đường cong Hilbert nằm
+    # trong pairs nên kết quả luôn liên thông
+    parent = list(range(num_nodes))
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for u, v in zip(a.tolist(), b.tolist()):
+        ru, rv = find(u), find(v)
+        if ru != rv:
+            parent[ru] = rv
+    extra_a, extra_b = [], []
+    components = len({find(node) for node in range(num_nodes)})
+    order = np.argsort(distances, kind='stable')
+    for u, v in zip(pairs[0][order].tolist(), pairs[1][order].tolist()):
+        if components == 1:
+            break
+        ru, rv = find(u), find(v)
+        if ru != rv:
+            parent[ru] = rv
+            extra_a.append(u)
+            extra_b.append(v)
+            components -= 1
+    return np.asarray(extra_a, dtype=np.int64), np.asarray(extra_b, dtype=np.int64)
+
+def _minor_classes(rng, size):
+    # Đường nhỏ: phần lớn là residential, còn lại service/footway
+    return rng.choice([3, 4, 5], size=size, p=[0.7, 0.15, 0.15])
+
+def perturbed_grid(num_nodes, seed=0, spacing_m=80.0, jitter=0.25, drop=0.15, oneway=0.1, center=(21.03, 105.83)):
+    """
+    Mạng lưới dạng ô bàn cờ bị xáo trộn, giống khu phố đô thị.
+
+    Nút nằm trên lưới cách đều spacing_m và lệch ngẫu nhiên tới jitter * spacing_m. Cứ 4, 8,
+    16 hàng/cột thì có một trục tertiary, secondary, primary không bao giờ bị bỏ; các đoạn
+    đường nhỏ còn lại bị bỏ với xác suất drop và là đường một chiều với xác suất oneway.
+
+    Returns:
+    - Đối tượng OSMArrays (to_networkx() cho đồ thị OSMnx, compile() cho CompiledGraph).
+    """
+    rng = np.random.default_rng(seed)
+    cols = max(int(math.ceil(math.sqrt(num_nodes))), 1)
+    index = np.arange(num_nodes, dtype=np.int64)
+    row, col = index // cols, index % cols
+    xs_m = (col + rng.uniform(-jitter, jitter, num_nodes)) * spacing_m
+    ys_m = (row + rng.uniform(-jitter, jitter, num_nodes)) * spacing_m
+    xs, ys = _to_degrees(xs_m, ys_m, center)
+
+    def line_class(position):
+        # Loại đường của cả hàng/cột theo vị trí của nó
+        classes = np.full(len(position), -1, dtype=np.int64)
+        for step, value in ((4, 2), (8, 1), (16, 0)):
+            classes[position % step == 0] = value
+        return classes
+
+    horizontal = index[(col + 1 < cols) & (index + 1 < num_nodes)]
+    vertical = index[index + cols < num_nodes]
+    a = np.concatenate([horizontal, vertical])
+    b = np.concatenate([horizontal + 1, vertical + cols])
+    classes = np.concatenate([line_class(row[horizontal]), line_class(col[vertical])])
+    minor = classes < 0
+    classes[minor] = _minor_classes(rng, int(minor.sum()))
+    keep = ~minor | (rng.random(len(a)) >= drop)
+    a, b, classes = a[keep], b[keep], classes[keep]
+    is_oneway = (classes >= 2) & (classes <= 3) & (rng.random(len(a)) < oneway)
+    return _build(xs, ys, a, b, classes, is_oneway, rng)
+
+def random_geometric(num_nodes, seed=0, spacing_m=80.0, degree=(0.1, 0.3, 0.45, 0.15), oneway=0.0, window=4,
+                     center=(21.03, 105.83)):
+    """
+    Đồ thị hình học ngẫu nhiên: nút rải đều, mỗi nút nối với k nút gần nhất (k = 1..len(degree)
+    theo phân phối degree), nên bậc và độ dài cạnh phân bố gần với mạng lưới đường thật hơn
+    lưới đều.
+
+    Láng giềng gần nhất được tìm xấp xỉ và vector hóa: chỉ xét các nút cách nhau tối đa
+    window vị trí theo hai đường cong Hilbert lệch nhau, đủ nhanh cho hàng triệu nút. Các
+    thành phần rời nhau được nối bằng cặp ứng viên ngắn nhất giữa chúng, nên đồ thị liên
+    thông. Cạnh dài hơn được gán loại đường lớn hơn. Mặc định không có đường một chiều vì
+    đồ thị k láng giềng có nhiều cầu, một cạnh một chiều trên cầu sẽ cắt đôi SCC.
+
+    Returns:
+    - Đối tượng OSMArrays.
+    """
+    rng = np.random.default_rng(seed)
+    side = math.sqrt(num_nodes) * spacing_m
+    xs_m = rng.uniform(0.0, side, num_nodes)
+    ys_m = rng.uniform(0.0, side, num_nodes)
+
+    pairs = []
+    for shift in (0.0, 0.37):
+        # Đường cong thứ hai lệch (và cuộn vòng) để các nút gần nhau bị đường cong thứ nhất tách ra vẫn gặp nhau
+        order = np.argsort(hilbert_keys((xs_m + shift * side) % side, (ys_m + shift * side) % side), kind='stable')
+        for offset in range(1, window + 1):
+            pairs.append(np.stack([order[:-offset], order[offset:]]))
+    pairs = np.concatenate(pairs, axis=1).astype(np.int32)
+    pair_distances = np.hypot(xs_m[pairs[0]] - xs_m[pairs[1]], ys_m[pairs[0]] - ys_m[pairs[1]]).astype(np.float32)
+
+    # Mỗi cặp ứng viên xét từ cả hai đầu, giữ k ứng viên gần nhất của mỗi nút
+    nodes = np.concatenate([pairs[0], pairs[1]])
+    others = np.concatenate([pairs[1], pairs[0]])
+    distances = np.concatenate([pair_distances, pair_distances])
+    order = np.lexsort((distances, nodes))
+    nodes, others = nodes[order], others[order]
+    starts = np.flatnonzero(np.r_[True, nodes[1:] != nodes[:-1]])
+    rank = np.arange(len(nodes)) - np.repeat(starts, np.diff(np.r_[starts, len(nodes)]))
+    wanted = rng.choice(np.arange(1, len(degree) + 1), size=num_nodes, p=np.asarray(degree) / np.sum(degree))
+    keep = rank < wanted[nodes]
+    a = np.minimum(nodes[keep], others[keep]).astype(np.int64)
+    b = np.maximum(nodes[keep], others[keep]).astype(np.int64)
+    edges = np.unique(a * num_nodes + b)
+    a, b = edges // num_nodes, edges % num_nodes
+    a, b = a[a != b], b[a != b]
+    extra_a, extra_b = _connect(num_nodes, a, b, pairs, pair_distances)
+    a, b = np.concatenate([a, np.minimum(extra_a, extra_b)]), np.concatenate([b, np.maximum(extra_a, extra_b)])
+
+    xs, ys = _to_degrees(xs_m, ys_m, center)
+    length = np.hypot(xs_m[a] - xs_m[b], ys_m[a] - ys_m[b])
+    quantile = np.argsort(np.argsort(length)) / max(len(length) - 1, 1)
+    classes = np.select([quantile > 0.97, quantile > 0.9, quantile > 0.75], [0, 1, 2], default=-1)
+    minor = classes < 0
+    classes[minor] = _minor_classes(rng, int(minor.sum()))
+    is_oneway = (classes >= 2) & (classes <= 3) & (rng.random(len(a)) < oneway)
+    return _build(xs, ys, a, b, classes, is_oneway, rng)
+
+GENERATORS = {
+    'grid': perturbed_grid,
+    'geometric': random_geometric,
+}
+
+def synthetic_graph(num_nodes, generator='grid', seed=0, **kwargs):
+    """
+    Sinh đồ thị OSMnx giả lập (MultiDiGraph có x/y trên nút, length/highway/oneway trên cạnh)
+    để thử thuật toán khi không có bản đồ thật hoặc cần kích thước tùy ý.
+
+    Parameters:
+    - num_nodes: Số nút (vài nghìn tới hàng triệu)
+    - generator: 'grid' (perturbed_grid) hoặc 'geometric' (random_geometric)
+    - seed: Hạt giống ngẫu nhiên, cùng seed cho cùng đồ thị
+    - kwargs: Tham số riêng của generator
+
+    Returns:
+    - Đồ thị NetworkX.
+    """
+    if generator not in GENERATORS:
+        raise ValueError(f"Không có generator {generator!r}, chọn một trong {sorted(GENERATORS)}.")
+    return GENERATORS[generator](num_nodes, seed=seed, **kwargs).to_networkx()
+
+def main():
+    parser = argparse.ArgumentParser(description="Sinh đồ thị mạng lưới đường giả lập và lưu thành GraphML.")
+    parser.add_argument('output', help="File GraphML đầu ra")
+    parser.add_argument('--nodes', type=int, default=10000, help="Số nút")
+    parser.add_argument('--generator', choices=sorted(GENERATORS), default='grid')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    graph = synthetic_graph(args.nodes, args.generator, args.seed)
+    ox.save_graphml(graph, args.output)
+    print(f"Đã lưu {graph.number_of_nodes()} nút, {graph.number_of_edges()} cạnh vào {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,17 @@
+import argparse
 import tkinter as tk
 
 from gui.app import MapApp
 from loader.loader import load_map
+from loader.preprocess import preprocess_graph
 from algorithms import *
 
 def main():
+    parser = argparse.ArgumentParser(description="Giao diện tìm đường đi ngắn nhất.")
+    parser.add_argument('--compact', action='store_true',
+                        help="Tải đồ thị ở chế độ gọn (chỉ giữ thuộc tính cần cho định tuyến, hình học dạng mảng)")
+    args = parser.parse_args()
+
     ward_name = "Dien Bien Ward"  # Tên phường
     district_name = "Ba Dinh District"  # Tên quận
     city_name = "Ha Noi City"  # Tên thành phố
@@ -13,7 +20,10 @@ def main():
     place_name = f"{ward_name}, {district_name}, {city_name}, {country_name}"  # Tên địa điểm
     graph_filepath = f'graphs/{ward_name}_{district_name}_{city_name}_{country_name}.graphml'  # Đường dẫn lưu đồ thị
 
-    G = load_map(place_name, filepath=graph_filepath)
+    G = load_map(place_name, filepath=graph_filepath, compact=args.compact)
+
+    # Tính SCC để giao diện loại ngay các cặp điểm không có đường đi
+    G = preprocess_graph(G)
 
     if G.is_directed():
         print("Đồ thị có hướng")
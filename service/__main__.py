@@ -0,0 +1,49 @@
+# Điểm vào của dịch vụ định tuyến: python -m service --port 8080
+
+import argparse
+import asyncio
+
+from service.server import RouteService
+
+def main():
+    ward_name = "Dien Bien Ward"  # Tên phường
+    district_name = "Ba Dinh District"  # Tên quận
+    city_name = "Ha Noi City"  # Tên thành phố
+    country_name = "Vietnam"  # Tên quốc gia
+
+    place_name = f"{ward_name}, {district_name}, {city_name}, {country_name}"
+    graph_filepath = f'graphs/{ward_name}_{district_name}_{city_name}_{country_name}.graphml'
+
+    parser = argparse.ArgumentParser(description="Dịch vụ định tuyến HTTP/JSON.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--place', default=place_name, help="Tên địa điểm để tải từ OpenStreetMap")
+    parser.add_argument('--graph', default=graph_filepath, help="Đường dẫn file GraphML")
+    parser.add_argument('--workers', type=int, default=None, help="Số tiến trình tìm kiếm")
+    parser.add_argument('--batch-window-ms', type=float, default=5.0, help="Thời gian gom lô (ms)")
+    parser.add_argument('--max-batch', type=int, default=64, help="Số yêu cầu tối đa mỗi lô")
+    parser.add_argument('--no-preprocess', action='store_true',
+                        help="Không lọc SCC lớn nhất và không gộp chuỗi nút bậc 2")
+    parser.add_argument('--shared-memory', action='store_true',
+                        help="Tải đồ thị một lần và chia sẻ dạng mảng cho các tiến trình qua shared memory")
+    parser.add_argument('--compact', action='store_true',
+                        help="Tải đồ thị ở chế độ gọn (chỉ giữ thuộc tính cần cho định tuyến, hình học dạng mảng)")
+    args = parser.parse_args()
+
+    service = RouteService(
+        args.place,
+        args.graph,
+        workers=args.workers,
+        batch_window=args.batch_window_ms / 1000,
+        max_batch=args.max_batch,
+        preprocess=not args.no_preprocess,
+        shared_memory=args.shared_memory,
+        compact=args.compact
+    )
+    try:
+        asyncio.run(service.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        print("Đã dừng dịch vụ.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import asyncio
+
+from service import worker
+
+class RouteBatcher:
+    """
+    Gom các yêu cầu định tuyến có chung nút nguồn trong một cửa sổ thời gian ngắn
+    thành một lần tìm kiếm một-nhiều chạy trên process pool.
+
+    Parameters:
+    - executor: Process pool dùng để chạy tìm kiếm
+    - metrics: Đối tượng ServiceMetrics để ghi nhận kích thước lô
+    - algorithm_name: Thuật toán trong registry có hàm một-nhiều dùng để giải lô
+    - window: Thời gian chờ gom lô (giây)
+    - max_batch: Số yêu cầu tối đa trong một lô; đạt ngưỡng thì gửi ngay
+    - weight: Thuộc tính cạnh dùng làm trọng số
+    """
+
+    def __init__(self, executor, metrics, algorithm_name, window=0.005, max_batch=64, weight='length'):
+        self.executor = executor
+        self.metrics = metrics
+        self.algorithm_name = algorithm_name
+        self.window = window
+        self.max_batch = max_batch
+        self.weight = weight
+        self._pending = {}
+        # Bộ hẹn giờ gửi lô của từng nút nguồn, hủy khi lô được gửi sớm vì đủ max_batch
+        self._timers = {}
+
+    async def submit(self, source, target):
+        """
+        Đưa một truy vấn vào lô của nút nguồn và chờ kết quả.
+
+        Returns:
+        - Tuple (chi phí, đường đi, kích thước lô).
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(source, [])
+        pending.append((target, future))
+        if len(pending) == 1:
+            self._timers[source] = loop.call_later(self.window, self._flush, source)
+        elif len(pending) >= self.max_batch:
+            self._flush(source)
+        return await future
+
+    def _flush(self, source):
+        timer = self._timers.pop(source, None)
+        if timer is not None:
+            timer.cancel()
+        items = self._pending.pop(source, None)
+        if not items:
+            return
+        targets = list({target for target, _ in items})
+        self.metrics.batch_dispatched(len(items))
+        loop = asyncio.get_running_loop()
+        try:
+            task = loop.run_in_executor(self.executor, worker.solve_batch, self.algorithm_name, source, targets,
+                                        self.weight)
+        except RuntimeError as e:
+            # Process pool đã đóng (dịch vụ đang dừng): báo lỗi cho các yêu cầu đang chờ
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        task.add_done_callback(lambda done: self._resolve(done, items))
+
+    @staticmethod
+    def _resolve(done, items):
+        # Tác vụ bị hủy khi process pool đóng với cancel_futures=True (RouteService.close);
+        # done.exception() sẽ ném CancelledError nên hủy luôn các yêu cầu đang chờ
+        if done.cancelled():
+            for _, future in items:
+                future.cancel()
+            return
+        error = done.exception()
+        results = None if error else done.result()
+        for target, future in items:
+            if future.done():
+                continue
+            if error:
+                future.set_exception(error)
+            else:
+                cost, path = results[target]
+                future.set_result((cost, path, len(items)))
@@ -0,0 +1,115 @@
+# Client đơn giản cho dịch vụ định tuyến, chỉ dùng thư viện chuẩn và loopback.
+# Có thể chạy như một công cụ đo tải: python -m service.client --requests 500 --concurrency 32
+
+import argparse
+import http.client
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class RouteClient:
+    """
+    Client HTTP/JSON giữ kết nối keep-alive tới dịch vụ định tuyến.
+    """
+
+    def __init__(self, host='127.0.0.1', port=8080, timeout=60):
+        self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _request(self, method, path, payload=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        data = json.loads(response.read().decode('utf-8'))
+        return response.status, data
+
+    def route(self, origin, destination, algorithm=None):
+        """
+        Gửi một truy vấn định tuyến.
+
+        Args:
+            origin: Tọa độ (lat, lon) điểm xuất phát.
+            destination: Tọa độ (lat, lon) điểm đến.
+            algorithm: Tên thuật toán trong registry (mặc định dùng Dijkstra gom lô).
+
+        Returns:
+            Tuple (mã trạng thái HTTP, dict kết quả).
+        """
+        payload = {'origin': list(origin), 'destination': list(destination)}
+        if algorithm:
+            payload['algorithm'] = algorithm
+        return self._request('POST', '/route', payload)
+
+    def metrics(self):
+        return self._request('GET', '/metrics')[1]
+
+    def close(self):
+        self.connection.close()
+
+def run_load_test(host, port, bbox, num_requests=200, concurrency=16, num_sources=8, seed=None):
+    """
+    Gửi num_requests truy vấn song song; các truy vấn dùng chung num_sources điểm xuất phát
+    để kiểm tra cơ chế gom lô.
+
+    Args:
+        bbox: (min_lat, min_lon, max_lat, max_lon) phạm vi sinh tọa độ ngẫu nhiên.
+
+    Returns:
+        dict: Số liệu phía client và số liệu phía dịch vụ.
+    """
+    rng = random.Random(seed)
+    min_lat, min_lon, max_lat, max_lon = bbox
+    random_point = lambda: (rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon))
+    sources = [random_point() for _ in range(num_sources)]
+    queries = [(rng.choice(sources), random_point()) for _ in range(num_requests)]
+
+    def run_chunk(chunk):
+        client = RouteClient(host, port)
+        latencies = []
+        try:
+            for origin, destination in chunk:
+                started = time.perf_counter()
+                client.route(origin, destination)
+                latencies.append(time.perf_counter() - started)
+        finally:
+            client.close()
+        return latencies
+
+    chunks = [queries[i::concurrency] for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = [lat for result in pool.map(run_chunk, chunks) for lat in result]
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    client = RouteClient(host, port)
+    try:
+        server_metrics = client.metrics()
+    finally:
+        client.close()
+    return {
+        'requests': len(latencies),
+        'elapsed_seconds': elapsed,
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': latencies[len(latencies) // 2] * 1000 if latencies else None,
+        'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000 if latencies else None,
+        'server': server_metrics,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo tải dịch vụ định tuyến qua loopback.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--bbox', type=float, nargs=4, required=True,
+                        metavar=('MIN_LAT', 'MIN_LON', 'MAX_LAT', 'MAX_LON'))
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--sources', type=int, default=8)
+    args = parser.parse_args()
+
+    result = run_load_test(args.host, args.port, args.bbox, args.requests, args.concurrency, args.sources)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
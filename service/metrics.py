@@ -0,0 +1,80 @@
+import time
+from collections import deque
+
+class ServiceMetrics:
+    """
+    Thu thập số liệu độ trễ và thông lượng của dịch vụ định tuyến.
+
+    Độ trễ được giữ trong một bộ đệm vòng có kích thước cố định để tính phân vị,
+    thông lượng được tính trên các yêu cầu hoàn thành trong cửa sổ thời gian gần nhất.
+    """
+
+    def __init__(self, window_size=10000, throughput_window=60.0):
+        self.started_at = time.time()
+        self.latencies = deque(maxlen=window_size)
+        self.completed_at = deque()
+        self.throughput_window = throughput_window
+        self.total_requests = 0
+        self.total_errors = 0
+        self.in_flight = 0
+        self.total_batches = 0
+        self.batched_requests = 0
+        self.max_batch_size = 0
+
+    def request_started(self):
+        self.total_requests += 1
+        self.in_flight += 1
+
+    def request_finished(self, latency, error=False):
+        self.in_flight -= 1
+        if error:
+            self.total_errors += 1
+        self.latencies.append(latency)
+        now = time.time()
+        self.completed_at.append(now)
+        self._trim(now)
+
+    def batch_dispatched(self, size):
+        self.total_batches += 1
+        self.batched_requests += size
+        self.max_batch_size = max(self.max_batch_size, size)
+
+    def _trim(self, now):
+        limit = now - self.throughput_window
+        while self.completed_at and self.completed_at[0] < limit:
+            self.completed_at.popleft()
+
+    def snapshot(self):
+        """
+        Trả về số liệu hiện tại dưới dạng dict có thể chuyển sang JSON.
+        """
+        now = time.time()
+        self._trim(now)
+        ordered = sorted(self.latencies)
+
+        def percentile(p):
+            if not ordered:
+                return None
+            index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+            return ordered[index] * 1000
+
+        elapsed = min(now - self.started_at, self.throughput_window)
+        return {
+            'uptime_seconds': now - self.started_at,
+            'total_requests': self.total_requests,
+            'total_errors': self.total_errors,
+            'in_flight': self.in_flight,
+            'throughput_rps': len(self.completed_at) / elapsed if elapsed > 0 else 0.0,
+            'latency_ms': {
+                'p50': percentile(50),
+                'p95': percentile(95),
+                'p99': percentile(99),
+                'max': ordered[-1] * 1000 if ordered else None,
+                'mean': sum(ordered) / len(ordered) * 1000 if ordered else None,
+            },
+            'batches': {
+                'total': self.total_batches,
+                'mean_size': self.batched_requests / self.total_batches if self.total_batches else 0.0,
+                'max_size': self.max_batch_size,
+            },
+        }
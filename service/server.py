@@ -0,0 +1,238 @@
+import asyncio
+import json
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+
+from algorithms import ALGORITHMS
+from algorithms.auto_router import select_one_to_many
+from loader.compiled import get_compiled
+from loader.loader import load_map
+from loader.preprocess import preprocess_graph
+from loader.shared_graph import SharedGraph, via_table
+from loader.spatial_index import NodeIndex
+from service import worker
+from service.batcher import RouteBatcher
+from service.metrics import ServiceMetrics
+
+MAX_BODY_BYTES = 1 << 20
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class RouteService:
+    """
+    Dịch vụ định tuyến HTTP/JSON chạy trên asyncio.
+
+    Đồ thị được tải một lần ở tiến trình chính (để dựng chỉ mục tìm nút gần nhất)
+    và một lần trong mỗi tiến trình con của process pool (để tìm kiếm). Vòng lặp
+    sự kiện chỉ phân tích yêu cầu, gom lô và trả kết quả nên luôn phản hồi nhanh.
+
+    Khi preprocess=True, cả hai nơi đều chỉ giữ SCC lớn nhất và gộp các chuỗi nút bậc 2
+    (xem loader/preprocess.py); điểm được gắn vào các nút còn lại và đường đi trả về được
+    khôi phục đầy đủ. Cặp nút không có đường đi bị từ chối ngay mà không cần tìm kiếm.
+
+    Khi shared_memory=True, đồ thị chỉ được tải ở tiến trình chính; dạng mảng CSR của nó
+    được công bố vào shared memory (loader/shared_graph.py) và các tiến trình con gắn vào
+    mà không sao chép. Khi đó mọi truy vấn được giải bằng Dijkstra (CSR).
+
+    Khi compact=True, đồ thị được tải ở chế độ gọn (load_map(compact=True)): cạnh chỉ giữ
+    thuộc tính cần cho định tuyến và hình học nằm trong một mảng chung.
+
+    Endpoints:
+    - POST /route   {"origin": [lat, lon], "destination": [lat, lon], "algorithm": tùy chọn}
+    - GET  /metrics Số liệu độ trễ, thông lượng và kích thước lô
+    - GET  /health  Kiểm tra dịch vụ còn sống
+    """
+
+    def __init__(self, place_name, filepath, workers=None, batch_window=0.005, max_batch=64, weight='length',
+                 preprocess=True, shared_memory=False, compact=False):
+        self.place_name = place_name
+        self.filepath = filepath
+        self.weight = weight
+        graph = load_map(place_name, filepath=filepath, compact=compact)
+        # Tọa độ của mọi nút, kể cả các nút trung gian bị gộp, để trả về hình học đường đi
+        self.coords = {node: (data['x'], data['y']) for node, data in graph.nodes(data=True)}
+        graph = preprocess_graph(graph, largest_component=preprocess, contract=preprocess, weight=weight)
+        self.components = graph.graph['preprocessing']['components']
+        self.index = NodeIndex.from_graph(graph)
+        self.node_count = graph.number_of_nodes()
+        self.shared_graph = None
+        if shared_memory:
+            compiled = get_compiled(graph, weight)
+            via_indptr, via_nodes = via_table(graph, compiled, weight)
+            self.shared_graph = SharedGraph(compiled, extra={'via_indptr': via_indptr, 'via_nodes': via_nodes})
+            print(f"Công bố đồ thị vào shared memory: {self.shared_graph.nbytes / 1e6:.1f} MB.")
+            initializer, initargs = worker.init_shared_worker, (self.shared_graph.handle,)
+        else:
+            initializer, initargs = worker.init_worker, (place_name, filepath, preprocess, weight, compact)
+        del graph
+        self.metrics = ServiceMetrics()
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+        # Thuật toán giải lô được chọn theo metadata trong registry thay vì cố định
+        self.batch_algorithm = 'Dijkstra (CSR)' if shared_memory else select_one_to_many(weight=weight)
+        if self.batch_algorithm is None:
+            raise ValueError("Không có thuật toán một-nhiều nào trong registry.")
+        self.batcher = RouteBatcher(
+            self.executor, self.metrics, self.batch_algorithm,
+            window=batch_window, max_batch=max_batch, weight=weight
+        )
+        self.server = None
+
+    async def start(self, host='127.0.0.1', port=8080):
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server
+
+    async def serve_forever(self, host='127.0.0.1', port=8080):
+        server = await self.start(host, port)
+        addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+        print(f"Dịch vụ định tuyến đang lắng nghe tại {addresses}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.shared_graph is not None:
+            self.shared_graph.close()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    await self._write_response(writer, e.status, {'error': e.message}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                status, payload = await self.dispatch(method, path, body)
+                await self._write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, path, body):
+        path = path.split('?', 1)[0]
+        if path == '/route' and method == 'POST':
+            return await self.handle_route(body)
+        if path == '/metrics' and method == 'GET':
+            return HTTPStatus.OK, self.metrics.snapshot()
+        if path == '/health' and method == 'GET':
+            return HTTPStatus.OK, {'status': 'ok', 'nodes': self.node_count}
+        return HTTPStatus.NOT_FOUND, {'error': f"Không có endpoint {method} {path}"}
+
+    async def handle_route(self, body):
+        started = time.perf_counter()
+        self.metrics.request_started()
+        error = True
+        try:
+            query = self._parse_route_query(body)
+            source, source_offset = self.index.nearest(*query['origin'])
+            target, target_offset = self.index.nearest(*query['destination'])
+            algorithm = query.get('algorithm')
+
+            if algorithm and algorithm not in ALGORITHMS:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"Thuật toán {algorithm} không hỗ trợ.")
+            if algorithm and self.shared_graph is not None and algorithm != self.batch_algorithm:
+                raise HTTPError(HTTPStatus.BAD_REQUEST,
+                                f"Chế độ shared memory chỉ hỗ trợ thuật toán {self.batch_algorithm}.")
+
+            if not self.components.reachable(source, target):
+                cost, path, batch_size = float('inf'), [], 0
+            elif algorithm:
+                loop = asyncio.get_running_loop()
+                cost, path = await loop.run_in_executor(
+                    self.executor, worker.solve_single, algorithm, source, target, self.weight
+                )
+                batch_size = 1
+            else:
+                cost, path, batch_size = await self.batcher.submit(source, target)
+
+            error = False
+            return HTTPStatus.OK, {
+                'origin_node': source,
+                'destination_node': target,
+                'snap_distance_m': [source_offset, target_offset],
+                'found': bool(path),
+                'cost': cost if math.isfinite(cost) else None,
+                'path': path,
+                'coordinates': [[self.coords[n][1], self.coords[n][0]] for n in path],
+                'algorithm': algorithm or self.batch_algorithm,
+                'batch_size': batch_size,
+                'elapsed_ms': (time.perf_counter() - started) * 1000,
+            }
+        except HTTPError as e:
+            return e.status, {'error': e.message}
+        except Exception as e:
+            print(f"Lỗi khi xử lý yêu cầu định tuyến: {e}")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+        finally:
+            self.metrics.request_finished(time.perf_counter() - started, error=error)
+
+    @staticmethod
+    def _parse_route_query(body):
+        try:
+            query = json.loads(body or b'{}')
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body không phải JSON hợp lệ.")
+        if not isinstance(query, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body phải là một JSON object.")
+        for key in ('origin', 'destination'):
+            point = query.get(key)
+            if (not isinstance(point, (list, tuple)) or len(point) != 2
+                    or not all(isinstance(v, (int, float)) for v in point)):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"Thiếu hoặc sai định dạng '{key}': cần [lat, lon].")
+        return query
+
+    @staticmethod
+    async def _read_request(reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, path, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Dòng yêu cầu không hợp lệ.")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length', 0) or 0)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Content-Length không hợp lệ.")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Body quá lớn.")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), path, headers, body
+
+    @staticmethod
+    async def _write_response(writer, status, payload, keep_alive):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
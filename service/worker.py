@@ -0,0 +1,128 @@
+# Các hàm chạy trong tiến trình con của process pool.
+# Mỗi tiến trình tải đồ thị đúng một lần trong initializer (hoặc gắn vào đồ thị trong shared memory),
+# sau đó chỉ nhận id nút qua pickle.
+
+from loader.loader import load_map
+import numpy as np
+
+from algorithms import kernels
+from algorithms.csr_dijkstra import array_one_to_many
+from loader.paths import path_cost
+from loader.preprocess import preprocess_graph, unpack_path
+from loader.shared_graph import attach_shared_graph, lookup_nodes
+
+_GRAPH = None
+# Chế độ shared memory: CompiledGraph gắn từ tiến trình chính, bảng nút trung gian của cạnh và
+# bảng tra id nút (id đã sắp xếp, chỉ số); tất cả là view chỉ đọc, không sao chép vào tiến trình con
+_COMPILED = None
+_VIA = None
+_LOOKUP = None
+# MapMatcher của tiến trình con, tạo ở vệt GPS đầu tiên
+_MATCHER = None
+
+def init_worker(place_name, filepath, preprocess=True, weight='length', compact=False):
+    """
+    Initializer của process pool: tải và tiền xử lý đồ thị một lần cho mỗi tiến trình con,
+    giống hệt tiến trình chính để id nút khớp với chỉ mục tìm nút gần nhất.
+    """
+    global _GRAPH
+    graph = load_map(place_name, filepath=filepath, compact=compact)
+    _GRAPH = preprocess_graph(graph, largest_component=preprocess, contract=preprocess, weight=weight)
+
+def init_shared_worker(handle):
+    """
+    Initializer của process pool ở chế độ shared memory: gắn vào đồ thị mà tiến trình chính
+    đã công bố (loader/shared_graph.py), không tải hay tiền xử lý lại đồ thị.
+    """
+    global _COMPILED, _VIA, _LOOKUP
+    _COMPILED, arrays = attach_shared_graph(handle)
+    _VIA = (arrays['via_indptr'], arrays['via_nodes'])
+    _LOOKUP = (arrays['sorted_ids'], arrays['sorted_index'])
+
+def _unpack_shared(path):
+    # Đường đi theo chỉ số -> id nút, chèn các nút trung gian của từng cạnh đã gộp.
+    # Chỉ số cạnh tìm nhị phân trong hàng CSR của nút đầu (đích trong mỗi hàng đã sắp xếp)
+    node_ids = _COMPILED.to_ids(path)
+    via_indptr, via_nodes = _VIA
+    if len(path) < 2 or not len(via_nodes):
+        return node_ids
+    indptr, indices = _COMPILED.indptr, _COMPILED.indices
+    full = node_ids[:1]
+    for u, v, node in zip(path, path[1:], node_ids[1:]):
+        start = int(indptr[u])
+        k = start + int(np.searchsorted(indices[start:indptr[u + 1]], v))
+        full.extend(via_nodes[via_indptr[k]:via_indptr[k + 1]].tolist())
+        full.append(node)
+    return full
+
+def _solve_shared(source, targets):
+    # Tìm kiếm thẳng trên các view shared memory, không dùng CompiledGraph.index/lists();
+    # có numba thì chạy kernel biên dịch
+    rows = lookup_nodes(*_LOOKUP, [source] + list(targets)).tolist()
+    search = kernels.dijkstra_many if kernels.ENABLED and kernels.NUMBA_AVAILABLE else array_one_to_many
+    results = search(_COMPILED.indptr, _COMPILED.indices, _COMPILED.weights, rows[0], rows[1:])
+    return {
+        target: (cost, _unpack_shared(path))
+        for target, (cost, path) in zip(targets, (results[row] for row in rows[1:]))
+    }
+
+def solve_batch(algorithm_name, source, targets, weight='length'):
+    """
+    Giải một lô truy vấn có chung nút nguồn bằng một lần duyệt một-nhiều của thuật toán.
+
+    Returns:
+    - Dict {đích: (chi phí, đường đi)}.
+    """
+    from algorithms import ALGORITHMS
+
+    if _GRAPH is None:
+        # Chế độ shared memory chỉ có mảng CSR, luôn giải bằng Dijkstra (CSR)
+        return _solve_shared(source, targets)
+    one_to_many = ALGORITHMS[algorithm_name].one_to_many
+    results = one_to_many(_GRAPH, source, targets, weight=weight)
+    return {target: (cost, unpack_path(_GRAPH, path, weight)) for target, (cost, path) in results.items()}
+
+def solve_single(algorithm_name, source, target, weight='length'):
+    """
+    Giải một truy vấn bằng thuật toán được chỉ định trong registry.
+
+    Returns:
+    - Tuple (chi phí, đường đi). Không tìm thấy đường thì chi phí là inf và đường đi rỗng.
+    """
+    from algorithms import ALGORITHMS
+
+    if _GRAPH is None:
+        return _solve_shared(source, [target])[target]
+    func = ALGORITHMS[algorithm_name]['func']
+    path = func(_GRAPH, source, target, weight=weight)
+    if not path:
+        return float('inf'), []
+    return path_cost(_GRAPH, path, weight), unpack_path(_GRAPH, path, weight)
+
+def solve_isochrones(source, thresholds, weight='length', concave_ratio=0.3):
+    """
+    Tính isochrone của một nút nguồn trên đồ thị của tiến trình con.
+
+    Returns:
+    - Dict {ngưỡng: (danh sách nút tới được, đa giác)}, như algorithms.isochrones.isochrones().
+    """
+    from algorithms.isochrones import isochrones
+
+    return isochrones(_GRAPH, source, thresholds, weight=weight, concave_ratio=concave_ratio)
+
+def solve_match(trace, **options):
+    """
+    Gắn một vệt GPS {'id': ..., 'points': [[lat, lon], ...]} vào đồ thị của tiến trình con.
+    MapMatcher (chỉ mục cạnh và cache cây tìm kiếm) được tạo một lần và dùng lại cho mọi vệt.
+
+    Returns:
+    - Dict kết quả của MapMatcher.match() kèm 'id' của vệt.
+    """
+    from algorithms.map_matching import MapMatcher
+
+    global _MATCHER
+    if _MATCHER is None:
+        _MATCHER = MapMatcher(_GRAPH, **options)
+    result = _MATCHER.match(trace['points'])
+    result['id'] = trace.get('id')
+    return result
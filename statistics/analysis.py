@@ -111,7 +111,7 @@ def plot_path_length_comparison(stats_df, output_path):
     print(f"Đã lưu biểu đồ độ dài đường đi vào {output_path}")
 
 def main():
-    # Đường dẫn đến file CSV kết quả từ statistics.py
+    # Đường dẫn đến file CSV kết quả từ benchmarks/compare.py
     input_csv = os.path.join("statistics", "Dien Bien Ward_Ba Dinh District_Ha Noi City_Vietnam.csv")
     
     # Đường dẫn đến file CSV thống kê đầu ra
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from algorithms import kernels
+from algorithms.a_star_algorithm import a_star
+from algorithms.breadth_first_search import bfs
+from algorithms.dijkstra_algorithm import dijkstra
+from loader.paths import path_cost
+from loader.synthetic import synthetic_graph
+
+# Nút chỉ có cạnh ra: tới được mọi nút từ nó nhưng không nút nào tới được nó
+SOURCE_ONLY = -1
+
+@pytest.fixture(scope='module')
+def graph():
+    graph = synthetic_graph(400, 'grid', seed=7, oneway=0.3)
+    anchor = next(iter(graph.nodes))
+    graph.add_node(SOURCE_ONLY, x=graph.nodes[anchor]['x'], y=graph.nodes[anchor]['y'])
+    graph.add_edge(SOURCE_ONLY, anchor, length=5.0)
+    return graph
+
+@pytest.fixture(scope='module')
+def queries(graph):
+    rng = random.Random(0)
+    nodes = [node for node in graph.nodes if node != SOURCE_ONLY]
+    pairs = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(40)]
+    # Trường hợp đặc biệt: start == end, đích không tới được, nguồn chỉ có cạnh ra
+    return pairs + [(nodes[0], nodes[0]), (nodes[1], SOURCE_ONLY), (SOURCE_ONLY, nodes[2])]
+
+def _run(func, graph, pairs, enabled, weight='length'):
+    previous = kernels.ENABLED
+    kernels.ENABLED = enabled
+    try:
+        return [func(graph, start, end, weight=weight) for start, end in pairs]
+    finally:
+        kernels.ENABLED = previous
+
+def _cost(graph, path, weight):
+    if not path:
+        return None
+    return path_cost(graph, path, weight) if weight else len(path) - 1
+
+def _assert_valid(graph, paths, pairs):
+    for path, (start, end) in zip(paths, pairs):
+        if path:
+            assert path[0] == start and path[-1] == end
+            assert all(graph.has_edge(u, v) for u, v in zip(path, path[1:]))
+
+@pytest.mark.parametrize('func, weight', [(dijkstra, 'length'), (a_star, 'length'), (bfs, None)])
+def test_registry_functions_match_with_kernels_on_and_off(graph, queries, func, weight):
+    # Đường đi có thể khác nhau khi nhiều đường cùng chi phí, nên so sánh chi phí (số cạnh với BFS)
+    plain = _run(func, graph, queries, enabled=False)
+    accelerated = _run(func, graph, queries, enabled=True)
+    _assert_valid(graph, plain, queries)
+    _assert_valid(graph, accelerated, queries)
+    for expected, path in zip(plain, accelerated):
+        assert _cost(graph, path, weight) == pytest.approx(_cost(graph, expected, weight))
+
+@pytest.mark.parametrize('use_heuristic', [False, True])
+def test_dijkstra_kernel_matches_python(graph, queries, use_heuristic):
+    # Gọi thẳng kernel để kiểm tra cả khi không có numba (kernel chạy như Python thường)
+    reference = _run(a_star if use_heuristic else dijkstra, graph, queries, enabled=False)
+    for (start, end), expected in zip(queries, reference):
+        path = kernels.dijkstra_path(graph, start, end, 'length', use_heuristic=use_heuristic)
+        _assert_valid(graph, [path], [(start, end)])
+        assert _cost(graph, path, 'length') == pytest.approx(_cost(graph, expected, 'length'))
+
+def test_bfs_kernel_matches_python(graph, queries):
+    reference = _run(bfs, graph, queries, enabled=False)
+    for (start, end), expected in zip(queries, reference):
+        path = kernels.bfs_path(graph, start, end)
+        _assert_valid(graph, [path], [(start, end)])
+        assert _cost(graph, path, None) == _cost(graph, expected, None)
+
+def test_special_cases(graph, queries):
+    same, unreachable, source_only = queries[-3:]
+    assert kernels.dijkstra_path(graph, *same) == [same[0]]
+    assert kernels.bfs_path(graph, *same) == [same[0]]
+    assert kernels.dijkstra_path(graph, *unreachable) == []
+    assert kernels.bfs_path(graph, *unreachable) == []
+    assert kernels.dijkstra_path(graph, *source_only)[0] == SOURCE_ONLY